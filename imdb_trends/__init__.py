@@ -0,0 +1,7 @@
+"""
+imdb_trends
+
+Shared data pipeline for the Mining Minds IMDb project. The modules in this
+package turn the raw IMDb dumps into typed, columnar artifacts that the
+notebooks and the Streamlit dashboard read instead of re-parsing the TSVs.
+"""
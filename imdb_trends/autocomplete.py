@@ -0,0 +1,228 @@
+"""
+autocomplete.py
+
+Typeahead suggestions for titles, actors and directors (and any other ranked
+list of names, e.g. the Director Explorer's picker). Every suggestion is
+indexed under the start of each of its first few words, and the keys are kept
+as one sorted fixed-width array, so a prefix is a pair of binary searches.
+Suggestions are ranked by numVotes (summed over a person's titles). Prefixes
+that match more than a few hundred keys get their best suggestions
+precomputed (as many as the index is built for; a larger limit falls back to
+ranking the whole range), so a lookup within that width ranks at most
+HOT_RANGE keys. Prefixes that match
+nothing are retried one edit away, which catches most typos.
+
+The arrays are plain .npy files opened with mmap_mode="r", so a process only
+pages in the parts of the index that lookups actually touch.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+KEY_WIDTH = 24
+WORDS_INDEXED = 4
+TOP_K = 10
+# rows in the dashboard's name pickers, whose indexes precompute this many per hot prefix
+PICKER_SIZE = 20
+# prefixes matching more keys than this get their top suggestions precomputed
+HOT_RANGE = 256
+
+KINDS = ("title", "actor", "director")
+
+# same alphabet as the search tokenizer: accent-free lower-case alphanumerics
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789 "
+# prefixes this long that match nothing are looked up one edit away
+MIN_FUZZY_LENGTH = 4
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def build_autocomplete(con, movies: str, actors: str, directors: str, out_dir: Path):
+    """Write the suggestion and key arrays for the given title/actor/director relations."""
+    suggestions = con.execute(f"""
+        WITH people AS (
+            SELECT a.actorName AS label, 'actor' AS kind, SUM(m.numVotes) AS votes
+            FROM {actors} a JOIN {movies} m USING (tconst)
+            GROUP BY a.actorName
+            UNION ALL
+            SELECT d.directorName, 'director', SUM(m.numVotes)
+            FROM {directors} d JOIN {movies} m USING (tconst)
+            GROUP BY d.directorName
+        ),
+        titles AS (
+            SELECT displayTitle AS label, 'title' AS kind, MAX(numVotes) AS votes
+            FROM {movies}
+            GROUP BY displayTitle
+        )
+        SELECT label, kind, COALESCE(votes, 0) AS votes
+        FROM (SELECT * FROM titles UNION ALL SELECT * FROM people)
+        WHERE label IS NOT NULL
+        ORDER BY votes DESC, label
+    """).df()
+    write_autocomplete(suggestions, out_dir)
+
+
+def write_autocomplete(suggestions: pd.DataFrame, out_dir: Path, top_k: int = TOP_K):
+    """
+    Write the arrays for `suggestions`, a frame with label, kind and votes
+    columns (plus an optional ref, e.g. a directorId) already in rank order.
+    Hot prefixes keep their best `top_k` suggestions, the largest limit they
+    answer without a scan.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suggestions = suggestions.assign(key=[normalize(label) for label in suggestions["label"]])
+    suggestions = suggestions[suggestions["key"] != ""].reset_index(drop=True)
+    if "ref" not in suggestions:
+        suggestions["ref"] = ""
+
+    for column in ("label", "ref"):
+        encoded = [value.encode("utf-8") for value in suggestions[column]]
+        np.save(out_dir / f"{column}s.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(out_dir / f"{column}_offsets.npy", np.r_[0, np.cumsum([len(b) for b in encoded])].astype(np.int64))
+    np.save(out_dir / "kinds.npy", suggestions["kind"].map(KINDS.index).to_numpy(np.uint8))
+    np.save(out_dir / "votes.npy", suggestions["votes"].to_numpy(np.int64))
+
+    # one key per word start; suggestion ids are already in votes order
+    keys, ids = [], []
+    for suggestion_id, key in enumerate(suggestions["key"]):
+        words = key.split(" ")
+        for i in range(min(len(words), WORDS_INDEXED)):
+            keys.append(" ".join(words[i:]).encode("ascii", "ignore")[:KEY_WIDTH])
+            ids.append(suggestion_id)
+    keys = np.array(keys, dtype=f"S{KEY_WIDTH}")
+    ids = np.array(ids, dtype=np.int32)
+    order = np.lexsort((ids, keys))
+    keys, ids = keys[order], ids[order]
+    np.save(out_dir / "keys.npy", keys)
+    np.save(out_dir / "key_suggestions.npy", ids)
+
+    # best top_k suggestions for every prefix that matches too many keys to rank on the fly
+    prefixes, top = [], []
+    for length in range(1, KEY_WIDTH + 1):
+        heads = keys.astype(f"S{length}")
+        starts = np.flatnonzero(np.r_[True, heads[1:] != heads[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        hot = ends - starts > HOT_RANGE
+        if not hot.any():
+            break
+        for start, end in zip(starts[hot], ends[hot]):
+            best = np.unique(ids[start:end])[:top_k]
+            prefixes.append(heads[start])
+            top.append(np.pad(best, (0, top_k - len(best)), constant_values=-1))
+    prefixes = np.array(prefixes, dtype=f"S{KEY_WIDTH}")
+    order = np.argsort(prefixes, kind="stable")
+    np.save(out_dir / "prefixes.npy", prefixes[order])
+    np.save(out_dir / "prefix_top.npy", np.array(top, dtype=np.int32).reshape(-1, top_k)[order])
+
+
+def one_edit_variants(key: bytes) -> np.ndarray:
+    """Every string one deletion, substitution, insertion or transposition away from `key`."""
+    text = key.decode("ascii")
+    variants = set()
+    for i in range(len(text) + 1):
+        head, tail = text[:i], text[i:]
+        if tail:
+            variants.add(head + tail[1:])
+            variants.update(head + c + tail[1:] for c in ALPHABET)
+        if len(tail) > 1:
+            variants.add(head + tail[1] + tail[0] + tail[2:])
+        variants.update(head + c + tail for c in ALPHABET)
+    variants.discard(text)
+    variants.discard("")
+    return np.array(sorted(variants), dtype=f"S{KEY_WIDTH}")
+
+
+def successors(keys: np.ndarray) -> np.ndarray:
+    """
+    The smallest key greater than every key starting with each prefix. It has
+    the index's own width, since searching with a wider dtype would copy the
+    whole key array.
+    """
+    return np.array([k[:-1] + bytes([k[-1] + 1]) for k in keys], dtype=keys.dtype)
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    label: str
+    kind: str
+    votes: int
+    ref: str = ""
+
+
+@dataclass(frozen=True)
+class Autocomplete:
+    labels: np.ndarray
+    label_offsets: np.ndarray
+    refs: np.ndarray
+    ref_offsets: np.ndarray
+    kinds: np.ndarray
+    votes: np.ndarray
+    keys: np.ndarray
+    key_suggestions: np.ndarray
+    prefixes: np.ndarray
+    prefix_top: np.ndarray
+
+    def _text(self, blob, offsets, suggestion_id: int) -> str:
+        return blob[offsets[suggestion_id]:offsets[suggestion_id + 1]].tobytes().decode("utf-8")
+
+    def _suggestion(self, suggestion_id: int) -> Suggestion:
+        return Suggestion(
+            self._text(self.labels, self.label_offsets, suggestion_id),
+            KINDS[self.kinds[suggestion_id]],
+            int(self.votes[suggestion_id]),
+            self._text(self.refs, self.ref_offsets, suggestion_id),
+        )
+
+    def _prefix_ids(self, keys: np.ndarray, limit: int) -> np.ndarray:
+        """The best `limit` suggestion ids matching any of the prefixes in `keys`, best first."""
+        i = np.minimum(np.searchsorted(self.prefixes, keys), max(len(self.prefixes) - 1, 0))
+        hot = (self.prefixes[i] == keys) if len(self.prefixes) else np.zeros(len(keys), dtype=bool)
+        # the precomputed rows only hold the index's top_k; a larger limit ranks the whole range
+        hot &= limit <= self.prefix_top.shape[1]
+        ids = [self.prefix_top[i[hot]].ravel()]
+
+        # prefixes that are not hot match at most HOT_RANGE keys each
+        cold = keys[~hot]
+        lo = np.searchsorted(self.keys, cold)
+        hi = np.searchsorted(self.keys, successors(cold))
+        ids.extend(self.key_suggestions[l:h] for l, h in zip(lo, hi) if h > l)
+
+        # ids are numbered in rank order, so the smallest ids rank highest
+        ids = np.unique(np.concatenate(ids))
+        return ids[ids >= 0][:limit]
+
+    def top(self, limit: int = TOP_K) -> list:
+        """Highest-ranked suggestions overall."""
+        return [self._suggestion(i) for i in range(min(limit, len(self.kinds)))]
+
+    def suggest(self, prefix: str, limit: int = TOP_K, fuzzy: bool = True) -> list:
+        """
+        Highest-ranked suggestions with a word starting with `prefix`. When
+        nothing matches and `fuzzy` is set, prefixes one edit away are used.
+        """
+        key = normalize(prefix).encode("ascii", "ignore")[:KEY_WIDTH]
+        if not key:
+            return []
+
+        ids = self._prefix_ids(np.array([key], dtype=f"S{KEY_WIDTH}"), limit)
+        if fuzzy and not len(ids) and len(key) >= MIN_FUZZY_LENGTH:
+            ids = self._prefix_ids(one_edit_variants(key), limit)
+        return [self._suggestion(i) for i in ids]
+
+
+def load_autocomplete(index_dir: Path) -> Autocomplete:
+    index_dir = Path(index_dir)
+    return Autocomplete(**{
+        name: np.load(index_dir / f"{name}.npy", mmap_mode="r")
+        for name in Autocomplete.__dataclass_fields__
+    })
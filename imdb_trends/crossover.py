@@ -0,0 +1,230 @@
+"""
+crossover.py
+
+Vote arrays behind the Cross-Cultural Breakouts page. A foreign movie is a
+"crossover" when its votes reach a chosen quantile of the votes of every
+foreign movie in the selection, and "regional" otherwise.
+
+crossover_votes.parquet holds one row per (foreign definition, movie),
+sorted by (definition, startYear, genre_mask, numVotes). Each run of equal
+(definition, startYear, genre_mask) is a stratum whose votes are sorted.
+Keying on the full genre set (as in cube.py) puts every movie in exactly one
+stratum, so any year/genre selection is a set of whole strata without double
+counting. After loading:
+
+- a quantile of the selection's votes is a binary search over vote values,
+  where each step counts the votes below the candidate in every selected
+  stratum with one `searchsorted`;
+- the crossover rows of a stratum are the tail of its run, so crossover and
+  regional sums are differences of prefix sums at the split points.
+
+Nothing is re-scanned when the quantile, years, genres or definition change.
+
+  index = load_crossover("streamlit_app/data/crossover_votes.parquet")
+  strata = index.select("no_us_no_english", (1990, 2020))
+  threshold = index.quantile(strata, 0.9)
+  index.compare(strata, threshold)
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from imdb_trends.genres import GENRES, genre_mask_sql, unpack
+from imdb_trends.parquet import copy_to_parquet
+
+# name -> (label, condition on akas_facts f); the position is the stored code
+FOREIGN_DEFINITIONS = {
+    "no_us_no_english": ("No US release and no English title", "NOT f.has_us_release AND NOT f.has_english"),
+    "no_us": ("No US release", "NOT f.has_us_release"),
+    "no_english": ("No English-language title", "NOT f.has_english"),
+    "non_us_origin": (
+        "Original region outside the US",
+        "f.original_region NOT IN (SELECT code FROM akas_regions WHERE region = 'US')",
+    ),
+}
+
+# votes occupy the low 32 bits of the sort key, the stratum the high bits
+VOTE_BITS = 32
+VOTE_MASK = np.uint64((1 << VOTE_BITS) - 1)
+
+# per-movie measures kept as prefix sums; runtime is summed over known runtimes only
+MEASURES = ("averageRating", "numVotes", "region_count", "language_count", "runtimeMinutes", "genre_count")
+
+
+def export_crossover(con, out_dir: Path):
+    """Write crossover_votes.parquet from the warehouse's movies, ratings and akas_facts."""
+    definitions = " UNION ALL ".join(
+        f"SELECT {code} AS definition, tconst FROM akas_facts f WHERE {condition}"
+        for code, (_, condition) in enumerate(FOREIGN_DEFINITIONS.values())
+    )
+    copy_to_parquet(con, f"""
+        SELECT
+            CAST(d.definition AS UTINYINT) AS definition,
+            CAST(b.startYear AS SMALLINT) AS startYear,
+            {genre_mask_sql("b.genres")} AS genre_mask,
+            CAST(r.numVotes AS UINTEGER) AS numVotes,
+            r.averageRating,
+            b.runtimeMinutes,
+            f.region_count,
+            f.language_count
+        FROM ({definitions}) d
+        JOIN akas_facts f ON d.tconst = f.tconst
+        JOIN basics b ON d.tconst = b.tconst
+        JOIN ratings r ON d.tconst = r.tconst
+        WHERE b.titleType = 'movie'
+          AND b.startYear IS NOT NULL
+          AND r.numVotes IS NOT NULL
+        ORDER BY definition, startYear, genre_mask, numVotes
+    """, Path(out_dir) / "crossover_votes.parquet")
+
+
+@dataclass(frozen=True)
+class CrossoverIndex:
+    """Sorted vote arrays per (definition, startYear, genre_mask) stratum, with prefix sums."""
+
+    # one row per stratum: definition, startYear, genre_mask
+    strata: pd.DataFrame
+    # stratum s covers rows bounds[s]:bounds[s + 1]
+    bounds: np.ndarray
+    # (stratum << VOTE_BITS) | numVotes, ascending
+    keys: np.ndarray
+    # measure -> cumulative sum with a leading zero, plus "runtime_known"
+    prefix: dict
+    # stratum x genre 0/1 matrix, in GENRES order
+    genre_bits: np.ndarray
+
+    def select(self, definition: str, years: tuple, genre_mask: int = 0) -> np.ndarray:
+        """Ids of the strata of `definition` within `years` (inclusive) with any genre in `genre_mask` (0: all)."""
+        strata = self.strata
+        selected = (
+            (strata["definition"] == list(FOREIGN_DEFINITIONS).index(definition))
+            & strata["startYear"].between(*years)
+        )
+        if genre_mask:
+            selected &= (strata["genre_mask"] & genre_mask) != 0
+        return np.flatnonzero(selected.to_numpy())
+
+    def size(self, ids: np.ndarray) -> int:
+        return int((self.bounds[ids + 1] - self.bounds[ids]).sum())
+
+    def _split(self, ids: np.ndarray, votes: int) -> np.ndarray:
+        """Per stratum, the position of its first row with at least `votes` votes."""
+        return np.searchsorted(self.keys, (ids.astype(np.uint64) << VOTE_BITS) + np.uint64(votes), side="left")
+
+    def _kth(self, ids: np.ndarray, k: int) -> int:
+        """
+        The k-th smallest (0-based) vote count over the strata `ids`, by
+        binary search on the value. A stratum lying wholly below the search
+        range adds its size and one wholly above adds nothing, so each step
+        only searches the strata straddling the candidate and drops the ones
+        it has settled.
+        """
+        starts, ends = self.bounds[ids], self.bounds[ids + 1]
+        lowest = (self.keys[starts] & VOTE_MASK).astype(np.int64)
+        highest = (self.keys[ends - 1] & VOTE_MASK).astype(np.int64)
+        lo, hi = int(lowest.min()), int(highest.max())
+        settled = 0  # rows of dropped strata that lie below `lo`
+        while lo < hi:
+            # votes are heavy-tailed, so wide ranges are split geometrically
+            mid = (lo + hi) // 2 if hi < 4 * (lo + 1) else int(np.sqrt((lo + 1) * (hi + 1)))
+            below = highest <= mid
+            straddle = ~below & (lowest <= mid)
+            below_rows = int((ends - starts)[below].sum())
+            at_most = settled + below_rows + int(
+                (self._split(ids[straddle], mid + 1) - starts[straddle]).sum()
+            )
+            if at_most > k:
+                hi = mid
+                keep = lowest <= mid
+            else:
+                lo = mid + 1
+                settled += below_rows
+                keep = ~below
+            ids, starts, ends, lowest, highest = ids[keep], starts[keep], ends[keep], lowest[keep], highest[keep]
+        return lo
+
+    def quantile(self, ids: np.ndarray, q: float) -> float:
+        """Continuous quantile of the votes over the strata `ids`, as DuckDB's quantile_cont; NaN if empty."""
+        n = self.size(ids)
+        if not n:
+            return float("nan")
+        position = q * (n - 1)
+        k = int(np.floor(position))
+        low = self._kth(ids, k)
+        if k + 1 >= n or position == k:
+            return float(low)
+        return low + (position - k) * (self._kth(ids, k + 1) - low)
+
+    def _groups(self, ids: np.ndarray, threshold: float):
+        """Per stratum row ranges of the regional (below `threshold` votes) and crossover movies."""
+        starts, ends = self.bounds[ids], self.bounds[ids + 1]
+        split = self._split(ids, int(np.ceil(threshold))) if ids.size else starts
+        return {"Crossover": (split, ends), "Regional": (starts, split)}
+
+    def compare(self, ids: np.ndarray, threshold: float) -> pd.DataFrame:
+        """Movie count and mean measures of the crossover and regional groups."""
+        rows = []
+        for group, (lo, hi) in self._groups(ids, threshold).items():
+            sums = {m: float((self.prefix[m][hi] - self.prefix[m][lo]).sum()) for m in self.prefix}
+            count = int((hi - lo).sum())
+            known = sums.pop("runtime_known")
+            rows.append({
+                "group": group,
+                "movies": count,
+                "avg_rating": sums["averageRating"] / count if count else np.nan,
+                "avg_votes": sums["numVotes"] / count if count else np.nan,
+                "avg_regions": sums["region_count"] / count if count else np.nan,
+                "avg_languages": sums["language_count"] / count if count else np.nan,
+                "avg_runtime": sums["runtimeMinutes"] / known if known else np.nan,
+                "avg_genres": sums["genre_count"] / count if count else np.nan,
+            })
+        return pd.DataFrame(rows)
+
+    def genre_counts(self, ids: np.ndarray, threshold: float) -> pd.DataFrame:
+        """Crossover and regional movie counts per genre (a movie counts once for each of its genres)."""
+        bits = self.genre_bits[ids]
+        frame = pd.DataFrame({"genre": GENRES})
+        for group, (lo, hi) in self._groups(ids, threshold).items():
+            frame[group.lower()] = ((hi - lo).astype(np.float32) @ bits).round().astype(np.int64)
+        return frame
+
+    def year_counts(self, ids: np.ndarray, threshold: float) -> pd.DataFrame:
+        """Crossover and regional movie counts per startYear."""
+        years = self.strata["startYear"].to_numpy()[ids].astype(np.int64)
+        first = int(years.min()) if ids.size else 0
+        frame = pd.DataFrame({"startYear": np.arange(first, int(years.max()) + 1 if ids.size else 0)})
+        for group, (lo, hi) in self._groups(ids, threshold).items():
+            frame[group.lower()] = np.bincount(years - first, weights=hi - lo, minlength=len(frame)).astype(np.int64)
+        return frame
+
+
+def load_crossover(path: Path) -> CrossoverIndex:
+    """Read crossover_votes.parquet into a CrossoverIndex."""
+    rows = duckdb.connect().execute(f"SELECT * FROM read_parquet('{path}')").df()
+    keys = ["definition", "startYear", "genre_mask"]
+    change = np.zeros(len(rows), dtype=bool)
+    change[:1] = True
+    for key in keys:
+        column = rows[key].to_numpy()
+        change[1:] |= column[1:] != column[:-1]
+    starts = np.flatnonzero(change)
+    stratum = np.cumsum(change) - 1
+
+    rows["genre_count"] = unpack(rows["genre_mask"].to_numpy()).sum(axis=1)
+    runtime = rows["runtimeMinutes"].to_numpy(dtype=np.float64, na_value=np.nan)
+    rows["runtimeMinutes"] = np.nan_to_num(runtime)
+    prefix = {m: np.concatenate([[0.0], np.cumsum(rows[m].to_numpy(dtype=np.float64))]) for m in MEASURES}
+    prefix["runtime_known"] = np.concatenate([[0.0], np.cumsum(~np.isnan(runtime))])
+
+    strata = rows.iloc[starts][keys].reset_index(drop=True)
+    return CrossoverIndex(
+        strata=strata,
+        bounds=np.append(starts, len(rows)),
+        keys=(stratum.astype(np.uint64) << VOTE_BITS) | rows["numVotes"].to_numpy(dtype=np.uint64),
+        prefix=prefix,
+        genre_bits=unpack(strata["genre_mask"].to_numpy()).astype(np.float32),
+    )
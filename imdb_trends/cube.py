@@ -0,0 +1,62 @@
+"""
+cube.py
+
+Precomputed aggregate cube behind the dashboard homepage.
+
+homepage_cube.parquet holds one row per (startYear, titleType, genre_mask)
+with title counts, rating/vote sums and a rating histogram. Keying on the full
+genre set (as a bitmask, see genres.py) rather than single genres means every
+title lands in exactly one cell, so any year/type/genre filter rolls up to
+exact totals without double counting.
+
+homepage_sketches.parquet holds HyperLogLog sketches (see sketches.py) of the
+distinct directors and actors per (startYear, titleType, genre), where the
+genre is a single-bit genre_mask. Sketch unions are idempotent, so
+single-genre cells can be merged for any genre selection.
+"""
+
+from pathlib import Path
+
+from imdb_trends.genres import GENRES
+from imdb_trends.parquet import copy_to_parquet
+from imdb_trends.sketches import write_sketches
+
+RATING_BIN_WIDTH = 0.5
+RATING_BINS = int(10 / RATING_BIN_WIDTH)
+
+SKETCH_KEYS = ["startYear", "titleType", "genre_mask"]
+
+
+def export_homepage_cube(con, out_dir: Path):
+    out_dir = Path(out_dir)
+    bin_expr = f"LEAST(CAST(FLOOR(averageRating / {RATING_BIN_WIDTH}) AS INTEGER), {RATING_BINS - 1})"
+    bins = ", ".join(f"COUNT(*) FILTER (WHERE {bin_expr} = {i})" for i in range(RATING_BINS))
+
+    copy_to_parquet(con, f"""
+        SELECT
+            CAST(startYear AS SMALLINT) AS startYear,
+            titleType,
+            genre_mask,
+            COUNT(*) AS title_count,
+            SUM(averageRating) AS rating_sum,
+            SUM(numVotes) AS vote_sum,
+            [{bins}] AS rating_bins
+        FROM homepage_master
+        GROUP BY ALL
+        ORDER BY startYear, titleType, genre_mask
+    """, out_dir / "homepage_cube.parquet")
+
+    write_sketches(con, {
+        column: f"""
+            SELECT
+                CAST(startYear AS SMALLINT) AS startYear,
+                titleType,
+                1::UINTEGER << g.bit AS genre_mask,
+                person AS item
+            FROM homepage_master,
+                 range({len(GENRES)}) AS g(bit),
+                 unnest(string_split({column}, ',')) AS p(person)
+            WHERE genre_mask & (1::UINTEGER << g.bit) != 0
+        """
+        for column in ("directors", "actors")
+    }, SKETCH_KEYS, out_dir / "homepage_sketches.parquet")
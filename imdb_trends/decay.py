@@ -0,0 +1,471 @@
+"""
+decay.py
+
+TV rating decay: do series' season ratings fall as seasons progress?
+
+Season means come from the `season_agg` derived table. Every series' OLS fit of
+season mean rating on season number (slope, intercept, r, two-sided p-value
+and standard errors, matching scipy.stats.linregress) is computed in one
+vectorised pass: seasons are sorted by series and the regression sums are
+segment sums over that array, so the cost is linear in the number of seasons
+however many series there are.
+
+Seasons can be summarised by their plain mean (episodes with at least
+MIN_EPISODE_VOTES votes) or their vote-weighted mean (every rated episode);
+every function takes the column to use as `rating`. Episode-level fits
+(`episode_trends`, `within_season_slopes`) ask whether ratings drift from
+premiere to finale inside a season.
+
+Bootstrap intervals are built for throughput: resamples are index arrays
+drawn for thousands of series at once and refitted with the same segment
+sums, and shards of series run in a process pool.
+
+  from imdb_trends.decay import load_seasons, series_slopes, global_by_season, global_trend
+
+  seasons = load_seasons(con)
+  slopes = series_slopes(seasons)
+  trend = global_trend(global_by_season(seasons))
+  intervals = bootstrap_series_slopes(seasons, rating="season_weighted_rating")
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import stdtr
+
+from imdb_trends.derived import MIN_EPISODE_VOTES
+
+# per-series slopes need at least this many seasons
+MIN_SEASONS = 3
+# the global trend only uses seasons that at least this many series reach
+MIN_SERIES_PER_SEASON = 10
+# within-season trends need at least this many rated episodes in the season
+MIN_EPISODES = 4
+
+# bootstrap resamples, and the coverage of the percentile intervals
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.95
+# series per worker task in the per-series bootstrap
+SHARD_SERIES = 5000
+# series that share one random stream; shards are made of whole chunks, so
+# neither the shard size nor the number of jobs changes the draws
+SEED_SERIES = 500
+# resampled values generated per block, which bounds each worker's memory
+BLOCK_SIZE = 2_000_000
+
+SLOPE_COLUMNS = ["series_tconst", "series_title", "slope", "intercept", "r", "pval", "stderr", "n_seasons"]
+EPISODE_TREND_COLUMNS = ["series_tconst", "seasonNumber", "n_episodes", "slope", "intercept", "r", "pval", "stderr"]
+BOOTSTRAP_COLUMNS = ["series_tconst", "slope_ci_low", "slope_ci_high", "slope_boot_se"]
+
+SEASONS_SQL = """
+    SELECT
+        s.series_tconst,
+        b.primaryTitle AS series_title,
+        s.seasonNumber,
+        s.season_mean_rating,
+        s.season_std_rating,
+        s.season_count,
+        s.season_weighted_rating,
+        s.season_votes
+    FROM season_agg s
+    LEFT JOIN basics b ON s.series_tconst = b.tconst
+    ORDER BY s.series_tconst, s.seasonNumber
+"""
+
+
+EPISODES_SQL = """
+    SELECT
+        e.parentTconst AS series_tconst,
+        e.seasonNumber,
+        e.episodeNumber,
+        r.averageRating,
+        r.numVotes
+    FROM episode e
+    JOIN ratings r ON e.tconst = r.tconst
+    WHERE e.parentTconst IS NOT NULL
+      AND e.seasonNumber IS NOT NULL
+      AND e.episodeNumber IS NOT NULL
+      AND r.averageRating IS NOT NULL
+      AND r.numVotes >= $min_votes
+    ORDER BY e.parentTconst, e.seasonNumber, e.episodeNumber
+"""
+
+
+def load_seasons(con) -> pd.DataFrame:
+    """Season-level means per series with the series title, sorted by (series, season)."""
+    return con.execute(SEASONS_SQL).df()
+
+
+def load_episodes(con, min_votes: int = MIN_EPISODE_VOTES) -> pd.DataFrame:
+    """Rated episodes with their season and episode number, sorted by (series, season, episode)."""
+    return con.execute(EPISODES_SQL, {"min_votes": min_votes}).df()
+
+
+def _starts(*keys: np.ndarray) -> np.ndarray:
+    """First position of every run of equal keys in arrays sorted by those keys."""
+    change = np.zeros(len(keys[0]), dtype=bool)
+    change[:1] = True
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(change)
+
+
+def _series_rows(seasons: pd.DataFrame, rating: str, min_seasons: int):
+    """Seasons of the series with at least `min_seasons` rated seasons, sorted, and where each series starts."""
+    seasons = seasons.dropna(subset=["seasonNumber", rating])
+    n_seasons = seasons.groupby("series_tconst")["seasonNumber"].transform("size")
+    rows = seasons[n_seasons >= min_seasons].sort_values(
+        ["series_tconst", "seasonNumber"], kind="stable", ignore_index=True
+    )
+    return rows, _starts(rows["series_tconst"].to_numpy())
+
+
+def grouped_ols(starts: np.ndarray, x: np.ndarray, y: np.ndarray) -> dict:
+    """
+    Ordinary least squares of y on x within each segment of the arrays;
+    segment i covers rows starts[i]:starts[i + 1]. Returns arrays of n, slope,
+    intercept, r, pvalue, stderr and intercept_stderr, one entry per segment.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    n = np.diff(np.append(starts, len(x))).astype(np.float64)
+    segment = np.repeat(np.arange(len(starts)), n.astype(np.int64))
+
+    x_mean = np.add.reduceat(x, starts) / n
+    y_mean = np.add.reduceat(y, starts) / n
+    # centred sums, so long series with large season numbers keep their precision
+    dx = x - x_mean[segment]
+    dy = y - y_mean[segment]
+    ssx = np.add.reduceat(dx * dx, starts)
+    ssy = np.add.reduceat(dy * dy, starts)
+    sxy = np.add.reduceat(dx * dy, starts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / ssx
+        intercept = y_mean - slope * x_mean
+        # undefined without variance in x or y, as in linregress (so p and
+        # stderr are too, except for the exact two-point fit below)
+        r = np.clip(sxy / np.sqrt(ssx * ssy), -1.0, 1.0)
+        df = n - 2
+        t = r * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        pvalue = 2 * stdtr(df, -np.abs(t))
+        stderr = np.sqrt((1 - r * r) * ssy / ssx / df)
+        intercept_stderr = stderr * np.sqrt(ssx / n + x_mean * x_mean)
+
+    # two points fit exactly, as in linregress
+    two = n == 2
+    pvalue = np.where(two, np.where(ssy == 0, 1.0, 0.0), pvalue)
+    stderr = np.where(two, 0.0, stderr)
+    intercept_stderr = np.where(two, 0.0, intercept_stderr)
+    return {
+        "n": n.astype(np.int64),
+        "slope": slope,
+        "intercept": intercept,
+        "r": r,
+        "pvalue": pvalue,
+        "stderr": stderr,
+        "intercept_stderr": intercept_stderr,
+    }
+
+
+def series_slopes(
+    seasons: pd.DataFrame,
+    min_seasons: int = MIN_SEASONS,
+    rating: str = "season_mean_rating",
+) -> pd.DataFrame:
+    """
+    The OLS trend of season rating over season number for every series
+    with at least `min_seasons` seasons.
+    """
+    rows, starts = _series_rows(seasons, rating, min_seasons)
+    if rows.empty:
+        return pd.DataFrame(columns=SLOPE_COLUMNS)
+
+    fit = grouped_ols(starts, rows["seasonNumber"].to_numpy(), rows[rating].to_numpy())
+
+    first = rows.iloc[starts]
+    return pd.DataFrame({
+        "series_tconst": first["series_tconst"].to_numpy(),
+        "series_title": first["series_title"].to_numpy(),
+        "slope": fit["slope"],
+        "intercept": fit["intercept"],
+        "r": fit["r"],
+        "pval": fit["pvalue"],
+        "stderr": fit["stderr"],
+        "n_seasons": fit["n"],
+    })
+
+
+def global_by_season(seasons: pd.DataFrame, rating: str = "season_mean_rating") -> pd.DataFrame:
+    """Mean (with standard error) of the season means across series, per season number."""
+    global_df = seasons.groupby("seasonNumber", as_index=False).agg(
+        mean_of_season_means=(rating, "mean"),
+        std_of_season_means=(rating, "std"),
+        count_series=(rating, "count"),
+    ).sort_values("seasonNumber", ignore_index=True)
+    global_df["sem"] = global_df["std_of_season_means"] / np.sqrt(global_df["count_series"].replace(0, np.nan))
+    return global_df
+
+
+def global_trend(global_df: pd.DataFrame, min_series: int = MIN_SERIES_PER_SEASON) -> dict:
+    """
+    OLS of the cross-series mean rating on season number, over seasons that
+    at least `min_series` series reach. All values are NaN with fewer than
+    two such seasons.
+    """
+    eligible = global_df[global_df["count_series"] >= min_series]
+    if len(eligible) < 2:
+        return {k: np.nan for k in ("slope", "intercept", "r", "pvalue", "stderr", "intercept_stderr")}
+    fit = grouped_ols(
+        np.array([0]),
+        eligible["seasonNumber"].to_numpy(),
+        eligible["mean_of_season_means"].to_numpy(),
+    )
+    return {k: float(v[0]) for k, v in fit.items() if k != "n"}
+
+
+def _episode_rows(episodes: pd.DataFrame, min_episodes: int):
+    """Episodes of seasons with at least `min_episodes` of them, sorted, and where each season starts."""
+    rows = episodes.dropna(subset=["seasonNumber", "episodeNumber", "averageRating"]).sort_values(
+        ["series_tconst", "seasonNumber", "episodeNumber"], kind="stable", ignore_index=True
+    )
+    starts = _starts(rows["series_tconst"].to_numpy(), rows["seasonNumber"].to_numpy())
+    size = np.diff(np.append(starts, len(rows)))
+    rows = rows[np.repeat(size >= min_episodes, size)].reset_index(drop=True)
+    return rows, _starts(rows["series_tconst"].to_numpy(), rows["seasonNumber"].to_numpy())
+
+
+def episode_trends(episodes: pd.DataFrame, min_episodes: int = MIN_EPISODES) -> pd.DataFrame:
+    """
+    The OLS trend of episode rating over episode number within every season
+    that has at least `min_episodes` rated episodes.
+    """
+    rows, starts = _episode_rows(episodes, min_episodes)
+    if rows.empty:
+        return pd.DataFrame(columns=EPISODE_TREND_COLUMNS)
+
+    fit = grouped_ols(starts, rows["episodeNumber"].to_numpy(), rows["averageRating"].to_numpy())
+    first = rows.iloc[starts]
+    return pd.DataFrame({
+        "series_tconst": first["series_tconst"].to_numpy(),
+        "seasonNumber": first["seasonNumber"].to_numpy(),
+        "n_episodes": fit["n"],
+        "slope": fit["slope"],
+        "intercept": fit["intercept"],
+        "r": fit["r"],
+        "pval": fit["pvalue"],
+        "stderr": fit["stderr"],
+    })
+
+
+def within_season_slopes(episodes: pd.DataFrame, min_episodes: int = MIN_EPISODES) -> pd.DataFrame:
+    """
+    One within-season trend per series: episode number and rating are
+    centred within each season and pooled into a single slope (a
+    fixed-effects fit), so differences between seasons don't leak into it.
+    """
+    rows, starts = _episode_rows(episodes, min_episodes)
+    columns = ["series_tconst", "n_seasons", "n_episodes", "within_season_slope"]
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+
+    x = rows["episodeNumber"].to_numpy(dtype=np.float64)
+    y = rows["averageRating"].to_numpy(dtype=np.float64)
+    size = np.diff(np.append(starts, len(rows)))
+    season = np.repeat(np.arange(len(starts)), size)
+    dx = x - (np.add.reduceat(x, starts) / size)[season]
+    dy = y - (np.add.reduceat(y, starts) / size)[season]
+
+    series_starts = _starts(rows["series_tconst"].to_numpy())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.add.reduceat(dx * dy, series_starts) / np.add.reduceat(dx * dx, series_starts)
+    return pd.DataFrame({
+        "series_tconst": rows["series_tconst"].to_numpy()[series_starts],
+        "n_seasons": np.diff(np.append(np.searchsorted(starts, series_starts), len(starts))),
+        "n_episodes": np.diff(np.append(series_starts, len(rows))),
+        "within_season_slope": slope,
+    })
+
+
+def _percentile_interval(draws: np.ndarray, confidence: float):
+    """
+    Percentile interval and standard deviation of every column of `draws`,
+    ignoring NaN (degenerate resamples). Columns are sorted once and the
+    quantiles read off by position, instead of a nanquantile per column.
+    """
+    draws = np.sort(draws, axis=0)  # NaN sorts last
+    valid = (~np.isnan(draws)).sum(axis=0)
+
+    def quantile(q):
+        pos = q * (valid - 1)
+        lower = np.clip(np.floor(pos).astype(np.int64), 0, None)
+        upper = np.minimum(lower + 1, np.maximum(valid - 1, 0))
+        low_value = np.take_along_axis(draws, lower[None, :], axis=0)[0]
+        high_value = np.take_along_axis(draws, upper[None, :], axis=0)[0]
+        value = low_value + (pos - lower) * (high_value - low_value)
+        return np.where(valid > 0, value, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.nansum(draws, axis=0) / valid
+        se = np.sqrt(np.nansum((draws - mean) ** 2, axis=0) / (valid - 1))
+    alpha = (1 - confidence) / 2
+    return quantile(alpha), quantile(1 - alpha), np.where(valid > 1, se, np.nan)
+
+
+def _resample_slopes(x, y, starts, n_resamples, rng, block_size=BLOCK_SIZE) -> np.ndarray:
+    """
+    Pairs bootstrap slopes (n_resamples x segments) of every segment of
+    x/y (season numbers and ratings, centred per segment): each resample
+    draws, for every segment, as many rows as it has from within it. Blocks
+    of resamples are drawn as one index matrix.
+    """
+    size = np.diff(np.append(starts, len(x)))
+    offset = np.repeat(starts, size).astype(np.int32)
+    span = np.repeat(size, size)
+    per_block = max(1, block_size // max(len(x), 1))
+
+    slopes = np.empty((n_resamples, len(starts)))
+    for first in range(0, n_resamples, per_block):
+        block = min(per_block, n_resamples - first)
+        # float32 draws are twice as fast; the clip guards against rounding up to `span`
+        draw = (rng.random((block, len(x)), dtype=np.float32) * span.astype(np.float32)).astype(np.int32)
+        index = np.minimum(draw, span - 1, dtype=np.int32) + offset
+        xs, ys = x[index], y[index]
+        sx = np.add.reduceat(xs, starts, axis=1)
+        sy = np.add.reduceat(ys, starts, axis=1)
+        ssx = np.add.reduceat(xs * xs, starts, axis=1) - sx * sx / size
+        sxy = np.add.reduceat(xs * ys, starts, axis=1) - sx * sy / size
+        # season numbers are whole, so any resample with two distinct ones has
+        # ssx >= 1/2; below that it drew a single season and has no slope
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slopes[first:first + block] = np.where(ssx < 0.25, np.nan, sxy / ssx)
+    return slopes
+
+
+def _bootstrap_shard(x, y, starts, n_resamples, seeds, confidence):
+    """Bootstrap interval of every segment's slope; chunk i of SEED_SERIES segments draws from seeds[i]."""
+    ends = np.append(starts, len(x))
+    slopes = np.empty((n_resamples, len(starts)))
+    for chunk, seed in enumerate(seeds):
+        a, b = chunk * SEED_SERIES, min((chunk + 1) * SEED_SERIES, len(starts))
+        slopes[:, a:b] = _resample_slopes(
+            x[ends[a]:ends[b]], y[ends[a]:ends[b]], starts[a:b] - ends[a], n_resamples, np.random.default_rng(seed),
+        )
+    return _percentile_interval(slopes, confidence)
+
+
+def bootstrap_series_slopes(
+    seasons: pd.DataFrame,
+    min_seasons: int = MIN_SEASONS,
+    rating: str = "season_mean_rating",
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = CONFIDENCE,
+    seed: int = 42,
+    jobs: int = None,
+    shard_series: int = SHARD_SERIES,
+) -> pd.DataFrame:
+    """
+    Percentile bootstrap interval and standard error of every slope that
+    series_slopes fits: each series' seasons are resampled with replacement
+    `n_resamples` times and refitted. Every chunk of SEED_SERIES series
+    draws from its own seed spawned from `seed`. Shards of about
+    `shard_series` series (whole chunks) run in `jobs` worker processes
+    (jobs=1 stays in this process), so the result depends on neither.
+    """
+    rows, starts = _series_rows(seasons, rating, min_seasons)
+    if rows.empty:
+        return pd.DataFrame(columns=BOOTSTRAP_COLUMNS)
+
+    # centred per series: slopes are unchanged and the resampled sums stay small
+    x = rows["seasonNumber"].to_numpy(dtype=np.float64)
+    y = rows[rating].to_numpy(dtype=np.float64)
+    size = np.diff(np.append(starts, len(rows)))
+    series = np.repeat(np.arange(len(starts)), size)
+    x = x - (np.add.reduceat(x, starts) / size)[series]
+    y = y - (np.add.reduceat(y, starts) / size)[series]
+
+    chunks = -(-len(starts) // SEED_SERIES)
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    per_shard = max(1, round(shard_series / SEED_SERIES))
+    ends = np.append(starts, len(rows))
+    shards = []
+    for first in range(0, chunks, per_shard):
+        a, b = first * SEED_SERIES, min((first + per_shard) * SEED_SERIES, len(starts))
+        shards.append((x[ends[a]:ends[b]], y[ends[a]:ends[b]], starts[a:b] - ends[a],
+                       n_resamples, seeds[first:first + per_shard], confidence))
+    if jobs == 1 or len(shards) == 1:
+        results = [_bootstrap_shard(*shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_bootstrap_shard, *zip(*shards)))
+
+    low, high, se = (np.concatenate(parts) for parts in zip(*results))
+    return pd.DataFrame({
+        "series_tconst": rows["series_tconst"].to_numpy()[starts],
+        "slope_ci_low": low,
+        "slope_ci_high": high,
+        "slope_boot_se": se,
+    })
+
+
+def _row_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """OLS slope of every row of `y` on `x`, skipping NaN entries."""
+    valid = ~np.isnan(y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = np.where(valid, x, 0.0).sum(axis=1) / valid.sum(axis=1)
+        y_mean = np.where(valid, y, 0.0).sum(axis=1) / valid.sum(axis=1)
+        dx = np.where(valid, x - x_mean[:, None], 0.0)
+        dy = np.where(valid, y - y_mean[:, None], 0.0)
+        return (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+
+
+def bootstrap_global_trend(
+    seasons: pd.DataFrame,
+    min_series: int = MIN_SERIES_PER_SEASON,
+    rating: str = "season_mean_rating",
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = CONFIDENCE,
+    seed: int = 42,
+) -> dict:
+    """
+    global_trend's slope with a bootstrap interval. Whole series are
+    resampled with replacement (their seasons stay together) over the
+    seasons the full data makes eligible. Per-series season sums form a
+    series x season matrix, so the season means of a block of resamples are
+    two matrix products with the resample counts.
+    """
+    seasons = seasons.dropna(subset=["seasonNumber", rating])
+    global_df = global_by_season(seasons, rating)
+    trend = global_trend(global_df, min_series)
+    result = {"slope": trend["slope"], "slope_ci_low": np.nan, "slope_ci_high": np.nan, "slope_boot_se": np.nan}
+    eligible = global_df.loc[global_df["count_series"] >= min_series, "seasonNumber"].to_numpy()
+    if len(eligible) < 2:
+        return result
+
+    series_codes, series_index = pd.factorize(seasons["series_tconst"])
+    rows = seasons["seasonNumber"].isin(eligible).to_numpy()
+    season_codes = np.searchsorted(eligible, seasons["seasonNumber"].to_numpy()[rows])
+    n_series = len(series_index)
+    sums = np.zeros((n_series, len(eligible)))
+    counts = np.zeros((n_series, len(eligible)))
+    np.add.at(sums, (series_codes[rows], season_codes), seasons[rating].to_numpy(dtype=np.float64)[rows])
+    np.add.at(counts, (series_codes[rows], season_codes), 1.0)
+
+    rng = np.random.default_rng(seed)
+    x = eligible.astype(np.float64)
+    per_block = max(1, BLOCK_SIZE // n_series)
+    slopes = np.empty(n_resamples)
+    for first in range(0, n_resamples, per_block):
+        block = min(per_block, n_resamples - first)
+        # how often each series is drawn in each resample
+        draws = rng.integers(n_series, size=(block, n_series)) + n_series * np.arange(block)[:, None]
+        weight = np.bincount(draws.ravel(), minlength=block * n_series).reshape(block, n_series).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = (weight @ sums) / (weight @ counts)
+        slopes[first:first + block] = _row_slopes(x, means)
+
+    low, high, se = _percentile_interval(slopes[:, None], confidence)
+    result.update(slope_ci_low=float(low[0]), slope_ci_high=float(high[0]), slope_boot_se=float(se[0]))
+    return result
@@ -0,0 +1,612 @@
+"""
+derived.py
+
+Definitions of the derived tables that the notebooks used to build by hand
+(homepage_master, director_movies, genre_hybridity_master, ...), expressed so
+they can be built in full or recomputed for a subset of keys.
+
+Every SQL template contains one or more `{scope[<expr>]}` placeholders. For a
+full build they become TRUE; for an incremental refresh they become
+`<expr> IN (SELECT * FROM _affected_<table>)`, which restricts the query to the
+keys touched by the latest IMDb dump.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import date
+
+from imdb_trends.genres import GENRE_LIST_SQL, GENRES, genre_mask_sql, genre_names_sql
+
+# popularity is normalised by the number of years a title has been out
+REFERENCE_YEAR = date.today().year
+
+# minimum votes for an episode to count towards its season average
+MIN_EPISODE_VOTES = 20
+
+# directors need this many movies to appear in the Director Explorer
+MIN_DIRECTOR_MOVIES = 3
+
+# movies kept per director in director_top_movies
+DIRECTOR_TOP_N = 3
+
+# window of the rolling average in director_stats (the latest N films)
+ROLLING_FILMS = 5
+
+# genre combinations kept per (genre, hybridity_bucket) in genre_hybridity_combos
+HYBRIDITY_TOP_COMBOS = 3
+
+# genre_hybridity_master with one row per (title, genre it carries)
+HYBRIDITY_BY_GENRE = f"""
+    SELECT {GENRE_LIST_SQL}[g.bit + 1] AS genre, m.*
+    FROM genre_hybridity_master m, range({len(GENRES)}) AS g(bit)
+    WHERE m.genre_mask & (1::UINTEGER << g.bit) != 0
+"""
+
+# A dictionary over one akas column: codes are assigned by frequency, so the
+# common values get the smallest, and the counts double as the column's
+# histogram. Recomputing some values would renumber the others and break the
+# codes stored in akas_facts, so the dictionaries are never refreshed
+# incrementally; a full rebuild also rebuilds akas_facts, which depends on them.
+AKAS_DICTIONARY = """
+    SELECT
+        CAST(ROW_NUMBER() OVER (ORDER BY COUNT(*) DESC, {column}) - 1 AS USMALLINT) AS code,
+        {column},
+        COUNT(*) AS aka_count,
+        COUNT(DISTINCT titleId) AS title_count
+    FROM akas
+    WHERE {column} IS NOT NULL AND {{scope[{column}]}}
+    GROUP BY {column}
+"""
+
+
+@dataclass(frozen=True)
+class DerivedTable:
+    name: str
+    depends_on: tuple
+    key: tuple
+    sql: str
+    # keys whose rows may change, given the temp table changed_titles(tconst)
+    affected: str
+    # False: rebuilt in full whenever an input changes, never patched by key
+    incremental: bool = True
+
+    @property
+    def definition_hash(self) -> str:
+        text = "\n".join([self.sql, self.affected, ",".join(self.key), str(REFERENCE_YEAR)])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class Scope:
+    """Fills `{scope[expr]}` placeholders for a full or an incremental build."""
+
+    def __init__(self, table=None):
+        self.table = table
+
+    def __getitem__(self, expr):
+        if self.table is None:
+            return "TRUE"
+        return f"{expr} IN (SELECT * FROM _affected_{self.table})"
+
+
+def render(table: DerivedTable, incremental: bool = False) -> str:
+    return table.sql.format(scope=Scope(table.name if incremental else None))
+
+
+CHANGED_TITLES = "SELECT tconst FROM changed_titles"
+
+DERIVED_TABLES = [
+    DerivedTable(
+        name="homepage_master",
+        depends_on=("basics", "ratings", "crew", "principals"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql=f"""
+            WITH actor_agg AS (
+                SELECT tconst, string_agg(nconst, ',') AS actors
+                FROM principals
+                WHERE category IN ('actor', 'actress') AND {{scope[tconst]}}
+                GROUP BY tconst
+            )
+            SELECT
+                b.tconst,
+                b.titleType,
+                b.startYear,
+                b.genres,
+                {genre_mask_sql("b.genres")} AS genre_mask,
+                r.averageRating,
+                r.numVotes,
+                c.directors,
+                a.actors
+            FROM basics b
+            JOIN ratings r ON r.tconst = b.tconst
+            JOIN crew c ON c.tconst = b.tconst
+            JOIN actor_agg a ON a.tconst = b.tconst
+            WHERE {{scope[b.tconst]}}
+              AND c.directors IS NOT NULL AND c.directors != ''
+              AND b.titleType IS NOT NULL
+              AND b.startYear IS NOT NULL
+              AND b.genres IS NOT NULL
+              AND r.averageRating IS NOT NULL
+              AND r.numVotes IS NOT NULL
+        """,
+    ),
+    DerivedTable(
+        name="director_movies",
+        depends_on=("basics", "ratings", "crew", "names"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql="""
+            SELECT
+                b.tconst,
+                b.primaryTitle,
+                b.startYear,
+                r.averageRating,
+                r.numVotes,
+                b.runtimeMinutes,
+                n.primaryName AS director,
+                d.directorId
+            FROM basics b
+            JOIN ratings r ON b.tconst = r.tconst
+            JOIN (
+                SELECT tconst, unnest(string_split(directors, ',')) AS directorId
+                FROM crew
+                WHERE {scope[tconst]}
+            ) d ON b.tconst = d.tconst
+            JOIN names n ON d.directorId = n.nconst
+            WHERE b.titleType = 'movie' AND {scope[b.tconst]}
+        """,
+    ),
+    DerivedTable(
+        name="director_stats",
+        depends_on=("director_movies",),
+        key=("directorId",),
+        affected="""
+            SELECT DISTINCT directorId
+            FROM director_movies
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+        """,
+        # career aggregates in one pass: the window columns are computed per
+        # film in chronological order, then folded into one row per director
+        sql=f"""
+            WITH films AS (
+                SELECT
+                    directorId,
+                    director,
+                    startYear,
+                    averageRating,
+                    numVotes,
+                    AVG(averageRating) OVER (
+                        PARTITION BY directorId
+                        ORDER BY startYear NULLS FIRST, tconst
+                        ROWS BETWEEN {ROLLING_FILMS - 1} PRECEDING AND CURRENT ROW
+                    ) AS rolling_rating,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY directorId
+                        ORDER BY startYear NULLS FIRST, tconst
+                    ) AS film_number,
+                    startYear // 10 * 10 AS decade,
+                    AVG(averageRating) OVER (PARTITION BY directorId, startYear // 10) AS decade_rating
+                FROM director_movies
+                WHERE {{scope[directorId]}}
+            )
+            SELECT
+                directorId,
+                any_value(director) AS director,
+                COUNT(*) AS movie_count,
+                AVG(averageRating) AS avg_rating,
+                SUM(numVotes) AS total_votes,
+                SUM(averageRating * numVotes) / NULLIF(SUM(numVotes), 0) AS weighted_rating,
+                max_by(rolling_rating, film_number) AS rolling_rating,
+                MIN(startYear) AS first_year,
+                MAX(startYear) AS last_year,
+                MAX(startYear) - MIN(startYear) AS career_span,
+                stddev_samp(averageRating) AS rating_std,
+                arg_max(decade, decade_rating) FILTER (WHERE decade IS NOT NULL) AS peak_decade
+            FROM films
+            GROUP BY directorId
+        """,
+    ),
+    DerivedTable(
+        name="director_top_movies",
+        depends_on=("director_movies",),
+        key=("directorId",),
+        affected="""
+            SELECT DISTINCT directorId
+            FROM director_movies
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+        """,
+        sql=f"""
+            SELECT *
+            FROM (
+                SELECT
+                    directorId,
+                    CAST(ROW_NUMBER() OVER (
+                        PARTITION BY directorId
+                        ORDER BY averageRating DESC, numVotes DESC, tconst
+                    ) AS SMALLINT) AS rank,
+                    tconst,
+                    primaryTitle,
+                    averageRating,
+                    numVotes,
+                    runtimeMinutes
+                FROM director_movies
+                WHERE {{scope[directorId]}}
+            )
+            WHERE rank <= {DIRECTOR_TOP_N}
+        """,
+    ),
+    DerivedTable(
+        name="genre_hybridity_master",
+        depends_on=("basics", "ratings"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql=f"""
+            WITH movies AS (
+                SELECT
+                    tconst,
+                    startYear,
+                    genres,
+                    {genre_mask_sql("genres")} AS genre_mask
+                FROM basics
+                WHERE titleType = 'movie'
+                  AND startYear >= 1995
+                  AND genres IS NOT NULL AND genres != ''
+                  AND {{scope[tconst]}}
+            )
+            SELECT
+                m.tconst,
+                m.startYear,
+                m.genres,
+                m.genre_mask,
+                bit_count(m.genre_mask) AS genre_count,
+                CASE bit_count(m.genre_mask)
+                    WHEN 1 THEN 'Pure'
+                    WHEN 2 THEN 'Hybrid-2'
+                    ELSE 'Hybrid-3+'
+                END AS hybridity_bucket,
+                ROUND(r.averageRating, 3) AS averageRating,
+                r.numVotes,
+                ROUND(r.numVotes / greatest({REFERENCE_YEAR} - m.startYear + 1, 1), 2) AS votes_per_year
+            FROM movies m
+            JOIN ratings r USING (tconst)
+            WHERE r.averageRating IS NOT NULL AND r.numVotes IS NOT NULL
+        """,
+    ),
+    DerivedTable(
+        name="genre_hybridity_stats",
+        depends_on=("genre_hybridity_master",),
+        key=("genre", "hybridity_bucket"),
+        affected=f"""
+            SELECT DISTINCT genre, hybridity_bucket
+            FROM ({HYBRIDITY_BY_GENRE})
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+        """,
+        sql=f"""
+            SELECT
+                genre,
+                hybridity_bucket,
+                COUNT(*) AS movie_count,
+                MEDIAN(averageRating) AS median_rating,
+                MEDIAN(numVotes) AS median_votes,
+                MEDIAN(votes_per_year) AS median_votes_year,
+                STDDEV_SAMP(averageRating) AS rating_std
+            FROM ({HYBRIDITY_BY_GENRE})
+            WHERE {{scope[(genre, hybridity_bucket)]}}
+            GROUP BY genre, hybridity_bucket
+        """,
+    ),
+    DerivedTable(
+        name="genre_hybridity_combos",
+        depends_on=("genre_hybridity_master",),
+        key=("genre", "hybridity_bucket"),
+        affected=f"""
+            SELECT DISTINCT genre, hybridity_bucket
+            FROM ({HYBRIDITY_BY_GENRE})
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+        """,
+        sql=f"""
+            SELECT genre, hybridity_bucket, rank, genre_mask, genres, movie_count, avg_rating, avg_votes_year
+            FROM (
+                SELECT
+                    genre,
+                    hybridity_bucket,
+                    genre_mask,
+                    array_to_string({genre_names_sql("genre_mask")}, ',') AS genres,
+                    COUNT(*) AS movie_count,
+                    AVG(averageRating) AS avg_rating,
+                    AVG(votes_per_year) AS avg_votes_year,
+                    CAST(ROW_NUMBER() OVER (
+                        PARTITION BY genre, hybridity_bucket
+                        ORDER BY COUNT(*) DESC, genre_mask
+                    ) AS SMALLINT) AS rank
+                FROM ({HYBRIDITY_BY_GENRE})
+                WHERE {{scope[(genre, hybridity_bucket)]}}
+                GROUP BY genre, hybridity_bucket, genre_mask
+            )
+            WHERE rank <= {HYBRIDITY_TOP_COMBOS}
+        """,
+    ),
+    DerivedTable(
+        name="genre_movies",
+        depends_on=("basics", "ratings"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql="""
+            SELECT
+                b.tconst,
+                b.startYear,
+                TRIM(g.genre) AS genre,
+                r.averageRating,
+                r.numVotes
+            FROM basics b
+            JOIN ratings r USING (tconst)
+            CROSS JOIN UNNEST(string_split(b.genres, ',')) AS g(genre)
+            WHERE b.titleType = 'movie'
+              AND b.startYear >= 1995
+              AND b.genres IS NOT NULL AND b.genres != ''
+              AND r.averageRating IS NOT NULL AND r.numVotes IS NOT NULL
+              AND {scope[b.tconst]}
+        """,
+    ),
+    DerivedTable(
+        name="genre_year_stats",
+        depends_on=("genre_movies",),
+        key=("genre", "startYear"),
+        affected="""
+            SELECT DISTINCT genre, startYear
+            FROM genre_movies
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+        """,
+        sql="""
+            SELECT
+                genre,
+                startYear,
+                COUNT(*) AS movie_count,
+                MEDIAN(averageRating) AS median_rating,
+                quantile_cont(averageRating, 0.1) AS rating_p10,
+                quantile_cont(averageRating, 0.25) AS rating_p25,
+                quantile_cont(averageRating, 0.75) AS rating_p75,
+                quantile_cont(averageRating, 0.9) AS rating_p90,
+                AVG(averageRating) AS avg_rating,
+                MEDIAN(numVotes) AS median_votes,
+                quantile_cont(numVotes, 0.25) AS votes_p25,
+                quantile_cont(numVotes, 0.75) AS votes_p75,
+                SUM(numVotes) AS total_votes
+            FROM genre_movies
+            WHERE {scope[(genre, startYear)]}
+            GROUP BY genre, startYear
+        """,
+    ),
+    DerivedTable(
+        name="akas_regions",
+        depends_on=("akas",),
+        key=("region",),
+        affected="SELECT DISTINCT region FROM akas WHERE titleId IN (SELECT tconst FROM changed_titles)",
+        sql=AKAS_DICTIONARY.format(column="region"),
+        incremental=False,
+    ),
+    DerivedTable(
+        name="akas_languages",
+        depends_on=("akas",),
+        key=("language",),
+        affected="SELECT DISTINCT language FROM akas WHERE titleId IN (SELECT tconst FROM changed_titles)",
+        sql=AKAS_DICTIONARY.format(column="language"),
+        incremental=False,
+    ),
+    # one row per title with alternate titles: its region and language sets as
+    # sorted dictionary codes (akas_regions.code, akas_languages.code) and the
+    # flags the cross-cultural analyses filter on. original_region guesses the
+    # home market: the first regional release titled like the original, else
+    # the first regional release.
+    DerivedTable(
+        name="akas_facts",
+        depends_on=("akas", "akas_regions", "akas_languages"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql="""
+            WITH titles AS (
+                SELECT
+                    a.titleId AS tconst,
+                    list_sort(list_distinct(list(r.code))) AS regions,
+                    list_sort(list_distinct(list(l.code))) AS languages,
+                    COALESCE(bool_or(a.region = 'US'), FALSE) AS has_us_release,
+                    COALESCE(bool_or(a.language = 'en'), FALSE) AS has_english,
+                    any_value(a.title) FILTER (WHERE a.isOriginalTitle = 1) AS original_title,
+                    list(struct_pack(title := a.title, code := r.code) ORDER BY a.ordering)
+                        FILTER (WHERE r.code IS NOT NULL) AS releases
+                FROM akas a
+                LEFT JOIN akas_regions r ON a.region = r.region
+                LEFT JOIN akas_languages l ON a.language = l.language
+                WHERE {scope[a.titleId]}
+                GROUP BY a.titleId
+            )
+            SELECT
+                tconst,
+                CAST(len(regions) AS USMALLINT) AS region_count,
+                CAST(len(languages) AS USMALLINT) AS language_count,
+                has_us_release,
+                has_english,
+                COALESCE(list_filter(releases, x -> x.title = original_title)[1].code, releases[1].code)
+                    AS original_region,
+                CAST(regions AS USMALLINT[]) AS regions,
+                CAST(languages AS USMALLINT[]) AS languages
+            FROM titles
+        """,
+    ),
+    DerivedTable(
+        name="foreign_movies",
+        depends_on=("basics", "ratings", "akas_facts"),
+        key=("tconst",),
+        affected=CHANGED_TITLES,
+        sql=f"""
+            SELECT
+                b.tconst,
+                b.primaryTitle,
+                b.startYear,
+                b.runtimeMinutes,
+                b.genres,
+                {genre_mask_sql("b.genres")} AS genre_mask,
+                f.region_count,
+                f.language_count,
+                f.original_region,
+                r.numVotes,
+                r.averageRating
+            FROM basics b
+            JOIN akas_facts f ON b.tconst = f.tconst
+            JOIN ratings r ON b.tconst = r.tconst
+            WHERE b.titleType = 'movie'
+              AND NOT f.has_us_release
+              AND NOT f.has_english
+              AND {{scope[b.tconst]}}
+        """,
+    ),
+    # the plain season mean skips low-vote episodes; the vote-weighted mean uses
+    # every rated episode, since a handful of votes barely moves it
+    DerivedTable(
+        name="season_agg",
+        depends_on=("episode", "ratings"),
+        key=("series_tconst",),
+        affected="""
+            SELECT DISTINCT parentTconst
+            FROM episode
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+              AND parentTconst IS NOT NULL
+        """,
+        sql=f"""
+            SELECT
+                e.parentTconst AS series_tconst,
+                e.seasonNumber,
+                AVG(r.averageRating) FILTER (WHERE r.numVotes >= {MIN_EPISODE_VOTES}) AS season_mean_rating,
+                STDDEV_SAMP(r.averageRating) FILTER (WHERE r.numVotes >= {MIN_EPISODE_VOTES}) AS season_std_rating,
+                COUNT(*) FILTER (WHERE r.numVotes >= {MIN_EPISODE_VOTES}) AS season_count,
+                SUM(r.averageRating * r.numVotes) / SUM(r.numVotes) AS season_weighted_rating,
+                CAST(SUM(r.numVotes) AS BIGINT) AS season_votes
+            FROM episode e
+            JOIN ratings r ON e.tconst = r.tconst
+            WHERE e.parentTconst IS NOT NULL
+              AND e.seasonNumber IS NOT NULL
+              AND r.averageRating IS NOT NULL
+              AND r.numVotes > 0
+              AND {{scope[e.parentTconst]}}
+            GROUP BY e.parentTconst, e.seasonNumber
+        """,
+    ),
+    # career averages behind the classifier's director_score / cast_score. They
+    # count only titles with more than 100 votes, like the classifier rows, and
+    # every title type, so they are kept apart from director_stats (movies only)
+    DerivedTable(
+        name="director_career_scores",
+        depends_on=("crew", "ratings"),
+        key=("nconst",),
+        affected="""
+            SELECT DISTINCT split_part(directors, ',', 1)
+            FROM crew
+            WHERE tconst IN (SELECT tconst FROM changed_titles) AND directors IS NOT NULL
+        """,
+        sql="""
+            SELECT
+                split_part(c.directors, ',', 1) AS nconst,
+                AVG(r.averageRating) AS raw_avg,
+                COUNT(*) AS movie_count
+            FROM crew c
+            JOIN ratings r ON c.tconst = r.tconst
+            WHERE r.numVotes > 100
+              AND c.directors IS NOT NULL
+              AND {scope[split_part(c.directors, ',', 1)]}
+            GROUP BY 1
+        """,
+    ),
+    DerivedTable(
+        name="cast_career_scores",
+        depends_on=("principals", "ratings"),
+        key=("nconst",),
+        affected="""
+            SELECT DISTINCT nconst
+            FROM principals
+            WHERE tconst IN (SELECT tconst FROM changed_titles)
+              AND category IN ('actor', 'actress') AND ordering <= 4
+        """,
+        sql="""
+            SELECT
+                p.nconst,
+                AVG(r.averageRating) AS raw_avg,
+                COUNT(*) AS movie_count
+            FROM principals p
+            JOIN ratings r ON p.tconst = r.tconst
+            WHERE r.numVotes > 100
+              AND p.category IN ('actor', 'actress') AND p.ordering <= 4
+              AND {scope[p.nconst]}
+            GROUP BY p.nconst
+        """,
+    ),
+    DerivedTable(
+        name="classifier_features",
+        depends_on=("basics", "ratings", "akas_facts", "crew", "principals",
+                    "director_career_scores", "cast_career_scores"),
+        key=("tconst",),
+        # a changed rating moves the career average of everyone credited on it
+        affected="""
+            SELECT tconst FROM changed_titles
+            UNION
+            SELECT tconst FROM crew
+            WHERE split_part(directors, ',', 1) IN (SELECT * FROM _affected_director_career_scores)
+            UNION
+            SELECT tconst FROM principals
+            WHERE nconst IN (SELECT * FROM _affected_cast_career_scores)
+              AND category IN ('actor', 'actress') AND ordering <= 4
+        """,
+        sql=f"""
+            WITH director_scores AS (
+                SELECT
+                    c.tconst,
+                    CASE WHEN d.movie_count > 1 THEN d.raw_avg ELSE 6.0 END AS director_score
+                FROM crew c
+                JOIN director_career_scores d ON split_part(c.directors, ',', 1) = d.nconst
+                WHERE {{scope[c.tconst]}}
+            ),
+            cast_scores AS (
+                SELECT
+                    p.tconst,
+                    AVG(CASE WHEN s.movie_count > 1 THEN s.raw_avg ELSE 6.0 END) AS cast_score
+                FROM principals p
+                JOIN cast_career_scores s ON p.nconst = s.nconst
+                WHERE p.category IN ('actor', 'actress') AND p.ordering <= 4
+                  AND {{scope[p.tconst]}}
+                GROUP BY p.tconst
+            )
+            SELECT
+                b.tconst, b.titleType, b.isAdult, b.startYear, b.genres,
+                {genre_mask_sql("b.genres")} AS genre_mask, b.runtimeMinutes,
+                r.averageRating, r.numVotes,
+                COALESCE(CAST(u.has_us_release AS INTEGER), 0) AS is_US_production,
+                COALESCE(ds.director_score, 6.0) AS director_score,
+                COALESCE(cs.cast_score, 6.0) AS cast_score
+            FROM basics b
+            JOIN ratings r ON b.tconst = r.tconst
+            LEFT JOIN akas_facts u ON b.tconst = u.tconst
+            LEFT JOIN director_scores ds ON b.tconst = ds.tconst
+            LEFT JOIN cast_scores cs ON b.tconst = cs.tconst
+            WHERE b.startYear >= 1990
+              AND r.numVotes > 100
+              AND b.titleType IN ('movie', 'tvSeries', 'tvMovie')
+              AND {{scope[b.tconst]}}
+        """,
+    ),
+]
+
+# Cheap layers on top of the derived tables, recreated after every refresh.
+DERIVED_VIEWS = {
+    "director_movies_filter": f"""
+        SELECT d.director, d.primaryTitle, d.averageRating, d.numVotes
+        FROM director_movies d
+        JOIN director_stats s ON d.directorId = s.directorId
+        WHERE s.movie_count >= {MIN_DIRECTOR_MOVIES}
+    """,
+    "foreign_labeled": """
+        SELECT
+            f.*,
+            CASE WHEN f.numVotes >= t.threshold THEN 1 ELSE 0 END AS crossover_flag
+        FROM foreign_movies f,
+             (SELECT quantile_cont(numVotes, 0.9) AS threshold FROM foreign_movies) t
+    """,
+}
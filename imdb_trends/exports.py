@@ -0,0 +1,293 @@
+"""
+exports.py
+
+Write the compact, typed Parquet artifacts that the Streamlit dashboard reads
+from streamlit_app/data/. Everything is exported from the warehouse, so run
+`python -m imdb_trends.refresh` first.
+
+Usage:
+  python -m imdb_trends.exports                     # export every dashboard dataset
+  python -m imdb_trends.exports homepage
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from imdb_trends.autocomplete import PICKER_SIZE, write_autocomplete
+from imdb_trends.crossover import export_crossover
+from imdb_trends.cube import export_homepage_cube
+from imdb_trends.decay import (
+    MIN_SEASONS,
+    bootstrap_global_trend,
+    bootstrap_series_slopes,
+    global_by_season,
+    load_seasons,
+    series_slopes,
+)
+from imdb_trends.derived import MIN_DIRECTOR_MOVIES
+from imdb_trends.parquet import copy_to_parquet
+from imdb_trends.paths import APP_DATA_DIR, WAREHOUSE_PATH
+from imdb_trends.warehouse import connect
+
+
+def export_homepage(con, out_dir: Path = APP_DATA_DIR):
+    """
+    homepage_master with genres/directors/actors as native lists, plus the
+    genre bitmask. titleType is cast to an ENUM so it is stored
+    dictionary-encoded, and rows are ordered by year so the year slider can
+    skip whole row groups.
+    """
+    title_types = [t for (t,) in con.execute(
+        "SELECT DISTINCT titleType FROM homepage_master ORDER BY titleType"
+    ).fetchall()]
+    enum = "ENUM(" + ", ".join("'" + t.replace("'", "''") + "'" for t in title_types) + ")"
+    copy_to_parquet(con, f"""
+        SELECT
+            tconst,
+            CAST(titleType AS {enum}) AS titleType,
+            CAST(startYear AS SMALLINT) AS startYear,
+            string_split(genres, ',') AS genres,
+            genre_mask,
+            averageRating,
+            numVotes,
+            string_split(directors, ',') AS directors,
+            string_split(actors, ',') AS actors
+        FROM homepage_master
+        ORDER BY startYear, tconst
+    """, Path(out_dir) / "homepage_master.parquet")
+
+
+def export_genre_hybridity(con, out_dir: Path = APP_DATA_DIR):
+    """
+    The Genre Hybridity Explorer's precomputed aggregates: stats per (genre,
+    hybridity_bucket) and the top genre combinations in each, so switching
+    genres is a lookup into a few hundred rows.
+    """
+    out_dir = Path(out_dir)
+    copy_to_parquet(con, """
+        SELECT
+            genre,
+            hybridity_bucket,
+            movie_count,
+            ROUND(median_rating, 3) AS median_rating,
+            ROUND(median_votes) AS median_votes,
+            ROUND(median_votes_year, 2) AS median_votes_year,
+            ROUND(rating_std, 3) AS rating_std
+        FROM genre_hybridity_stats
+        ORDER BY genre, hybridity_bucket
+    """, out_dir / "genre_hybridity_stats.parquet")
+    copy_to_parquet(con, """
+        SELECT
+            genre,
+            hybridity_bucket,
+            rank,
+            genres,
+            movie_count,
+            ROUND(avg_rating, 2) AS avg_rating,
+            ROUND(avg_votes_year, 2) AS avg_votes_year
+        FROM genre_hybridity_combos
+        ORDER BY genre, hybridity_bucket, rank
+    """, out_dir / "genre_hybridity_combos.parquet")
+
+
+def export_genre_years(con, out_dir: Path = APP_DATA_DIR):
+    """
+    Movie Genre Analysis: exact per-(genre, year) medians, quantiles and
+    counts over every rated movie since 1995, plus an overview of the same
+    titles: one row per genre and a row with a NULL genre for all of them
+    (each counted once, however many genres it has).
+    """
+    out_dir = Path(out_dir)
+    copy_to_parquet(con, """
+        SELECT
+            genre,
+            CAST(startYear AS SMALLINT) AS startYear,
+            movie_count,
+            ROUND(median_rating, 2) AS median_rating,
+            ROUND(rating_p10, 2) AS rating_p10,
+            ROUND(rating_p25, 2) AS rating_p25,
+            ROUND(rating_p75, 2) AS rating_p75,
+            ROUND(rating_p90, 2) AS rating_p90,
+            ROUND(avg_rating, 2) AS avg_rating,
+            ROUND(median_votes, 2) AS median_votes,
+            ROUND(votes_p25, 2) AS votes_p25,
+            ROUND(votes_p75, 2) AS votes_p75,
+            CAST(total_votes AS BIGINT) AS total_votes
+        FROM genre_year_stats
+        ORDER BY genre, startYear
+    """, out_dir / "genre_year_stats.parquet")
+    copy_to_parquet(con, """
+        SELECT
+            NULL::VARCHAR AS genre,
+            COUNT(*) AS movie_count,
+            MEDIAN(averageRating) AS median_rating,
+            MEDIAN(numVotes) AS median_votes
+        FROM (SELECT DISTINCT tconst, averageRating, numVotes FROM genre_movies)
+        UNION ALL
+        SELECT genre, COUNT(*), MEDIAN(averageRating), MEDIAN(numVotes)
+        FROM genre_movies
+        GROUP BY genre
+        ORDER BY genre NULLS FIRST
+    """, out_dir / "genre_overview.parquet")
+
+
+# director picker rankings: index name -> director_stats column
+DIRECTOR_SEARCH_ORDERS = {
+    "votes": "total_votes",
+    "movies": "movie_count",
+}
+
+
+def export_directors(con, out_dir: Path = APP_DATA_DIR):
+    """
+    The Director Explorer's dimension (one row per director with enough
+    movies, in name order), the per-director top movies, clustered by
+    directorId so a selection reads one contiguous run of rows, and the
+    name indexes behind the searchable director picker.
+    """
+    out_dir = Path(out_dir)
+    copy_to_parquet(con, f"""
+        SELECT
+            directorId, director, movie_count, avg_rating, total_votes,
+            weighted_rating, rolling_rating, first_year, last_year, career_span,
+            rating_std, peak_decade
+        FROM director_stats
+        WHERE movie_count >= {MIN_DIRECTOR_MOVIES}
+        ORDER BY director, directorId
+    """, out_dir / "director_dim.parquet")
+    copy_to_parquet(con, f"""
+        SELECT t.*
+        FROM director_top_movies t
+        JOIN director_stats s USING (directorId)
+        WHERE s.movie_count >= {MIN_DIRECTOR_MOVIES}
+        ORDER BY t.directorId, t.rank
+    """, out_dir / "director_top_movies.parquet")
+
+    # name lookup for the director picker, one index per sort order
+    for order, column in DIRECTOR_SEARCH_ORDERS.items():
+        suggestions = con.execute(f"""
+            SELECT director AS label, 'director' AS kind, {column} AS votes, directorId AS ref
+            FROM director_stats
+            WHERE movie_count >= {MIN_DIRECTOR_MOVIES} AND director IS NOT NULL
+            ORDER BY {column} DESC, director, directorId
+        """).df()
+        write_autocomplete(suggestions, out_dir / "director_search" / order, top_k=PICKER_SIZE)
+
+
+def export_rating_decay(con, out_dir: Path = APP_DATA_DIR):
+    """
+    The TV Rating Decay page's store: season means per series, clustered by
+    series_tconst, one row per series with its fitted trend and bootstrap
+    interval, the cross-series mean per season, the global trend with its
+    interval, and a name index over series titles for the show picker.
+    """
+    out_dir = Path(out_dir)
+    seasons = load_seasons(con)
+    slopes = series_slopes(seasons, MIN_SEASONS).merge(
+        bootstrap_series_slopes(seasons, MIN_SEASONS), on="series_tconst", how="left"
+    )
+    con.register("_decay_slopes", slopes)
+    con.register("_decay_global", global_by_season(seasons))
+    con.register("_decay_trend", pd.DataFrame([bootstrap_global_trend(seasons)]))
+
+    copy_to_parquet(con, """
+        SELECT
+            series_tconst,
+            CAST(seasonNumber AS SMALLINT) AS seasonNumber,
+            ROUND(season_mean_rating, 3) AS season_mean_rating,
+            ROUND(season_std_rating, 3) AS season_std_rating,
+            CAST(season_count AS INTEGER) AS season_count
+        FROM season_agg
+        WHERE season_count > 0
+        ORDER BY series_tconst, seasonNumber
+    """, out_dir / "decay_seasons.parquet")
+    copy_to_parquet(con, """
+        SELECT
+            s.series_tconst,
+            b.primaryTitle AS series_title,
+            b.startYear,
+            b.endYear,
+            CAST(COUNT(*) AS SMALLINT) AS n_seasons,
+            CAST(SUM(s.season_count) AS INTEGER) AS episode_count,
+            COALESCE(r.numVotes, 0) AS numVotes,
+            ANY_VALUE(d.slope) AS slope,
+            ANY_VALUE(d.intercept) AS intercept,
+            ANY_VALUE(d.r) AS r,
+            ANY_VALUE(d.pval) AS pval,
+            ANY_VALUE(d.stderr) AS stderr,
+            ANY_VALUE(d.slope_ci_low) AS slope_ci_low,
+            ANY_VALUE(d.slope_ci_high) AS slope_ci_high
+        FROM season_agg s
+        LEFT JOIN basics b ON s.series_tconst = b.tconst
+        LEFT JOIN ratings r ON s.series_tconst = r.tconst
+        LEFT JOIN _decay_slopes d ON s.series_tconst = d.series_tconst
+        WHERE s.season_count > 0
+        GROUP BY ALL
+        ORDER BY s.series_tconst
+    """, out_dir / "decay_series.parquet")
+    copy_to_parquet(con, """
+        SELECT
+            CAST(seasonNumber AS SMALLINT) AS seasonNumber,
+            mean_of_season_means,
+            std_of_season_means,
+            count_series,
+            sem
+        FROM _decay_global
+        ORDER BY seasonNumber
+    """, out_dir / "decay_global.parquet")
+    copy_to_parquet(con, """
+        SELECT slope, slope_ci_low, slope_ci_high, slope_boot_se
+        FROM _decay_trend
+    """, out_dir / "decay_trend.parquet")
+    con.unregister("_decay_slopes")
+    con.unregister("_decay_global")
+    con.unregister("_decay_trend")
+
+    # show picker: titles with their first year, ranked by the series' own votes
+    suggestions = con.execute("""
+        SELECT
+            b.primaryTitle || COALESCE(' (' || b.startYear || ')', '') AS label,
+            'title' AS kind,
+            COALESCE(r.numVotes, 0) AS votes,
+            s.series_tconst AS ref
+        FROM (SELECT DISTINCT series_tconst FROM season_agg WHERE season_count > 0) s
+        JOIN basics b ON s.series_tconst = b.tconst
+        LEFT JOIN ratings r ON s.series_tconst = r.tconst
+        WHERE b.primaryTitle IS NOT NULL
+        ORDER BY votes DESC, label, ref
+    """).df()
+    write_autocomplete(suggestions, out_dir / "decay_search", top_k=PICKER_SIZE)
+
+
+EXPORTS = {
+    "homepage": export_homepage,
+    "homepage_cube": export_homepage_cube,
+    "directors": export_directors,
+    "genre_hybridity": export_genre_hybridity,
+    "genre_years": export_genre_years,
+    "rating_decay": export_rating_decay,
+    "crossover": export_crossover,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export dashboard datasets from the warehouse.")
+    parser.add_argument("datasets", nargs="*", help=f"datasets to export: {', '.join(EXPORTS)} (default: all)")
+    parser.add_argument("--db", type=Path, default=WAREHOUSE_PATH, help="warehouse to export from")
+    parser.add_argument("--out-dir", type=Path, default=APP_DATA_DIR, help="destination directory")
+    args = parser.parse_args(argv)
+    unknown = set(args.datasets) - set(EXPORTS)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+
+    con = connect(db_path=args.db)
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    for name in args.datasets or EXPORTS:
+        EXPORTS[name](con, args.out_dir)
+        print(f"exported {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+genres.py
+
+The shared genre vocabulary. IMDb uses fewer than 32 genres, so a title's
+genre set is stored as a UINTEGER bitmask (`genre_mask`) where bit i stands
+for GENRES[i]. Filtering, counting and grouping by genre then become integer
+operations instead of string scans:
+
+  genre_mask & $mask != 0        -- has any of the selected genres
+  genre_mask & $mask = $mask     -- has all of them
+  bit_count(genre_mask)          -- number of genres (hybridity)
+
+`genre_mask_sql` builds the mask from a comma-joined `genres` column inside
+DuckDB; `encode` and `decode` convert between masks and names in Python, and
+`unpack` turns a column of masks into one 0/1 indicator column per genre.
+"""
+
+import numpy as np
+
+GENRES = (
+    "Action", "Adult", "Adventure", "Animation", "Biography", "Comedy",
+    "Crime", "Documentary", "Drama", "Family", "Fantasy", "Film-Noir",
+    "Game-Show", "History", "Horror", "Music", "Musical", "Mystery", "News",
+    "Reality-TV", "Romance", "Sci-Fi", "Short", "Sport", "Talk-Show",
+    "Thriller", "War", "Western",
+)
+
+GENRE_BITS = {genre: 1 << i for i, genre in enumerate(GENRES)}
+
+# the vocabulary as a DuckDB list literal, in bit order
+GENRE_LIST_SQL = "[" + ", ".join(f"'{genre}'" for genre in GENRES) + "]"
+
+
+def genre_mask_sql(column: str) -> str:
+    """SQL expression for the UINTEGER genre mask of a comma-joined genres column."""
+    bits = (
+        f"list_transform(string_split({column}, ','), "
+        f"g -> 1::UINTEGER << (list_position({GENRE_LIST_SQL}, trim(g)) - 1))"
+    )
+    return f"CAST(COALESCE(list_aggregate({bits}, 'bit_or'), 0) AS UINTEGER)"
+
+
+def genre_names_sql(mask: str) -> str:
+    """SQL expression listing the genre names set in `mask`, in vocabulary order."""
+    return f"list_filter({GENRE_LIST_SQL}, (g, i) -> {mask} & (1::UINTEGER << (i - 1)) != 0)"
+
+
+def encode(genres) -> int:
+    """Mask of an iterable of genre names; unknown names are ignored."""
+    mask = 0
+    for genre in genres:
+        mask |= GENRE_BITS.get(genre, 0)
+    return mask
+
+
+def decode(mask: int) -> list:
+    """Genre names set in `mask`, in vocabulary order."""
+    return [genre for genre, bit in GENRE_BITS.items() if mask & bit]
+
+
+def unpack(masks) -> np.ndarray:
+    """(len(masks), len(GENRES)) uint8 matrix with a 1 for every genre set in each mask."""
+    masks = np.asarray(masks, dtype=np.uint32)
+    return ((masks[:, None] >> np.arange(len(GENRES), dtype=np.uint32)) & 1).astype(np.uint8)
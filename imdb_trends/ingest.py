@@ -0,0 +1,218 @@
+"""
+ingest.py
+
+Convert the raw IMDb TSV dumps into typed, zstd-compressed Parquet files under
+data/processed/. Each file is parsed exactly once; later runs skip any file
+whose source checksum has not changed since the last conversion.
+
+Usage:
+  python -m imdb_trends.ingest                      # convert every raw file found
+  python -m imdb_trends.ingest title.basics title.ratings
+  python -m imdb_trends.ingest --raw-dir /path/to/kaggle/download --force
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import duckdb
+
+from imdb_trends.parquet import copy_to_parquet
+from imdb_trends.paths import PROCESSED_DIR, RAW_DIR
+
+MANIFEST_NAME = "ingest_manifest.json"
+
+# Column types for every IMDb file. The raw TSVs are read as VARCHAR and cast
+# here once, so nothing downstream has to guess types again.
+IMDB_FILES = {
+    "title.basics": {
+        "tconst": "VARCHAR",
+        "titleType": "VARCHAR",
+        "primaryTitle": "VARCHAR",
+        "originalTitle": "VARCHAR",
+        "isAdult": "TINYINT",
+        "startYear": "SMALLINT",
+        "endYear": "SMALLINT",
+        "runtimeMinutes": "INTEGER",
+        "genres": "VARCHAR",
+    },
+    "title.ratings": {
+        "tconst": "VARCHAR",
+        "averageRating": "DOUBLE",
+        "numVotes": "INTEGER",
+    },
+    "title.crew": {
+        "tconst": "VARCHAR",
+        "directors": "VARCHAR",
+        "writers": "VARCHAR",
+    },
+    "title.principals": {
+        "tconst": "VARCHAR",
+        "ordering": "INTEGER",
+        "nconst": "VARCHAR",
+        "category": "VARCHAR",
+        "job": "VARCHAR",
+        "characters": "VARCHAR",
+    },
+    "title.akas": {
+        "titleId": "VARCHAR",
+        "ordering": "INTEGER",
+        "title": "VARCHAR",
+        "region": "VARCHAR",
+        "language": "VARCHAR",
+        "types": "VARCHAR",
+        "attributes": "VARCHAR",
+        "isOriginalTitle": "TINYINT",
+    },
+    "title.episode": {
+        "tconst": "VARCHAR",
+        "parentTconst": "VARCHAR",
+        "seasonNumber": "INTEGER",
+        "episodeNumber": "INTEGER",
+    },
+    "name.basics": {
+        "nconst": "VARCHAR",
+        "primaryName": "VARCHAR",
+        "birthYear": "SMALLINT",
+        "deathYear": "SMALLINT",
+        "primaryProfession": "VARCHAR",
+        "knownForTitles": "VARCHAR",
+    },
+}
+
+
+def parquet_path(name: str, out_dir: Path = PROCESSED_DIR) -> Path:
+    """Location of the processed Parquet file for an IMDb dump, e.g. title.basics."""
+    return Path(out_dir) / f"{name.replace('.', '_')}.parquet"
+
+
+def find_raw_file(name: str, raw_dir: Path = RAW_DIR):
+    """Return the raw .tsv or .tsv.gz file for `name`, or None if it is missing."""
+    for suffix in (".tsv", ".tsv.gz"):
+        candidate = Path(raw_dir) / f"{name}{suffix}"
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def file_checksum(fp: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(fp, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(out_dir: Path = PROCESSED_DIR) -> dict:
+    fp = Path(out_dir) / MANIFEST_NAME
+    if not fp.exists():
+        return {}
+    return json.loads(fp.read_text(encoding="utf-8"))
+
+
+def save_manifest(manifest: dict, out_dir: Path = PROCESSED_DIR):
+    fp = Path(out_dir) / MANIFEST_NAME
+    fp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def source_fingerprint(src: Path, previous: dict) -> dict:
+    """
+    Fingerprint a raw file. Hashing a multi-GB dump takes a few seconds, so the
+    stored checksum is reused when size and mtime are unchanged.
+    """
+    stat = src.stat()
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        checksum = previous["sha256"]
+    else:
+        checksum = file_checksum(src)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": checksum}
+
+
+def convert_to_parquet(src: Path, dest: Path, columns: dict, con=None):
+    """Parse one raw TSV with explicit types and write it as zstd Parquet."""
+    con = con or duckdb.connect()
+    casts = ",\n            ".join(
+        f'"{col}"' if col_type == "VARCHAR" else f'TRY_CAST("{col}" AS {col_type}) AS "{col}"'
+        for col, col_type in columns.items()
+    )
+    copy_to_parquet(con, f"""
+        SELECT
+            {casts}
+        FROM read_csv(
+            '{src}',
+            delim='\t',
+            header=true,
+            quote='',
+            escape='',
+            nullstr='\\N',
+            all_varchar=true
+        )
+    """, dest)
+
+
+def ingest(names=None, raw_dir: Path = RAW_DIR, out_dir: Path = PROCESSED_DIR, force: bool = False) -> dict:
+    """
+    Convert the requested IMDb files (all seven by default) to Parquet.
+
+    Returns a mapping of file name to one of "converted", "skipped" or "missing".
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    con = duckdb.connect()
+    status = {}
+
+    for name in names or IMDB_FILES:
+        if name not in IMDB_FILES:
+            raise ValueError(f"Unknown IMDb file: {name}")
+
+        src = find_raw_file(name, raw_dir)
+        if src is None:
+            status[name] = "missing"
+            continue
+
+        dest = parquet_path(name, out_dir)
+        fingerprint = source_fingerprint(src, manifest.get(name, {}).get("source"))
+        previous = manifest.get(name, {})
+
+        if not force and dest.exists() and previous.get("source", {}).get("sha256") == fingerprint["sha256"]:
+            # keep the cached size/mtime current so the next run avoids rehashing
+            previous["source"] = fingerprint
+            status[name] = "skipped"
+            continue
+
+        start = time.perf_counter()
+        convert_to_parquet(src, dest, IMDB_FILES[name], con)
+        rows = con.execute(f"SELECT COUNT(*) FROM read_parquet('{dest}')").fetchone()[0]
+
+        manifest[name] = {
+            "source": fingerprint,
+            "source_path": str(src),
+            "parquet": dest.name,
+            "rows": rows,
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+        save_manifest(manifest, out_dir)
+        status[name] = "converted"
+
+    save_manifest(manifest, out_dir)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert raw IMDb TSV dumps to typed Parquet.")
+    parser.add_argument("files", nargs="*", help="IMDb files to convert, e.g. title.basics (default: all)")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory holding the raw .tsv/.tsv.gz files")
+    parser.add_argument("--out-dir", type=Path, default=PROCESSED_DIR, help="directory for the Parquet output")
+    parser.add_argument("--force", action="store_true", help="reconvert even if the source is unchanged")
+    args = parser.parse_args(argv)
+
+    status = ingest(args.files or None, raw_dir=args.raw_dir, out_dir=args.out_dir, force=args.force)
+    for name, state in status.items():
+        print(f"{name:<18} {state}")
+
+
+if __name__ == "__main__":
+    main()
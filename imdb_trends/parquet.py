@@ -0,0 +1,22 @@
+"""
+Shared helper for writing query results as Parquet.
+"""
+
+from pathlib import Path
+
+ROW_GROUP_SIZE = 122_880
+
+
+def copy_to_parquet(con, query: str, dest: Path, row_group_size: int = ROW_GROUP_SIZE):
+    """
+    Write the result of `query` as zstd Parquet. The file is written next to
+    `dest` first and only moved into place once it is complete.
+    """
+    dest = Path(dest)
+    tmp = dest.with_suffix(".parquet.tmp")
+    con.execute(f"""
+        COPY ({query})
+        TO '{tmp}'
+        (FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {row_group_size})
+    """)
+    tmp.replace(dest)
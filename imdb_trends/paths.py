@@ -0,0 +1,18 @@
+"""
+Filesystem locations used across the pipeline.
+
+Everything is resolved relative to the repository root so the modules work the
+same from the CLI, from notebooks and from the Streamlit app.
+"""
+
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+RAW_DIR = REPO_ROOT / "data" / "raw"
+PROCESSED_DIR = REPO_ROOT / "data" / "processed"
+
+WAREHOUSE_PATH = PROCESSED_DIR / "imdb.duckdb"
+
+# compact artifacts shipped with the Streamlit dashboard
+APP_DATA_DIR = REPO_ROOT / "streamlit_app" / "data"
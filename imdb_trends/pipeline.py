@@ -0,0 +1,345 @@
+"""
+pipeline.py
+
+The whole ETL as one dependency graph: ingest the raw dumps, refresh the
+warehouse, then write every dashboard export and analysis sample. Each stage
+declares the files it reads and writes; a stage depends on whichever stages
+write its inputs, and independent stages run side by side in a process pool.
+
+A stage is skipped when its inputs (size and mtime) and its definition are
+unchanged since its last successful run and all its outputs exist. An
+export's or sample's definition includes the source of the code it runs, so
+editing that code reruns it. Every run
+records per-stage status, wall time and peak RSS in
+data/processed/pipeline_state.json.
+
+Usage:
+  python -m imdb_trends.pipeline                    # run whatever is out of date
+  python -m imdb_trends.pipeline export:homepage    # one stage and what it needs
+  python -m imdb_trends.pipeline --jobs 4 --force
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+
+from imdb_trends.derived import DERIVED_TABLES
+from imdb_trends.exports import EXPORTS
+from imdb_trends.ingest import IMDB_FILES, find_raw_file, ingest, parquet_path
+from imdb_trends.parquet import copy_to_parquet
+from imdb_trends.paths import APP_DATA_DIR, PROCESSED_DIR, RAW_DIR, WAREHOUSE_PATH
+from imdb_trends.refresh import refresh
+from imdb_trends.sampling import stratified_sample
+from imdb_trends.warehouse import SCHEMA_VERSION, connect
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STATE_NAME = "pipeline_state.json"
+
+# analysis samples are written under data/processed/<SAMPLES_DIR>/
+SAMPLES_DIR = "samples"
+
+SAMPLE_SIZE = 100_000
+
+# files each dashboard export writes under the app data directory
+EXPORT_OUTPUTS = {
+    "homepage": ("homepage_master.parquet",),
+    "homepage_cube": ("homepage_cube.parquet", "homepage_sketches.parquet"),
+    "directors": ("director_dim.parquet", "director_top_movies.parquet", "director_search"),
+    "genre_hybridity": ("genre_hybridity_stats.parquet", "genre_hybridity_combos.parquet"),
+    "genre_years": ("genre_year_stats.parquet", "genre_overview.parquet"),
+    "rating_decay": (
+        "decay_seasons.parquet", "decay_series.parquet", "decay_global.parquet", "decay_trend.parquet", "decay_search",
+    ),
+    "crossover": ("crossover_votes.parquet",),
+}
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: callable  # picklable: a module-level function, or a partial of one
+    inputs: tuple
+    outputs: tuple
+    # anything besides the input files that changes the result, e.g. SQL hashes
+    params: tuple = field(default=())
+
+
+def code_version(function) -> str:
+    """
+    Hash of the source of the module defining `function` and of every
+    imdb_trends module it imports, directly or not.
+    """
+    sources, pending = {}, [function.__module__]
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+        module = sys.modules[name]
+        sources[name] = inspect.getsource(module)
+        for value in vars(module).values():
+            used = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(used, str) and used.split(".")[0] == "imdb_trends":
+                pending.append(used)
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(f"{name}\n{sources[name]}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def run_export(name: str, db_path: Path, out_dir: Path):
+    con = connect(db_path=db_path)
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    EXPORTS[name](con, out_dir)
+    con.close()
+
+
+def write_sample(db_path: Path, query: str, strata: list, key: str, dest: Path, n: int = SAMPLE_SIZE):
+    """Stratified sample of a warehouse query, written as Parquet."""
+    con = connect(db_path=db_path)
+    sample = stratified_sample(con, query, strata, n, key=key)
+    Path(dest).parent.mkdir(parents=True, exist_ok=True)
+    con.register("_sample", sample)
+    copy_to_parquet(con, "SELECT * FROM _sample", dest)
+    con.close()
+
+
+# analysis samples: name -> (query, strata, sample key)
+SAMPLES = {
+    "genre_movies": (
+        "SELECT * FROM genre_movies",
+        ["genre"],
+        "tconst || genre",
+    ),
+    "classifier": (
+        """
+        SELECT
+            *,
+            CASE WHEN averageRating <= 3.0 THEN 0 WHEN averageRating < 7.0 THEN 1 ELSE 2 END AS rating_class
+        FROM classifier_features
+        """,
+        ["titleType", "rating_class"],
+        "tconst",
+    ),
+}
+
+
+def build_stages(
+    raw_dir: Path = RAW_DIR,
+    processed_dir: Path = PROCESSED_DIR,
+    db_path: Path = WAREHOUSE_PATH,
+    app_dir: Path = APP_DATA_DIR,
+) -> list:
+    """The pipeline's stages for the given locations, upstream stages first."""
+    raw_files = {name: find_raw_file(name, raw_dir) for name in IMDB_FILES}
+    present = [name for name, src in raw_files.items() if src is not None]
+    processed = tuple(parquet_path(name, processed_dir) for name in present)
+
+    # ingest keeps one manifest for all files, so it is a single stage
+    stages = [
+        Stage(
+            name="ingest",
+            run=partial(ingest, raw_dir=raw_dir, out_dir=processed_dir),
+            inputs=tuple(raw_files[name] for name in present),
+            outputs=processed,
+        ),
+        Stage(
+            name="refresh",
+            run=partial(refresh, processed_dir, db_path),
+            inputs=processed,
+            outputs=(Path(db_path),),
+            params=(SCHEMA_VERSION, *(t.definition_hash for t in DERIVED_TABLES)),
+        ),
+    ]
+    for name, files in EXPORT_OUTPUTS.items():
+        stages.append(Stage(
+            name=f"export:{name}",
+            run=partial(run_export, name, db_path, app_dir),
+            inputs=(Path(db_path),),
+            outputs=tuple(Path(app_dir) / f for f in files),
+            params=(code_version(EXPORTS[name]),),
+        ))
+    samples_dir = Path(processed_dir) / SAMPLES_DIR
+    for name, (query, strata, key) in SAMPLES.items():
+        stages.append(Stage(
+            name=f"sample:{name}",
+            run=partial(write_sample, db_path, query, strata, key, samples_dir / f"{name}.parquet"),
+            inputs=(Path(db_path),),
+            outputs=(samples_dir / f"{name}.parquet",),
+            params=(query, tuple(strata), key, SAMPLE_SIZE, code_version(stratified_sample)),
+        ))
+    return stages
+
+
+def dependencies(stages: list) -> dict:
+    """Map each stage name to the stages that write one of its inputs."""
+    writers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in writers:
+                raise ValueError(f"{output} is written by both {writers[output]} and {stage.name}")
+            writers[output] = stage.name
+    return {
+        stage.name: {writers[i] for i in stage.inputs if i in writers and writers[i] != stage.name}
+        for stage in stages
+    }
+
+
+def topological_order(stages: list) -> list:
+    deps = dependencies(stages)
+    order, done = [], set()
+    while len(order) < len(stages):
+        ready = [s for s in stages if s.name not in done and deps[s.name] <= done]
+        if not ready:
+            raise ValueError("stage dependencies form a cycle: " + ", ".join(sorted(set(deps) - done)))
+        order.extend(ready)
+        done.update(s.name for s in ready)
+    return order
+
+
+def fingerprint(stage: Stage) -> str:
+    """Hash of the stage definition and the size/mtime of every input file."""
+    digest = hashlib.sha256(repr((stage.name, stage.params)).encode())
+    for path in stage.inputs:
+        path = Path(path)
+        stat = path.stat() if path.exists() else None
+        digest.update(repr((str(path), stat and stat.st_size, stat and stat.st_mtime_ns)).encode())
+    return digest.hexdigest()
+
+
+def load_state(processed_dir: Path = PROCESSED_DIR) -> dict:
+    fp = Path(processed_dir) / STATE_NAME
+    if not fp.exists():
+        return {}
+    return json.loads(fp.read_text(encoding="utf-8"))
+
+
+def save_state(state: dict, processed_dir: Path = PROCESSED_DIR):
+    fp = Path(processed_dir) / STATE_NAME
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    fp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def _execute(stage: Stage) -> dict:
+    """Run one stage in a worker process; each worker runs a single stage, so its peak RSS is the stage's."""
+    start = time.perf_counter()
+    stage.run()
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return {"seconds": round(time.perf_counter() - start, 2), "peak_rss_mb": peak_rss_mb and round(peak_rss_mb, 1)}
+
+
+def run_pipeline(
+    stages: list,
+    targets=None,
+    jobs: int = None,
+    force: bool = False,
+    processed_dir: Path = PROCESSED_DIR,
+) -> dict:
+    """
+    Run `targets` (every stage by default) and the stages they depend on,
+    skipping those that are up to date; `force` reruns the targets anyway. Returns each stage's record:
+    status ("ran", "skipped", "failed" or "blocked"), seconds and peak RSS.
+    """
+    deps = dependencies(stages)
+    by_name = {s.name: s for s in topological_order(stages)}
+    unknown = set(targets or ()) - set(by_name)
+    if unknown:
+        raise ValueError(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    wanted, pending = set(), list(targets or by_name)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+
+    # --force reruns the requested stages; their dependencies still skip when up to date
+    forced = set(targets or by_name)
+    state = load_state(processed_dir)
+    records = {}
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs, max_tasks_per_child=1) as pool:
+        while len(records) < len(wanted):
+            for name in by_name:
+                if name not in wanted or name in records or name in running.values():
+                    continue
+                if any(records.get(d, {}).get("status") in ("failed", "blocked") for d in deps[name]):
+                    records[name] = {"status": "blocked"}
+                    continue
+                if not all(d in records for d in deps[name] if d in wanted):
+                    continue
+                stage = by_name[name]
+                previous = state.get(name, {})
+                if (
+                    not (force and name in forced)
+                    and previous.get("fingerprint") == fingerprint(stage)
+                    and all(Path(o).exists() for o in stage.outputs)
+                ):
+                    records[name] = {"status": "skipped"}
+                    continue
+                running[pool.submit(_execute, stage)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    record = {"status": "ran", **future.result()}
+                except Exception as exc:
+                    records[name] = {"status": "failed", "error": repr(exc)}
+                    continue
+                records[name] = record
+                # fingerprinted after the run, so the inputs it saw are what is recorded
+                state[name] = {
+                    **record,
+                    "fingerprint": fingerprint(by_name[name]),
+                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                save_state(state, processed_dir)
+    return {name: records[name] for name in by_name if name in records}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the IMDb ETL pipeline, in parallel where stages allow it.")
+    parser.add_argument("stages", nargs="*", help="stages to run, with their dependencies (default: all)")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory holding the raw .tsv/.tsv.gz files")
+    parser.add_argument("--processed-dir", type=Path, default=PROCESSED_DIR, help="directory for the Parquet files")
+    parser.add_argument("--db", type=Path, default=WAREHOUSE_PATH, help="warehouse file")
+    parser.add_argument("--app-dir", type=Path, default=APP_DATA_DIR, help="destination for the dashboard exports")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--list", action="store_true", help="print the stages and their dependencies, then exit")
+    args = parser.parse_args(argv)
+
+    stages = build_stages(args.raw_dir, args.processed_dir, args.db, args.app_dir)
+    if args.list:
+        deps = dependencies(stages)
+        for stage in topological_order(stages):
+            print(f"{stage.name:<24} <- {', '.join(sorted(deps[stage.name])) or '-'}")
+        return
+
+    try:
+        records = run_pipeline(stages, args.stages or None, args.jobs, args.force, args.processed_dir)
+    except ValueError as exc:
+        parser.error(str(exc))
+    for name, record in records.items():
+        seconds = f"{record['seconds']:>8.2f}s" if "seconds" in record else ""
+        rss = f"{record['peak_rss_mb']:>8.1f} MB" if record.get("peak_rss_mb") else ""
+        print(f"{name:<24} {record['status']:<8} {seconds} {rss} {record.get('error', '')}".rstrip())
+    if any(r["status"] in ("failed", "blocked") for r in records.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+refresh.py
+
+Incremental refresh of the warehouse when IMDb publishes a new daily dump.
+
+title.basics and title.ratings are diffed against the previous snapshot by
+tconst; only the changed titles are patched into the base tables, and each
+derived table recomputes just the rows and groups those titles touch (e.g. the
+affected genre/year medians or director career averages). Base tables that
+cannot be diffed are reloaded in full and force a full rebuild of the derived
+tables that depend on them.
+
+Usage:
+  python -m imdb_trends.refresh                     # ingest the new dump and refresh
+  python -m imdb_trends.refresh --raw-dir /path/to/kaggle/download
+  python -m imdb_trends.refresh --full              # rebuild every derived table
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from imdb_trends.derived import DERIVED_TABLES, DERIVED_VIEWS, render
+from imdb_trends.ingest import ingest, load_manifest, parquet_path
+from imdb_trends.paths import PROCESSED_DIR, RAW_DIR, WAREHOUSE_PATH
+from imdb_trends.warehouse import (
+    BASE_TABLES,
+    SCHEMA_VERSION,
+    connect,
+    current_version,
+    init_metadata,
+    load_table,
+    record_load,
+)
+
+# base tables keyed by tconst that are patched in place instead of reloaded
+DIFFABLE_TABLES = ("basics", "ratings")
+
+
+def table_exists(con, name: str) -> bool:
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [name]
+    ).fetchone()[0] > 0
+
+
+def init_refresh_state(con):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS derived_state (
+            table_name VARCHAR PRIMARY KEY,
+            definition_hash VARCHAR,
+            mode VARCHAR,
+            affected_keys BIGINT,
+            seconds DOUBLE,
+            refreshed_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+
+
+def diff_titles(con, table: str, src: Path):
+    """Append to changed_titles every tconst added, removed or modified in `src`."""
+    con.execute(f"""
+        INSERT INTO changed_titles
+        SELECT DISTINCT tconst FROM (
+            (SELECT * FROM read_parquet('{src}') EXCEPT SELECT * FROM {table})
+            UNION ALL
+            (SELECT * FROM {table} EXCEPT SELECT * FROM read_parquet('{src}'))
+        )
+    """)
+
+
+def patch_titles(con, table: str, src: Path):
+    """Replace the rows of the changed titles with their new versions."""
+    con.execute(f"DELETE FROM {table} WHERE tconst IN (SELECT tconst FROM changed_titles)")
+    con.execute(f"""
+        INSERT INTO {table}
+        SELECT * FROM read_parquet('{src}')
+        WHERE tconst IN (SELECT tconst FROM changed_titles)
+    """)
+
+
+def plan_derived(con, diffed: set, reloaded: set, full: bool) -> dict:
+    """
+    Decide how each derived table is refreshed: "full", "incremental" or "skip".
+    Tables are listed in dependency order, so upstream decisions are known.
+    """
+    state = dict(con.execute("SELECT table_name, definition_hash FROM derived_state").fetchall())
+    plan = {}
+    for table in DERIVED_TABLES:
+        upstream = {plan.get(dep) for dep in table.depends_on}
+        if (
+            full
+            or not table_exists(con, table.name)
+            or state.get(table.name) != table.definition_hash
+            or reloaded & set(table.depends_on)
+            or "full" in upstream
+        ):
+            plan[table.name] = "full"
+        elif diffed & set(table.depends_on) or "incremental" in upstream:
+            plan[table.name] = "incremental" if table.incremental else "full"
+        else:
+            plan[table.name] = "skip"
+    return plan
+
+
+def refresh(processed_dir: Path = PROCESSED_DIR, db_path: Path = WAREHOUSE_PATH, full: bool = False) -> dict:
+    """
+    Bring the warehouse in line with the processed Parquet files.
+
+    Returns the refresh mode chosen for every base and derived table.
+    """
+    manifest = load_manifest(processed_dir)
+    con = connect(read_only=False, db_path=db_path)
+    init_metadata(con)
+    init_refresh_state(con)
+
+    if current_version(con) != SCHEMA_VERSION:
+        con.execute("DELETE FROM table_loads")
+        full = True
+
+    loaded = dict(con.execute("SELECT table_name, source_sha256 FROM table_loads").fetchall())
+    changed = {}
+    for table, name in BASE_TABLES.items():
+        checksum = manifest.get(name, {}).get("source", {}).get("sha256")
+        src = parquet_path(name, processed_dir)
+        if checksum is not None and src.exists() and (full or loaded.get(table) != checksum):
+            changed[table] = (src, checksum)
+
+    diffed = {t for t in changed if t in DIFFABLE_TABLES and not full and table_exists(con, t)}
+    reloaded = set(changed) - diffed
+
+    con.execute("BEGIN TRANSACTION")
+    con.execute("CREATE OR REPLACE TEMP TABLE changed_titles (tconst VARCHAR)")
+    for table in diffed:
+        diff_titles(con, table, changed[table][0])
+    con.execute("CREATE OR REPLACE TEMP TABLE changed_titles AS SELECT DISTINCT tconst FROM changed_titles")
+
+    plan = plan_derived(con, diffed, reloaded, full)
+
+    # keys touched under the old snapshot: rows that may disappear or move groups.
+    # Skipped tables get an empty key set so downstream `affected` queries resolve.
+    for table in DERIVED_TABLES:
+        if plan[table.name] == "incremental":
+            con.execute(f"CREATE OR REPLACE TEMP TABLE _affected_{table.name} AS {table.affected}")
+        elif plan[table.name] == "skip":
+            con.execute(f"CREATE OR REPLACE TEMP TABLE _affected_{table.name} AS {table.affected} LIMIT 0")
+
+    for table in diffed:
+        patch_titles(con, table, changed[table][0])
+    for table in reloaded:
+        load_table(con, table, changed[table][0])
+    for table, (_, checksum) in changed.items():
+        record_load(con, table, checksum)
+
+    for table in DERIVED_TABLES:
+        mode = plan[table.name]
+        if mode == "skip":
+            continue
+
+        start = time.perf_counter()
+        affected = None
+        if mode == "full":
+            con.execute(f"CREATE OR REPLACE TABLE {table.name} AS {render(table)}")
+        else:
+            # add the keys touched under the new snapshot, then recompute them
+            con.execute(f"INSERT INTO _affected_{table.name} {table.affected}")
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _affected_{table.name} AS
+                SELECT DISTINCT * FROM _affected_{table.name}
+            """)
+            key = ", ".join(table.key)
+            con.execute(f"DELETE FROM {table.name} WHERE ({key}) IN (SELECT * FROM _affected_{table.name})")
+            con.execute(f"INSERT INTO {table.name} {render(table, incremental=True)}")
+            affected = con.execute(f"SELECT COUNT(*) FROM _affected_{table.name}").fetchone()[0]
+
+        con.execute("""
+            INSERT OR REPLACE INTO derived_state
+                (table_name, definition_hash, mode, affected_keys, seconds, refreshed_at)
+            VALUES (?, ?, ?, ?, ?, current_timestamp)
+        """, [table.name, table.definition_hash, mode, affected, round(time.perf_counter() - start, 3)])
+
+    for view, sql in DERIVED_VIEWS.items():
+        con.execute(f"CREATE OR REPLACE VIEW {view} AS {sql}")
+
+    if current_version(con) != SCHEMA_VERSION:
+        con.execute("INSERT INTO schema_version (version) VALUES (?)", [SCHEMA_VERSION])
+    con.execute("COMMIT")
+    con.close()
+
+    status = {t: ("diffed" if t in diffed else "reloaded") for t in changed}
+    status.update(plan)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally refresh the IMDb warehouse from a new dump.")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory holding the raw .tsv/.tsv.gz files")
+    parser.add_argument("--processed-dir", type=Path, default=PROCESSED_DIR, help="directory for the Parquet files")
+    parser.add_argument("--db", type=Path, default=WAREHOUSE_PATH, help="warehouse file to refresh")
+    parser.add_argument("--full", action="store_true", help="rebuild every derived table from scratch")
+    args = parser.parse_args(argv)
+
+    ingest(raw_dir=args.raw_dir, out_dir=args.processed_dir)
+    status = refresh(args.processed_dir, args.db, full=args.full)
+    for table, mode in status.items():
+        print(f"{table:<24} {mode}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+sampling.py
+
+Stratified sampling without loading the population into memory. One
+GROUP BY gives the size of every stratum and fixes its exact quota
+(proportional, largest remainder); a second pass streams the query in
+batches and keeps, per stratum, the `quota` rows with the smallest sample
+key. That is a reservoir per stratum, so memory is bounded by the sample
+plus one batch however large the query is.
+
+With `key` set, the sample key is a hash of that column and the seed, so
+the same seed draws the same rows regardless of scan order:
+
+  from imdb_trends.sampling import stratified_sample
+
+  df = stratified_sample(con, "SELECT * FROM features", ["titleType", "rating_class"],
+                         100_000, key="tconst")
+"""
+
+import numpy as np
+import pandas as pd
+
+# DuckDB vectors (of 2048 rows) fetched per batch
+BATCH_VECTORS = 64
+
+KEY_MAX = np.iinfo(np.uint64).max
+
+
+def allocate(counts, n: int) -> np.ndarray:
+    """
+    Split `n` over strata of the given sizes in proportion to their size.
+    Quotas sum to exactly min(n, total), never exceed a stratum's size, and
+    leftover rows go to the largest fractional remainders.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if n >= total:
+        return counts.copy()
+    exact = counts * (n / total)
+    quotas = np.floor(exact).astype(np.int64)
+    remainder = n - int(quotas.sum())
+    # ties go to the earlier stratum, so the allocation is deterministic
+    order = np.argsort(-(exact - quotas), kind="stable")
+    quotas[order[:remainder]] += 1
+    return quotas
+
+
+def _keep(strata: np.ndarray, keys: np.ndarray, quotas: np.ndarray) -> np.ndarray:
+    """Positions of the `quotas[s]` smallest keys of every stratum s, in (stratum, key) order."""
+    order = np.lexsort((keys, strata))
+    sorted_strata = strata[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_strata, sorted_strata, side="left")
+    return order[rank < quotas[sorted_strata]]
+
+
+def _cutoff(quotas: np.ndarray, population: np.ndarray) -> np.ndarray:
+    """
+    Per-stratum key bound below which the `quota` smallest of `population`
+    uniform keys almost surely fall (six standard deviations of slack), so
+    DuckDB can drop most rows before they reach Python.
+    """
+    fraction = (quotas + 6 * np.sqrt(quotas) + 16) / np.maximum(population, 1)
+    cutoff = (np.where(fraction < 1.0, fraction, 0.0) * float(KEY_MAX)).astype(np.uint64)
+    return np.where(fraction < 1.0, cutoff, KEY_MAX)
+
+
+def _reservoirs(result, quotas: np.ndarray, batch_vectors: int):
+    """Stream `result` and keep the `quotas[s]` rows with the smallest _sample_key in every stratum s."""
+    sample = None
+    # a stratum whose reservoir is full only admits keys below its current maximum
+    full = np.zeros(len(quotas), dtype=bool)
+    threshold = np.zeros(len(quotas), dtype=np.uint64)
+    while True:
+        batch = result.fetch_df_chunk(batch_vectors)
+        if batch.empty:
+            break
+        batch_strata = batch["_stratum"].to_numpy(dtype=np.int64)
+        batch_keys = batch["_sample_key"].to_numpy(dtype=np.uint64)
+        candidates = ~full[batch_strata] | (batch_keys < threshold[batch_strata])
+        if not candidates.any():
+            continue
+        batch = batch[candidates]
+        sample = batch if sample is None else pd.concat([sample, batch], ignore_index=True)
+
+        sample_strata = sample["_stratum"].to_numpy(dtype=np.int64)
+        sample_keys = sample["_sample_key"].to_numpy(dtype=np.uint64)
+        kept = _keep(sample_strata, sample_keys, quotas)
+        sample = sample.iloc[kept].reset_index(drop=True)
+
+        kept_strata = sample_strata[kept]
+        full = np.bincount(kept_strata, minlength=len(quotas)) >= quotas
+        threshold[:] = 0
+        np.maximum.at(threshold, kept_strata, sample_keys[kept])
+    return sample
+
+
+def stratified_sample(
+    con,
+    query: str,
+    strata: list,
+    n: int,
+    key: str = None,
+    seed: int = 42,
+    batch_vectors: int = BATCH_VECTORS,
+) -> pd.DataFrame:
+    """
+    Draw `n` rows from `query`, stratified on the SQL expressions in
+    `strata` (NULL is a stratum of its own). Every stratum gets exactly
+    its allocated quota. `key` is a column (or SQL expression) hashed with
+    `seed` to rank rows; without it rows are drawn with random(), which is
+    not repeatable.
+    """
+    stratum_columns = [f"_stratum_{i}" for i in range(len(strata))]
+    projected = ", ".join(f"{expr} AS {col}" for expr, col in zip(strata, stratum_columns))
+    counts = con.execute(f"""
+        SELECT {", ".join(stratum_columns)}, COUNT(*) AS population
+        FROM (SELECT {projected} FROM ({query}))
+        GROUP BY ALL
+        ORDER BY ALL
+    """).df()
+    counts["quota"] = allocate(counts["population"], n)
+    counts = counts[counts["quota"] > 0].reset_index(drop=True)
+    counts["_stratum"] = np.arange(len(counts), dtype=np.int64)
+    quotas = counts["quota"].to_numpy()
+    counts["_cutoff"] = _cutoff(quotas, counts["population"].to_numpy())
+
+    sample_key = f"hash({key}, {int(seed)})" if key else "hash(random())"
+    join = " AND ".join(f"q.{col} IS NOT DISTINCT FROM s.{col}" for col in stratum_columns)
+    sql = f"""
+        SELECT * EXCLUDE (_cutoff)
+        FROM (
+            SELECT q.* EXCLUDE ({", ".join(stratum_columns)}), s._stratum, s._cutoff, {sample_key} AS _sample_key
+            FROM (SELECT *, {projected} FROM ({query})) q
+            JOIN _sample_strata s ON {join}
+        )
+        WHERE _sample_key <= _cutoff
+    """
+    strata_frame = counts[stratum_columns + ["_stratum", "_cutoff"]]
+    try:
+        con.register("_sample_strata", strata_frame)
+        result = con.execute(sql)
+        sample = _reservoirs(result, quotas, batch_vectors)
+        if sample is None:
+            # no row passed the cutoff; the exhausted result still gives the columns
+            sample = result.df()
+
+        # strata the cutoff left short are drawn again without it
+        drawn = np.bincount(sample["_stratum"].to_numpy(dtype=np.int64), minlength=len(quotas))
+        short = drawn < quotas
+        if short.any():
+            con.unregister("_sample_strata")
+            con.register("_sample_strata", strata_frame[short].assign(_cutoff=KEY_MAX))
+            redrawn = _reservoirs(con.execute(sql), quotas, batch_vectors)
+            sample = pd.concat([sample[~short[sample["_stratum"].to_numpy()]], redrawn], ignore_index=True)
+    finally:
+        con.unregister("_sample_strata")
+
+    return sample.drop(columns=["_stratum", "_sample_key"])
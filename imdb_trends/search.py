@@ -0,0 +1,342 @@
+"""
+search.py
+
+Inverted index behind the Universal Search page. Titles, actor names and
+director names are tokenised once into a sorted term dictionary, BM25-weighted
+postings and a trigram table, all stored as Parquet next to the app data. At
+query time every lookup is a binary search or an array slice, so a search
+costs a few milliseconds regardless of how many titles are indexed.
+
+Each query token matches indexed terms exactly or by prefix; tokens of four or
+more characters that are not indexed terms also match fuzzily within a small
+edit distance. A title matches
+when every token matches one of its fields; titles are ranked by the sum of
+the BM25 weights of their best match per token.
+
+Usage:
+  python -m imdb_trends.search --data-dir /path/to/imdb-universal-search
+  python -m imdb_trends.search --data-dir ... --out-dir streamlit_app/data/search_index
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from imdb_trends.autocomplete import build_autocomplete
+from imdb_trends.ingest import source_fingerprint
+from imdb_trends.parquet import copy_to_parquet
+from imdb_trends.paths import APP_DATA_DIR
+
+INDEX_DIR = APP_DATA_DIR / "search_index"
+MANIFEST_NAME = "search_manifest.json"
+# bump when the index layout changes so existing indexes are rebuilt
+INDEX_VERSION = 2
+# typeahead arrays (see autocomplete.py) live in this subdirectory of the index
+AUTOCOMPLETE_DIR = "autocomplete"
+
+# source files of the imdb-universal-search Kaggle dataset
+SOURCE_FILES = {
+    "movies": "movies_master_clean.parquet",
+    "actors": "movie_actors.parquet",
+    "directors": "movie_directors.parquet",
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+PREFIX_BOOST = 0.8
+FUZZY_BOOST = 0.6
+MIN_FUZZY_LENGTH = 4
+# short prefixes such as "a" expand to the most frequent matching terms only
+MAX_EXPANSIONS = 64
+
+# lower-cased, accent-free alphanumeric runs; shared by indexing and querying
+TOKENIZE_MACRO = """
+    CREATE OR REPLACE MACRO search_tokens(s) AS
+    list_filter(regexp_split_to_array(lower(strip_accents(s)), '[^a-z0-9]+'), t -> t <> '')
+"""
+
+
+def trigrams_sql(term: str) -> str:
+    """SQL list of the padded trigrams of `term`, each packed into an integer."""
+    padded = f"('  ' || {term} || ' ')"
+    packed = " + ".join(f"ascii(substr({padded}, i + {k}, 1)) * {256 ** (2 - k)}" for k in range(3))
+    return f"list_distinct(list_transform(range(1, length({padded}) - 1), i -> CAST({packed} AS INTEGER)))"
+
+
+def trigrams(token: str) -> np.ndarray:
+    """Padded trigrams of `token` packed like `trigrams_sql`."""
+    codes = [ord(c) for c in f"  {token} "]
+    return np.unique([codes[i] * 65536 + codes[i + 1] * 256 + codes[i + 2] for i in range(len(codes) - 2)])
+
+
+def build_search_index(con, data_dir: Path, out_dir: Path = INDEX_DIR):
+    """Tokenise the search sources in `data_dir` and write the index files to `out_dir`."""
+    data_dir, out_dir = Path(data_dir), Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    con.execute(TOKENIZE_MACRO)
+    movies, actors, directors = (f"read_parquet('{data_dir / SOURCE_FILES[k]}')" for k in SOURCE_FILES)
+
+    # one document per (title, field); names of the same field are concatenated
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _search_docs AS
+        WITH titles AS (
+            SELECT DISTINCT tconst FROM {movies}
+        ),
+        docs AS (
+            SELECT tconst, 'title' AS field, displayTitle AS text FROM {movies}
+            UNION ALL
+            SELECT tconst, 'actor', string_agg(actorName, ' ') FROM {actors} GROUP BY tconst
+            UNION ALL
+            SELECT tconst, 'director', string_agg(directorName, ' ') FROM {directors} GROUP BY tconst
+        )
+        SELECT
+            t.title_id,
+            d.field,
+            search_tokens(d.text) AS tokens
+        FROM docs d
+        JOIN (SELECT tconst, CAST(row_number() OVER (ORDER BY tconst) - 1 AS INTEGER) AS title_id FROM titles) t
+            USING (tconst)
+        WHERE d.text IS NOT NULL
+    """)
+
+    copy_to_parquet(con, f"""
+        SELECT tconst
+        FROM (SELECT DISTINCT tconst FROM {movies})
+        ORDER BY tconst
+    """, out_dir / "titles.parquet")
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _search_postings AS
+        WITH doc_terms AS (
+            SELECT title_id, field, len(tokens) AS doc_length, unnest(tokens) AS term
+            FROM _search_docs
+        ),
+        tf AS (
+            SELECT title_id, field, doc_length, term, COUNT(*) AS tf
+            FROM doc_terms
+            GROUP BY ALL
+        ),
+        field_stats AS (
+            SELECT field, AVG(len(tokens)) AS avg_length
+            FROM _search_docs
+            GROUP BY field
+        ),
+        terms AS (
+            SELECT
+                term,
+                CAST(row_number() OVER (ORDER BY term) - 1 AS INTEGER) AS term_id,
+                COUNT(*) AS df
+            FROM tf
+            GROUP BY term
+        )
+        SELECT
+            t.term_id,
+            t.term,
+            tf.title_id,
+            CAST(
+                ln(1 + ((SELECT COUNT(*) FROM _search_docs) - t.df + 0.5) / (t.df + 0.5))
+                * tf.tf * ({BM25_K1} + 1)
+                / (tf.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * tf.doc_length / s.avg_length))
+                AS FLOAT
+            ) AS weight
+        FROM tf
+        JOIN terms t USING (term)
+        JOIN field_stats s USING (field)
+    """)
+
+    # postings are stored term by term, so each term owns one contiguous slice
+    copy_to_parquet(con, """
+        SELECT term_id, title_id, weight
+        FROM _search_postings
+        ORDER BY term_id, title_id
+    """, out_dir / "postings.parquet")
+
+    copy_to_parquet(con, """
+        SELECT term, term_id, COUNT(*) AS postings
+        FROM _search_postings
+        GROUP BY term, term_id
+        ORDER BY term
+    """, out_dir / "terms.parquet")
+
+    copy_to_parquet(con, f"""
+        SELECT trigram, term_id
+        FROM (
+            SELECT DISTINCT term, term_id FROM _search_postings
+        ), unnest({trigrams_sql('term')}) AS g(trigram)
+        ORDER BY trigram, term_id
+    """, out_dir / "trigrams.parquet")
+
+    con.execute("DROP TABLE _search_docs")
+    con.execute("DROP TABLE _search_postings")
+
+    build_autocomplete(con, movies, actors, directors, out_dir / AUTOCOMPLETE_DIR)
+
+
+def index_is_current(data_dir: Path, out_dir: Path = INDEX_DIR) -> bool:
+    """True when `out_dir` holds an index built from the current source files."""
+    fp = Path(out_dir) / MANIFEST_NAME
+    if not fp.exists():
+        return False
+    manifest = json.loads(fp.read_text(encoding="utf-8"))
+    if manifest.get("version") != INDEX_VERSION:
+        return False
+    for name, file_name in SOURCE_FILES.items():
+        src = Path(data_dir) / file_name
+        if not src.exists() or source_fingerprint(src, manifest.get(name)) != manifest.get(name):
+            return False
+    return True
+
+
+def ensure_search_index(data_dir: Path, out_dir: Path = INDEX_DIR, force: bool = False) -> Path:
+    """Build the index unless it is already current for `data_dir`; returns `out_dir`."""
+    data_dir, out_dir = Path(data_dir), Path(out_dir)
+    if force or not index_is_current(data_dir, out_dir):
+        build_search_index(duckdb.connect(), data_dir, out_dir)
+        manifest = {
+            name: source_fingerprint(data_dir / file_name, None)
+            for name, file_name in SOURCE_FILES.items()
+        }
+        manifest["version"] = INDEX_VERSION
+        (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return out_dir
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def max_edits(token: str) -> int:
+    return 1 if len(token) < 8 else 2
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """The index files loaded into memory as sorted NumPy arrays."""
+
+    tconsts: np.ndarray
+    terms: np.ndarray
+    # postings of term i are postings_title[offsets[i]:offsets[i + 1]]
+    offsets: np.ndarray
+    postings_title: np.ndarray
+    postings_weight: np.ndarray
+    trigrams: np.ndarray
+    trigram_terms: np.ndarray
+    con: duckdb.DuckDBPyConnection
+
+    def tokenize(self, text: str) -> list:
+        return self.con.cursor().execute("SELECT search_tokens($text)", {"text": text}).fetchone()[0] or []
+
+    def expand(self, token: str) -> dict:
+        """Term ids matching `token` mapped to their boost (exact 1, prefix, fuzzy)."""
+        lo, hi = np.searchsorted(self.terms, [token, token + "\uffff"])
+        matches = {}
+        if lo < hi:
+            ids = np.arange(lo, hi)
+            if len(ids) > MAX_EXPANSIONS:
+                counts = self.offsets[ids + 1] - self.offsets[ids]
+                ids = ids[np.argsort(-counts, kind="stable")[:MAX_EXPANSIONS]]
+            matches = {int(i): PREFIX_BOOST for i in ids}
+            if self.terms[lo] == token:
+                matches[int(lo)] = 1.0
+
+        # fuzzy matching only kicks in for tokens that are not indexed terms
+        if len(token) >= MIN_FUZZY_LENGTH and matches.get(int(lo)) != 1.0:
+            for term_id in self._fuzzy_candidates(token):
+                matches.setdefault(term_id, FUZZY_BOOST)
+        return matches
+
+    def _fuzzy_candidates(self, token: str) -> list:
+        grams = trigrams(token)
+        starts = np.searchsorted(self.trigrams, grams, "left")
+        ends = np.searchsorted(self.trigrams, grams, "right")
+        ids, shared = np.unique(
+            np.concatenate([self.trigram_terms[s:e] for s, e in zip(starts, ends)]), return_counts=True
+        )
+        # each edit changes at most three trigrams
+        edits = max_edits(token)
+        ids = ids[shared >= len(grams) - 3 * edits]
+        return [
+            int(i) for i in ids
+            if abs(len(self.terms[i]) - len(token)) <= edits
+            and edit_distance(self.terms[i], token) <= edits
+        ]
+
+    def _token_scores(self, token: str):
+        """(title ids, scores) of the titles matching `token`, best expansion per title."""
+        matches = self.expand(token)
+        if not matches:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        titles, scores = [], []
+        for term_id, boost in matches.items():
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            titles.append(self.postings_title[start:end])
+            scores.append(self.postings_weight[start:end] * boost)
+        titles, scores = np.concatenate(titles), np.concatenate(scores)
+        order = np.lexsort((-scores, titles))
+        titles, scores = titles[order], scores[order]
+        first = np.r_[True, titles[1:] != titles[:-1]]
+        return titles[first], scores[first]
+
+    def search(self, query: str) -> pd.DataFrame:
+        """Titles matching every token of `query`, ranked by BM25 score."""
+        tokens = self.tokenize(query)
+        if not tokens:
+            return pd.DataFrame({"tconst": pd.Series(dtype=str), "score": pd.Series(dtype=np.float32)})
+
+        titles, scores = self._token_scores(tokens[0])
+        for token in tokens[1:]:
+            other_titles, other_scores = self._token_scores(token)
+            titles, left, right = np.intersect1d(titles, other_titles, assume_unique=True, return_indices=True)
+            scores = scores[left] + other_scores[right]
+
+        order = np.argsort(-scores, kind="stable")
+        return pd.DataFrame({"tconst": self.tconsts[titles[order]], "score": scores[order]})
+
+
+def load_search_index(index_dir: Path = INDEX_DIR) -> SearchIndex:
+    index_dir = Path(index_dir)
+    con = duckdb.connect()
+    con.execute(TOKENIZE_MACRO)
+
+    terms = con.execute(f"SELECT term, postings FROM read_parquet('{index_dir / 'terms.parquet'}')").fetchnumpy()
+    postings = con.execute(f"SELECT title_id, weight FROM read_parquet('{index_dir / 'postings.parquet'}')").fetchnumpy()
+    trigrams = con.execute(f"SELECT trigram, term_id FROM read_parquet('{index_dir / 'trigrams.parquet'}')").fetchnumpy()
+
+    # terms.parquet is sorted by term, which is also term_id order
+    return SearchIndex(
+        tconsts=con.execute(f"SELECT tconst FROM read_parquet('{index_dir / 'titles.parquet'}')").fetchnumpy()["tconst"],
+        terms=terms["term"],
+        offsets=np.r_[0, np.cumsum(terms["postings"])],
+        postings_title=postings["title_id"],
+        postings_weight=postings["weight"],
+        trigrams=trigrams["trigram"],
+        trigram_terms=trigrams["term_id"],
+        con=con,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Universal Search inverted index.")
+    parser.add_argument("--data-dir", type=Path, required=True, help="directory holding the search source Parquet files")
+    parser.add_argument("--out-dir", type=Path, default=INDEX_DIR, help="directory for the index files")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    args = parser.parse_args(argv)
+
+    ensure_search_index(args.data_dir, args.out_dir, force=args.force)
+    print(f"search index written to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+sketches.py
+
+HyperLogLog sketches for approximate distinct counts. Registers are computed
+inside DuckDB from its 64-bit `hash()` and kept as uint8 arrays, so sketches
+for different cells can be merged with an element-wise max and estimated in
+microseconds, independent of how many rows they summarise.
+
+Any page that counts distinct people (or anything else) over filter cells can
+reuse this: write the sketches once with `write_sketches`, then load them with
+`load_sketches` and call `SketchStore.count` with a boolean mask over cells.
+
+  store = load_sketches("streamlit_app/data/homepage_sketches.parquet")
+  mask = store.cells["startYear"].between(1990, 2000).to_numpy()
+  store.count("directors", mask)   # DistinctCount(value=..., error=...)
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from imdb_trends.parquet import copy_to_parquet
+
+HLL_PRECISION = 10  # 2**10 registers, ~3.3% standard error
+
+SKETCH_SUFFIX = "_hll"
+
+
+def register_columns(item: str, precision: int = HLL_PRECISION) -> str:
+    """SQL select-list computing the (register index, rank) of `item`."""
+    tail_bits = 64 - precision
+    masked = f"(hash({item}) & ((1::UBIGINT << {tail_bits}) - 1))"
+    return f"""
+        CAST(hash({item}) >> {tail_bits} AS INTEGER) AS register,
+        CASE
+            WHEN {masked} = 0 THEN {tail_bits + 1}
+            ELSE bit_position('1'::BIT, CAST({masked} AS BIT)) - {precision}
+        END AS rank
+    """
+
+
+def build_registers(con, source: str, keys: list, item: str, precision: int = HLL_PRECISION):
+    """
+    Build one sketch per distinct combination of `keys` in `source`.
+
+    Returns (cells, registers): a DataFrame of the key values and a
+    (len(cells), 2**precision) uint8 array holding each cell's registers.
+    """
+    key_list = ", ".join(keys)
+    ranks = con.execute(f"""
+        WITH ranks AS (
+            SELECT {key_list}, {register_columns(item, precision)}
+            FROM {source}
+            WHERE {item} IS NOT NULL
+        )
+        SELECT
+            {key_list},
+            DENSE_RANK() OVER (ORDER BY {key_list}) - 1 AS cell,
+            register,
+            MAX(rank) AS rank
+        FROM ranks
+        GROUP BY {key_list}, register
+    """).df()
+
+    cells = ranks.drop_duplicates("cell").sort_values("cell")[keys].reset_index(drop=True)
+    registers = np.zeros((len(cells), 1 << precision), dtype=np.uint8)
+    registers[ranks["cell"].to_numpy(), ranks["register"].to_numpy()] = ranks["rank"].to_numpy()
+    return cells, registers
+
+
+def merge(registers: np.ndarray) -> np.ndarray:
+    """Union of several sketches (one per row)."""
+    if len(registers) == 0:
+        return np.zeros(registers.shape[-1], dtype=np.uint8)
+    return registers.max(axis=0)
+
+
+def estimate(registers: np.ndarray) -> float:
+    """HyperLogLog cardinality estimate with the small-range correction."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * np.log(m / zeros)
+    return raw
+
+
+def relative_error(precision: int = HLL_PRECISION) -> float:
+    """Relative standard error of a HyperLogLog estimate with 2**precision registers."""
+    return 1.04 / np.sqrt(1 << precision)
+
+
+class DistinctCount(NamedTuple):
+    value: int
+    # absolute half-width of the ~95% interval (two standard errors)
+    error: int
+
+    @property
+    def relative_error(self) -> float:
+        return self.error / self.value if self.value else 0.0
+
+
+@dataclass(frozen=True)
+class SketchStore:
+    """Per-cell sketches loaded into memory, one register matrix per counted column."""
+
+    cells: pd.DataFrame
+    registers: dict
+    precision: int = HLL_PRECISION
+
+    def count(self, column: str, mask=None) -> DistinctCount:
+        """Approximate distinct count over the union of the cells selected by `mask`."""
+        registers = self.registers[column]
+        if mask is not None:
+            registers = registers[np.asarray(mask, dtype=bool)]
+        value = estimate(merge(registers)) if len(registers) else 0.0
+        return DistinctCount(round(value), round(2 * relative_error(self.precision) * value))
+
+
+def write_sketches(con, sources: dict, keys: list, dest: Path, precision: int = HLL_PRECISION):
+    """
+    Write one row per distinct `keys` cell with a sketch blob for every entry
+    of `sources`, which maps an output name to a query returning the key
+    columns plus an `item` column, e.g. {"directors": ...} becomes a
+    `directors_hll` column.
+
+    Cells that have no items for a source keep an empty (all-zero) sketch.
+    """
+    key_list = ", ".join(keys)
+    cells = con.execute(" UNION ".join(
+        f"SELECT DISTINCT {key_list} FROM ({source})" for source in sources.values()
+    ) + " ORDER BY ALL").df()
+
+    for name, source in sources.items():
+        item_cells, registers = build_registers(con, f"({source})", keys, "item", precision)
+        aligned = np.zeros((len(cells), 1 << precision), dtype=np.uint8)
+        matches = cells.reset_index().merge(item_cells.reset_index(), on=keys)
+        aligned[matches["index_x"].to_numpy()] = registers[matches["index_y"].to_numpy()]
+        cells[name + SKETCH_SUFFIX] = [row.tobytes() for row in aligned]
+
+    blobs = ", ".join(f"CAST({name}{SKETCH_SUFFIX} AS BLOB) AS {name}{SKETCH_SUFFIX}" for name in sources)
+    con.register("_sketch_cells", cells)
+    try:
+        copy_to_parquet(con, f"""
+            SELECT {key_list}, {precision} AS precision, {blobs}
+            FROM _sketch_cells
+        """, dest)
+    finally:
+        con.unregister("_sketch_cells")
+
+
+def load_sketches(path: Path) -> SketchStore:
+    """Read a file written by `write_sketches` into a SketchStore."""
+    cells = duckdb.connect().execute(f"SELECT * FROM read_parquet('{path}')").df()
+    precision = int(cells.pop("precision").iloc[0]) if len(cells) else HLL_PRECISION
+    registers = {}
+    for column in [c for c in cells.columns if c.endswith(SKETCH_SUFFIX)]:
+        blobs = cells.pop(column)
+        registers[column[: -len(SKETCH_SUFFIX)]] = (
+            np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(cells), 1 << precision)
+        )
+    return SketchStore(cells, registers, precision)
@@ -0,0 +1,140 @@
+"""
+warehouse.py
+
+Single managed DuckDB warehouse (data/processed/imdb.duckdb) holding typed
+base tables loaded from the processed Parquet files. The build is incremental:
+a table is only reloaded when the checksum of its source dump changed. Readers
+(notebooks, the dashboard) open the file read-only through `connect()`.
+
+Usage:
+  python -m imdb_trends.warehouse                   # ingest changed dumps, reload changed tables
+  python -m imdb_trends.warehouse --raw-dir /path/to/kaggle/download
+  python -m imdb_trends.warehouse --force           # reload every table
+"""
+
+import argparse
+from pathlib import Path
+
+import duckdb
+
+from imdb_trends.ingest import ingest, load_manifest, parquet_path
+from imdb_trends.paths import PROCESSED_DIR, RAW_DIR, WAREHOUSE_PATH
+
+# Bump whenever the layout of the base tables changes; a warehouse built with a
+# different version is reloaded from scratch.
+SCHEMA_VERSION = 1
+
+# warehouse table -> IMDb dump it is loaded from
+BASE_TABLES = {
+    "basics": "title.basics",
+    "ratings": "title.ratings",
+    "crew": "title.crew",
+    "principals": "title.principals",
+    "akas": "title.akas",
+    "episode": "title.episode",
+    "names": "name.basics",
+}
+
+
+def connect(read_only: bool = True, db_path: Path = WAREHOUSE_PATH):
+    """Open the warehouse. Analysis code should keep the default read-only mode."""
+    db_path = Path(db_path)
+    if read_only and not db_path.exists():
+        raise FileNotFoundError(
+            f"Warehouse not found at {db_path}. Build it with `python -m imdb_trends.warehouse`."
+        )
+    return duckdb.connect(str(db_path), read_only=read_only)
+
+
+def init_metadata(con):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER,
+            applied_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS table_loads (
+            table_name VARCHAR PRIMARY KEY,
+            source_sha256 VARCHAR,
+            row_count BIGINT,
+            loaded_at TIMESTAMP DEFAULT current_timestamp
+        )
+    """)
+
+
+def current_version(con):
+    row = con.execute("SELECT max(version) FROM schema_version").fetchone()
+    return row[0] if row else None
+
+
+def load_table(con, table: str, src: Path):
+    """Replace a base table with the full contents of its Parquet file."""
+    con.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_parquet('{src}')")
+
+
+def record_load(con, table: str, checksum: str):
+    rows = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    con.execute("""
+        INSERT OR REPLACE INTO table_loads (table_name, source_sha256, row_count, loaded_at)
+        VALUES (?, ?, ?, current_timestamp)
+    """, [table, checksum, rows])
+
+
+def build_warehouse(processed_dir: Path = PROCESSED_DIR, db_path: Path = WAREHOUSE_PATH, force: bool = False) -> dict:
+    """
+    Load every base table whose processed Parquet changed since the last build.
+
+    Returns a mapping of table name to "loaded", "unchanged" or "missing".
+    """
+    manifest = load_manifest(processed_dir)
+    con = connect(read_only=False, db_path=db_path)
+    init_metadata(con)
+
+    if current_version(con) != SCHEMA_VERSION:
+        # layout changed (or fresh file): forget previous loads and reload everything
+        con.execute("DELETE FROM table_loads")
+        force = True
+
+    loaded = dict(con.execute("SELECT table_name, source_sha256 FROM table_loads").fetchall())
+    status = {}
+
+    for table, name in BASE_TABLES.items():
+        src = parquet_path(name, processed_dir)
+        checksum = manifest.get(name, {}).get("source", {}).get("sha256")
+        if not src.exists() or checksum is None:
+            status[table] = "missing"
+            continue
+        if not force and loaded.get(table) == checksum:
+            status[table] = "unchanged"
+            continue
+
+        con.execute("BEGIN TRANSACTION")
+        load_table(con, table, src)
+        record_load(con, table, checksum)
+        con.execute("COMMIT")
+        status[table] = "loaded"
+
+    if current_version(con) != SCHEMA_VERSION:
+        con.execute("INSERT INTO schema_version (version) VALUES (?)", [SCHEMA_VERSION])
+
+    con.close()
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or update the IMDb DuckDB warehouse.")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR, help="directory holding the raw .tsv/.tsv.gz files")
+    parser.add_argument("--processed-dir", type=Path, default=PROCESSED_DIR, help="directory for the Parquet files")
+    parser.add_argument("--db", type=Path, default=WAREHOUSE_PATH, help="warehouse file to build")
+    parser.add_argument("--force", action="store_true", help="reload every table")
+    args = parser.parse_args(argv)
+
+    ingest(raw_dir=args.raw_dir, out_dir=args.processed_dir, force=args.force)
+    status = build_warehouse(args.processed_dir, args.db, force=args.force)
+    for table, state in status.items():
+        print(f"{table:<12} {state}")
+
+
+if __name__ == "__main__":
+    main()
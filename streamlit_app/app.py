@@ -1,9 +1,9 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import duckdb
 import plotly.express as px
-import zipfile
-import os
 
 st.set_page_config(page_title="IMDb Dashboard", layout="wide")
 
@@ -37,48 +37,126 @@ st.title("IMDb Dashboard Overview")
 
 st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
 
-# unzip file
-ZIP_PATH = "./streamlit_app/data/homepage_master.zip"
-CSV_PATH = "./streamlit_app/data/homepage_master.csv"
-
-if not os.path.exists(CSV_PATH):
-    with zipfile.ZipFile(ZIP_PATH, "r") as z:
-        z.extractall("./streamlit_app/data")
-
-# cache data
-@st.cache_data
-def load_homepage_data():
-    return duckdb.read_csv(CSV_PATH).df()
-
-@st.cache_data
-def get_genre_df(df):
-    return df["genres"].str.split(",").explode().reset_index(name="genre")
-
-@st.cache_data
-def get_yearly_counts(df):
-    return (
-        df.groupby(["startYear", "titleType"])
-        .size()
-        .reset_index(name="count")
+# the app runs from the repo root; the shared pipeline package lives there too
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from imdb_trends.cube import RATING_BIN_WIDTH, RATING_BINS
+from imdb_trends.genres import GENRES, decode, encode
+from imdb_trends.sketches import load_sketches
+from streamlit_app.queries import Table, define, fetch_one
+
+CUBE_PATH = "./streamlit_app/data/homepage_cube.parquet"
+SKETCHES_PATH = "./streamlit_app/data/homepage_sketches.parquet"
+
+# the cube is a few thousand rows, so it is loaded into memory once per process
+# (a Table with indexes is loaded; one without is a view that re-reads the file)
+CUBE_TABLES = {"homepage_cube": Table(CUBE_PATH, indexes=("startYear",))}
+
+# distinct-people sketches per (startYear, titleType, genre) cell
+@st.cache_resource
+def get_sketches():
+    return load_sketches(SKETCHES_PATH)
+
+define("homepage_filter_options", """
+    SELECT
+        MIN(startYear),
+        MAX(startYear),
+        list(DISTINCT titleType ORDER BY titleType),
+        bit_or(genre_mask)
+    FROM homepage_cube
+""", CUBE_TABLES)
+
+def get_filter_options():
+    year_min, year_max, title_types, genre_mask = fetch_one("homepage_filter_options")
+    return int(year_min), int(year_max), list(title_types), sorted(decode(genre_mask or 0))
+
+# every widget change rolls up the matching cube cells; no title rows are read.
+# genres are bitmasks (bit i = GENRES[i]), so genre filters and counts are integer ops
+define("homepage_dashboard", """
+    WITH filtered AS MATERIALIZED (
+        SELECT *
+        FROM homepage_cube
+        WHERE startYear BETWEEN $year_from AND $year_to
+          AND ($title_type = 'All' OR titleType = $title_type)
+          AND ($genres = 0 OR genre_mask & $genres != 0)
+    ),
+    yearly AS (
+        SELECT startYear, titleType, SUM(title_count) AS count
+        FROM filtered
+        GROUP BY startYear, titleType
+    ),
+    trend AS (
+        SELECT startYear, SUM(rating_sum) / SUM(title_count) AS averageRating
+        FROM filtered
+        GROUP BY startYear
+    ),
+    genre_counts AS (
+        SELECT CAST($genre_names AS VARCHAR[])[g.bit + 1] AS genre, SUM(title_count) AS count
+        FROM filtered, range(len(CAST($genre_names AS VARCHAR[]))) AS g(bit)
+        WHERE genre_mask & (1::UINTEGER << g.bit) != 0
+        GROUP BY g.bit
+    ),
+    rating_bins AS (
+        SELECT i * $bin_width AS rating_bin, SUM(rating_bins[i + 1]) AS count
+        FROM filtered, range($bins) AS r(i)
+        GROUP BY i
+        HAVING SUM(rating_bins[i + 1]) > 0
     )
-
-@st.cache_data
-def get_rating_trend(df):
-    return (
-        df.groupby("startYear")["averageRating"]
-        .mean()
-        .reset_index()
+    SELECT
+        (SELECT SUM(title_count) FILTER (WHERE titleType = 'movie') FROM filtered) AS movies_count,
+        (SELECT SUM(title_count) FILTER (WHERE titleType IN ('tvSeries', 'tvMiniSeries')) FROM filtered) AS tv_count,
+        (SELECT COUNT(DISTINCT titleType) FROM filtered) AS title_types,
+        (SELECT COUNT(*) FROM genre_counts) AS genres_count,
+        (SELECT SUM(rating_sum) / SUM(title_count) FROM filtered) AS avg_rating,
+        (SELECT SUM(vote_sum) FROM filtered) AS total_votes,
+        (SELECT list(yearly ORDER BY startYear, titleType) FROM yearly) AS yearly_counts,
+        (SELECT list(trend ORDER BY startYear) FROM trend) AS rating_trend,
+        (SELECT list(genre_counts ORDER BY genre) FROM genre_counts) AS genre_counts,
+        (SELECT list(rating_bins ORDER BY rating_bin) FROM rating_bins) AS rating_bins
+""", CUBE_TABLES)
+
+def count_people(years, title_type, genres):
+    """Approximate distinct directors/actors over the union of the matching cells."""
+    store = get_sketches()
+    cells = store.cells
+    mask = cells["startYear"].between(years[0], years[1])
+    if title_type != "All":
+        mask &= cells["titleType"] == title_type
+    if genres:
+        mask &= (cells["genre_mask"] & encode(genres)) != 0
+    return store.count("directors", mask), store.count("actors", mask)
+
+def load_dashboard(years, title_type, genres):
+    row = fetch_one(
+        "homepage_dashboard",
+        year_from=years[0],
+        year_to=years[1],
+        title_type=title_type,
+        genres=encode(genres),
+        genre_names=list(GENRES),
+        bin_width=RATING_BIN_WIDTH,
+        bins=RATING_BINS,
     )
-
-# loader
-with st.spinner("Loading data..."):
-    df = load_homepage_data()
+    stats = dict(zip(
+        ["movies_count", "tv_count", "title_types", "genres_count",
+         "avg_rating", "total_votes"],
+        row[:6]
+    ))
+    stats["directors_count"], stats["actors_count"] = count_people(years, title_type, genres)
+    charts = {
+        name: pd.DataFrame(rows or [], columns=columns)
+        for name, rows, columns in [
+            ("yearly_counts", row[6], ["startYear", "titleType", "count"]),
+            ("rating_trend", row[7], ["startYear", "averageRating"]),
+            ("genre_counts", row[8], ["genre", "count"]),
+            ("rating_bins", row[9], ["rating_bin", "count"]),
+        ]
+    }
+    return stats, charts
 
 # sidebar - global filters
 with st.sidebar:
     st.header("Filters")
-    year_min = int(df["startYear"].min())
-    year_max = int(df["startYear"].max())
+    year_min, year_max, title_types, all_genres = get_filter_options()
 
     selected_years = st.slider(
         "Year Range",
@@ -86,26 +164,16 @@ with st.sidebar:
         (year_min, year_max)
     )
 
-    title_options = ["All"] + sorted(df["titleType"].unique())
+    title_options = ["All"] + title_types
     selected_title_type = st.selectbox("Title Type", title_options)
 
-    all_genres = sorted(df["genres"].str.split(",").explode().unique())
     selected_genres = st.multiselect("Genres", all_genres)
 
-filtered_df = df[
-    (df["startYear"] >= selected_years[0]) &
-    (df["startYear"] <= selected_years[1])
-]
-
-if selected_title_type != "All":
-    filtered_df = filtered_df[filtered_df["titleType"] == selected_title_type]
-
-if selected_genres:
-    filtered_df = filtered_df[
-        filtered_df["genres"].apply(
-            lambda x: any(g in x.split(",") for g in selected_genres)
-        )
-    ]
+# loader
+with st.spinner("Loading data..."):
+    stats, charts = load_dashboard(
+        selected_years, selected_title_type, tuple(selected_genres)
+    )
 
 # helper function
 def format_number(num):
@@ -125,24 +193,16 @@ with st.expander("Key Statistics", expanded=True):
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        movies_count = filtered_df[filtered_df["titleType"] == "movie"].shape[0]
-        st.metric("Movies", f"{movies_count:,}", delta="Total Films")
+        st.metric("Movies", f"{stats['movies_count'] or 0:,}", delta="Total Films")
 
     with col2:
-        tv_count = filtered_df[
-            filtered_df["titleType"].isin(["tvSeries", "tvMiniSeries"])
-        ].shape[0]
-        st.metric("TV Shows", f"{tv_count:,}", delta="Series & Mini-Series")
+        st.metric("TV Shows", f"{stats['tv_count'] or 0:,}", delta="Series & Mini-Series")
 
     with col3:
-        title_types = filtered_df["titleType"].nunique()
-        st.metric("Title Types", title_types, delta="Unique Categories")
+        st.metric("Title Types", stats["title_types"], delta="Unique Categories")
 
     with col4:
-        genres_count = (
-            filtered_df["genres"].str.split(",").explode().nunique()
-        )
-        st.metric("Genres", genres_count, delta="Unique Genres")
+        st.metric("Genres", stats["genres_count"], delta="Unique Genres")
 
 # performance metrics
 with st.expander("Performance Metrics", expanded=True):
@@ -150,24 +210,20 @@ with st.expander("Performance Metrics", expanded=True):
     col5, col6, col7, col8 = st.columns(4)
 
     with col5:
-        avg_rating = round(filtered_df["averageRating"].mean(), 2)
+        avg_rating = round(stats["avg_rating"] or 0, 2)
         st.metric("Average Rating", f"{avg_rating} / 10", delta="Overall Score")
 
     with col6:
-        total_votes = int(filtered_df["numVotes"].sum())
+        total_votes = int(stats["total_votes"] or 0)
         st.metric("Total Votes", format_number(total_votes), delta="Community Engagement")
 
     with col7:
-        directors_count = (
-            filtered_df["directors"].str.split(",").explode().nunique()
-        )
-        st.metric("Directors", f"{directors_count:,}", delta="Unique Directors")
+        directors = stats["directors_count"]
+        st.metric("Directors", f"~{directors.value:,}", delta=f"Unique Directors (±{directors.error:,})")
 
     with col8:
-        actors_count = (
-            filtered_df["actors"].str.split(",").explode().nunique()
-        )
-        st.metric("Actors", f"{actors_count:,}", delta="Unique Actors")
+        actors = stats["actors_count"]
+        st.metric("Actors", f"~{actors.value:,}", delta=f"Unique Actors (±{actors.error:,})")
 
 st.markdown("---")
 
@@ -177,10 +233,8 @@ st.subheader("Trends Over Time")
 row1_col1, row1_col2 = st.columns(2)
 
 with row1_col1:
-    yearly_counts = get_yearly_counts(filtered_df)
-
     fig_count = px.line(
-        yearly_counts,
+        charts["yearly_counts"],
         x="startYear",
         y="count",
         color="titleType",
@@ -192,10 +246,8 @@ with row1_col1:
     st.plotly_chart(fig_count, width = 'content')
 
 with row1_col2:
-    rating_trend = get_rating_trend(filtered_df)
-
     fig_rating = px.line(
-        rating_trend,
+        charts["rating_trend"],
         x="startYear",
         y="averageRating",
         markers=True,
@@ -213,13 +265,8 @@ st.subheader("Distributions")
 row2_col1, row2_col2 = st.columns(2)
 
 with row2_col1:
-    genre_df = get_genre_df(filtered_df)
-    genre_counts = (
-        genre_df.groupby("genre").size().reset_index(name="count")
-    )
-
     fig_genre = px.treemap(
-        genre_counts,
+        charts["genre_counts"],
         path=["genre"],
         values="count",
         title="Genre Distribution"
@@ -242,11 +289,13 @@ with row2_col1:
     st.plotly_chart(fig_genre, width = 'content')
 
 with row2_col2:
+    # ratings arrive pre-binned in 0.5 steps
     fig_hist = px.histogram(
-        filtered_df,
-        x="averageRating",
-        nbins=20,
-        labels={"averageRating": "IMDb Rating"},
+        charts["rating_bins"],
+        x="rating_bin",
+        y="count",
+        histfunc="sum",
+        labels={"rating_bin": "IMDb Rating"},
         title="Rating Distribution"
     )
     
@@ -270,6 +319,7 @@ with row2_col2:
     )
     
     fig_hist.update_traces(
+        xbins=dict(start=0, end=10, size=0.5),
         marker=dict(
             line=dict(width=1.5, color="white"),
             opacity=0.85
@@ -1,7 +1,13 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
-import duckdb
 import plotly.express as px
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from imdb_trends.autocomplete import PICKER_SIZE, load_autocomplete
+from streamlit_app.queries import Table, define, fetch_df, fetch_one
+
 st.set_page_config(page_title="Director Movie Explorer", layout="wide")
 st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
 
@@ -41,12 +47,37 @@ st.markdown("""
 
 st.title("Director Movie Explorer")
 
-@st.cache_data
-def load_director_data():
-    return duckdb.read_csv("./streamlit_app/data/director_movies_filter.csv").df()
+DIM_PATH = "./streamlit_app/data/director_dim.parquet"
+TOP_MOVIES_PATH = "./streamlit_app/data/director_top_movies.parquet"
+DIRECTOR_SEARCH_DIR = "./streamlit_app/data/director_search"
+
+# picker sort choices -> name index exported for that order
+SORT_ORDERS = {"Total votes": "votes", "Film count": "movies"}
+
+# only the small dimension and the top-N table are loaded, with an index on
+# directorId for point lookups
+define("director_stats", """
+    SELECT
+        movie_count, avg_rating, total_votes, weighted_rating, rolling_rating,
+        first_year, last_year, career_span, rating_std, peak_decade
+    FROM director_dim
+    WHERE directorId = $id
+""", {"director_dim": Table(DIM_PATH, indexes=("directorId",))})
 
-with st.spinner("Loading data..."):
-    df = load_director_data()
+define("director_top_movies", """
+    SELECT primaryTitle, averageRating, numVotes, runtimeMinutes
+    FROM director_top_movies
+    WHERE directorId = $id
+    ORDER BY rank
+""", {"director_top_movies": Table(TOP_MOVIES_PATH, indexes=("directorId",))})
+
+# memory-mapped name indexes, one per picker sort order
+@st.cache_resource
+def get_director_search(order):
+    return load_autocomplete(Path(DIRECTOR_SEARCH_DIR) / order)
+
+def load_director(director_id):
+    return fetch_one("director_stats", id=director_id), fetch_df("director_top_movies", id=director_id)
 
 # Director Selection Section
 st.markdown("### Select a Director")
@@ -54,29 +85,64 @@ st.markdown("### Select a Director")
 col1, col2 = st.columns([2, 3])
 
 with col1:
-    directors = sorted(df["director"].unique())
-    selected_director = st.selectbox("Choose from the list", directors, label_visibility="collapsed")
+    sort_label = st.radio("Sort by", list(SORT_ORDERS), horizontal=True)
+    name_query = st.text_input(
+        "Search directors",
+        placeholder="Start typing a director's name",
+        live=True,
+    )
+    # only the best matches are sent to the browser, never the full list
+    director_search = get_director_search(SORT_ORDERS[sort_label])
+    if name_query:
+        candidates = director_search.suggest(name_query, limit=PICKER_SIZE)
+    else:
+        candidates = director_search.top(PICKER_SIZE)
+    candidate_names = {c.ref: c.label for c in candidates}
+
+    selected_id = st.selectbox(
+        "Choose from the list",
+        list(candidate_names),
+        format_func=candidate_names.get,
+        label_visibility="collapsed"
+    )
+
+if selected_id is None:
+    st.warning("No directors match your search.")
+    st.stop()
+
+stats, top3 = load_director(selected_id)
+selected_director = candidate_names[selected_id]
 
 with col2:
     # Show director stats
-    director_df = df[df["director"] == selected_director]
-    if not director_df.empty:
+    if stats is not None:
+        (movie_count, avg_rating, total_votes, weighted_rating, rolling_rating,
+         first_year, last_year, career_span, rating_std, peak_decade) = stats
         col_stat1, col_stat2, col_stat3 = st.columns(3)
         with col_stat1:
-            st.metric("Total Movies", len(director_df))
+            st.metric("Total Movies", movie_count)
         with col_stat2:
-            st.metric("Avg Rating", f"{director_df['averageRating'].mean():.2f}")
+            st.metric("Avg Rating", f"{avg_rating:.2f}")
         with col_stat3:
-            st.metric("Total Votes", f"{director_df['numVotes'].sum():,}")
+            st.metric("Total Votes", f"{int(total_votes):,}")
 
-st.markdown("---")
+        # career aggregates precomputed in director_stats
+        col_stat4, col_stat5, col_stat6 = st.columns(3)
+        with col_stat4:
+            st.metric("Vote-weighted Rating", f"{weighted_rating:.2f}" if weighted_rating is not None else "n/a")
+        with col_stat5:
+            st.metric(
+                "Last 5 Films",
+                f"{rolling_rating:.2f}",
+                delta=f"{rolling_rating - avg_rating:+.2f} vs career",
+            )
+        with col_stat6:
+            st.metric("Rating Std Dev", f"{rating_std:.2f}" if rating_std is not None else "n/a")
+        if first_year is not None:
+            peak = f", strongest in the {peak_decade}s" if peak_decade is not None else ""
+            st.caption(f"Active {first_year}–{last_year} ({career_span} years){peak}")
 
-# Top Movies Section
-top3 = (
-    df[df["director"] == selected_director]
-    .sort_values("averageRating", ascending=False)
-    .head(3)
-)
+st.markdown("---")
 
 if top3.empty:
     st.warning("No movies found for this director.")
@@ -89,7 +155,7 @@ else:
         y="averageRating",
         text="averageRating",
         labels=dict(primaryTitle="Movie Title", averageRating="Rating"),
-        title=f"Top Three IMDb Rated Movies by {selected_director}",
+        title=f"Top {len(top3)} IMDb Rated Movies by {selected_director}",
         color="averageRating",
         color_continuous_scale="Purp"
     )
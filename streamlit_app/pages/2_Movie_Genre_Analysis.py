@@ -1,9 +1,14 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import duckdb
 import plotly.express as px
 import plotly.graph_objects as go
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from streamlit_app.queries import Table, define, fetch_df, fetch_one
+
 st.set_page_config(page_title="Movie Genre Analysis", layout="wide")
 st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
 
@@ -42,58 +47,90 @@ st.markdown("""
 st.header("Movie Genre Analysis: Popularity & Quality Over Time")
 st.markdown("---")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("./streamlit_app/data/genre_movies_sampled.csv")
+STATS_PATH = Path("./streamlit_app/data/genre_year_stats.parquet")
+OVERVIEW_PATH = Path("./streamlit_app/data/genre_overview.parquet")
 
-with st.spinner("Loading data..."):
-    df = load_data()
-
-con = duckdb.connect()
-con.register("movies", df)
-
-genre_year_stats = con.execute("""
-    SELECT
-        genre,
-        startYear,
-        ROUND(MEDIAN(averageRating), 2) AS median_rating,
-        ROUND(MEDIAN(numVotes), 2) AS median_votes,
-        COUNT(*) AS movie_count
-    FROM movies
-    GROUP BY genre, startYear
+# genres with fewer than this share of the movies are left out of the insights
+INSIGHT_MIN_SHARE = 0.01
+
+# the stats are exported from the warehouse, which a fresh clone does not have
+if not (STATS_PATH.exists() and OVERVIEW_PATH.exists()):
+    st.warning(
+        "The genre statistics have not been built yet. Put the IMDb dumps in `data/raw/` and run "
+        "`python -m imdb_trends.pipeline export:genre_years` to create them."
+    )
+    st.stop()
+
+# exact per-(genre, year) stats over every rated movie, exported from the warehouse
+STATS_TABLE = {"genre_year_stats": Table(str(STATS_PATH))}
+OVERVIEW_TABLE = {"genre_overview": Table(str(OVERVIEW_PATH))}
+
+define("genre_year_stats", """
+    SELECT genre, startYear, median_rating, median_votes, movie_count
+    FROM genre_year_stats
     ORDER BY genre, startYear
-""").fetchdf()
-
-top_genres = (
-    genre_year_stats.groupby("genre")["movie_count"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(10)
-    .index.tolist()
-)
+""", STATS_TABLE)
+
+define("genre_totals", """
+    SELECT genre, SUM(movie_count) AS movie_count
+    FROM genre_year_stats
+    GROUP BY genre
+    ORDER BY movie_count DESC, genre
+""", STATS_TABLE)
+
+define("genre_overview", """
+    SELECT median_rating, median_votes, movie_count
+    FROM genre_overview
+    WHERE genre IS NULL
+""", OVERVIEW_TABLE)
+
+define("genre_overview_by_genre", """
+    SELECT genre, median_rating, median_votes, movie_count
+    FROM genre_overview
+    WHERE genre IS NOT NULL
+""", OVERVIEW_TABLE)
+
+with st.spinner("Loading data..."):
+    genre_year_stats = fetch_df("genre_year_stats")
+    genre_totals = fetch_df("genre_totals")
+    median_rating, median_votes, movie_rows = fetch_one("genre_overview")
+    by_genre = fetch_df("genre_overview_by_genre")
+
+top_genres = genre_totals["genre"].head(10).tolist()
 
 genre_year_top = genre_year_stats[genre_year_stats["genre"].isin(top_genres)]
 
+by_genre["share"] = by_genre["movie_count"] / max(movie_rows, 1)
+common = by_genre[by_genre["share"] >= INSIGHT_MIN_SHARE]
+if common.empty:
+    common = by_genre
+
 st.write("")
 with st.expander("Insights", expanded=True):
-    st.write("• Median ratings have been stable for most genres since 1995.")
-    st.write("• Audience engagement (median votes) has declined compared to the early 2000s.")
-    st.write("• Documentaries have the highest median quality (~7.23) but lowest popularity.")
-    st.write("• Mystery, Adventure, Crime are highly popular but moderately rated (~6.0).")
-    st.write("• Horror is the lowest-rated genre (~4.89) but maintains moderate interest.")
-    st.write("• Drama is the most produced genre (24.8% of total).")
+    if not common.empty:
+        best = common.loc[common["median_rating"].idxmax()]
+        worst = common.loc[common["median_rating"].idxmin()]
+        popular = common.loc[common["median_votes"].idxmax()]
+        largest = common.loc[common["movie_count"].idxmax()]
+        st.write(f"• {best['genre']} has the highest median rating ({best['median_rating']:.2f}), "
+                 f"with {best['median_votes']:,.0f} median votes.")
+        st.write(f"• {worst['genre']} has the lowest median rating ({worst['median_rating']:.2f}), "
+                 f"with {worst['median_votes']:,.0f} median votes.")
+        st.write(f"• {popular['genre']} draws the most votes (median {popular['median_votes']:,.0f}) "
+                 f"at a median rating of {popular['median_rating']:.2f}.")
+        st.write(f"• {largest['genre']} is the most produced genre ({largest['share']:.1%} of movies).")
 
 with st.expander("Key Statistics", expanded=True):
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Median Rating (All Data)", f"{df['averageRating'].median():.2f}")
+        st.metric("Median Rating (All Data)", f"{median_rating:.2f}")
 
     with col2:
-        st.metric("Median Votes (All Data)", f"{df['numVotes'].median():.2f}")
+        st.metric("Median Votes (All Data)", f"{median_votes:.2f}")
 
     with col3:
-        st.metric("Total Movies (Sampled)", f"{len(df):,}")
+        st.metric("Total Movies", f"{movie_rows:,}")
 
     with col4:
         st.metric("Top Genres Analyzed", len(top_genres))
@@ -246,8 +283,7 @@ st.markdown("---")
 
 st.subheader("Genre Distribution in Dataset")
 
-genre_counts = df['genre'].value_counts().reset_index()
-genre_counts.columns = ['genre', 'movie_count']
+genre_counts = genre_totals
 
 top_n = 10
 top_genres = genre_counts.head(top_n)
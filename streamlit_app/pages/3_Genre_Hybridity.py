@@ -1,9 +1,14 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import duckdb
 import plotly.express as px
 import plotly.graph_objects as go
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from streamlit_app.queries import Table, define, fetch_df
+
 st.set_page_config(page_title="Genre Hybridity Explorer", layout="wide")
 st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
 
@@ -23,22 +28,32 @@ st.markdown("""
 st.header("Genre Hybridity Paradox Explorer")
 st.markdown("Explore whether genre blending improves popularity and quality.")
 
-@st.cache_data
-def load_data():
-    return pd.read_csv("./streamlit_app/data/genre_hybridity_master.csv")
+STATS_PATH = "./streamlit_app/data/genre_hybridity_stats.parquet"
+COMBOS_PATH = "./streamlit_app/data/genre_hybridity_combos.parquet"
 
-df = load_data()
+# both tables are precomputed per (genre, hybridity_bucket) by the pipeline
+# (python -m imdb_trends.exports genre_hybridity), so the page only does lookups
+STATS_TABLE = {"genre_hybridity_stats": Table(STATS_PATH)}
 
-con = duckdb.connect()
-con.register("movies", df)
+define("hybridity_genres", """
+    SELECT DISTINCT genre FROM genre_hybridity_stats ORDER BY genre
+""", STATS_TABLE)
 
-genres = sorted(
-    set(
-        g.strip()
-        for row in df['genres']
-        for g in row.split(",")
-    )
-)
+define("hybridity_stats", """
+    SELECT hybridity_bucket, movie_count, median_rating, median_votes_year, rating_std
+    FROM genre_hybridity_stats
+    WHERE genre = $genre
+    ORDER BY hybridity_bucket
+""", STATS_TABLE)
+
+define("hybridity_combos", """
+    SELECT genres, movie_count AS count, avg_rating, avg_votes_year AS avg_votes
+    FROM genre_hybridity_combos
+    WHERE genre = $genre AND hybridity_bucket = $level
+    ORDER BY rank
+""", {"genre_hybridity_combos": Table(COMBOS_PATH)})
+
+genres = fetch_df("hybridity_genres")["genre"].tolist()
 
 st.markdown("---")
 
@@ -68,54 +83,10 @@ with col3:
         compare_genre = None
 
 def get_genre_combinations(genre, hybridity_level):
-    if hybridity_level == "Pure":
-        query = f"""
-            SELECT genres, COUNT(*) as count,
-                   ROUND(AVG(averageRating), 2) as avg_rating,
-                   ROUND(AVG(votes_per_year), 2) as avg_votes
-            FROM movies
-            WHERE genres = '{genre}' AND hybridity_bucket = 'Pure'
-            GROUP BY genres
-            ORDER BY count DESC
-        """
-    elif hybridity_level == "Hybrid-2":
-        query = f"""
-            SELECT genres, COUNT(*) as count,
-                   ROUND(AVG(averageRating), 2) as avg_rating,
-                   ROUND(AVG(votes_per_year), 2) as avg_votes
-            FROM movies
-            WHERE genres LIKE '%{genre}%' AND hybridity_bucket = 'Hybrid-2'
-            GROUP BY genres
-            ORDER BY count DESC
-            LIMIT 3
-        """
-    else:
-        query = f"""
-            SELECT genres, COUNT(*) as count,
-                   ROUND(AVG(averageRating), 2) as avg_rating,
-                   ROUND(AVG(votes_per_year), 2) as avg_votes
-            FROM movies
-            WHERE genres LIKE '%{genre}%' AND hybridity_bucket = 'Hybrid-3+'
-            GROUP BY genres
-            ORDER BY count DESC
-            LIMIT 3
-        """
-    return con.execute(query).fetchdf()
+    return fetch_df("hybridity_combos", genre=genre, level=hybridity_level)
 
 def compute_hybridity_stats(genre):
-    query = f"""
-        SELECT
-            hybridity_bucket,
-            COUNT(*) AS movie_count,
-            ROUND(MEDIAN(averageRating), 3) AS median_rating,
-            ROUND(MEDIAN(votes_per_year), 2) AS median_votes_year,
-            ROUND(STDDEV(averageRating), 3) AS rating_std
-        FROM movies
-        WHERE genres LIKE '%{genre}%'
-        GROUP BY hybridity_bucket
-        ORDER BY hybridity_bucket
-    """
-    return con.execute(query).fetchdf()
+    return fetch_df("hybridity_stats", genre=genre)
 
 def find_best_category(stats):
     best_rating_idx = stats['median_rating'].idxmax()
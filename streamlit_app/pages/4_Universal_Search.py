@@ -1,8 +1,16 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
-import duckdb
 import pandas as pd
 import kagglehub
 import os
+from collections import OrderedDict
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from imdb_trends.autocomplete import load_autocomplete
+from imdb_trends.search import AUTOCOMPLETE_DIR, ensure_search_index, load_search_index
+from streamlit_app.queries import Table, define, fetch_df, fetch_one
 
 @st.cache_resource
 def download_kaggle_data():
@@ -29,76 +37,38 @@ h1 {
 
 st.title("Universal Movie Search")
 
-@st.cache_resource
-def load_db():
-    con = duckdb.connect()
-    con.execute(f"""
-        CREATE TABLE movies AS
-        SELECT * FROM read_parquet('{DATA_PATH}/movies_master_clean.parquet');
-    """)
-
-    con.execute(f"""
-        CREATE TABLE actors AS
-        SELECT * FROM read_parquet('{DATA_PATH}/movie_actors.parquet');
-    """)
-
-    con.execute(f"""
-        CREATE TABLE directors AS
-        SELECT * FROM read_parquet('{DATA_PATH}/movie_directors.parquet');
-    """)
-
-    return con
-
-con = load_db()
-
-st.markdown("<div style='margin-top:20px;'></div>", unsafe_allow_html=True)
-
-search_query = st.text_input("Search by Movie, Actor, or Director")
-
-col1, col2, col3, col4, col5 = st.columns(5)
-
-with col1:
-    year_min, year_max = st.slider("Year", 1900, 2025, (1990, 2025))
-with col2:
-    min_rating = st.slider("Rating", 0.0, 10.0, 5.0)
-with col3:
-    min_votes = st.number_input("Min Votes", 0, 1000000, 1000, step=1000)
-with col4:
-    type_filter = st.selectbox("Type", ["All", "movie", "tvSeries"])
-with col5:
-    genre_filter = st.text_input("Genre contains")
-
-page_size = 25
-
-if "page" not in st.session_state:
-    st.session_state.page = 1
-
-where_clauses = []
-
-if search_query:
-    where_clauses.append(f"""
-        (
-            m.displayTitle ILIKE '%{search_query}%'
-            OR m.tconst IN (SELECT tconst FROM actors WHERE actorName ILIKE '%{search_query}%')
-            OR m.tconst IN (SELECT tconst FROM directors WHERE directorName ILIKE '%{search_query}%')
-        )
-    """)
-
-where_clauses.append(f"m.startYear BETWEEN {year_min} AND {year_max}")
-where_clauses.append(f"m.averageRating >= {min_rating}")
-where_clauses.append(f"m.numVotes >= {min_votes}")
-
-if type_filter != "All":
-    where_clauses.append(f"m.titleType = '{type_filter}'")
+SEARCH_TABLES = {
+    "search_movies": Table(f"{DATA_PATH}/movies_master_clean.parquet"),
+    "search_actors": Table(f"{DATA_PATH}/movie_actors.parquet"),
+    "search_directors": Table(f"{DATA_PATH}/movie_directors.parquet"),
+}
 
-if genre_filter:
-    where_clauses.append(f"m.genres ILIKE '%{genre_filter}%'")
+# every widget value is bound as a parameter; an unused filter matches everything
+FILTERS = """
+    m.startYear BETWEEN $year_min AND $year_max
+    AND m.averageRating >= $min_rating
+    AND m.numVotes >= $min_votes
+    AND ($type_filter = 'All' OR m.titleType = $type_filter)
+    AND ($genre_filter = '' OR contains(lower(m.genres), lower($genre_filter)))
+"""
 
-where_sql = " AND ".join(where_clauses)
+# without a text query every filtered title scores 0; with one, the index's
+# matches are registered as `matches` for that execution only
+SOURCES = {
+    "all": ("search_movies m", "0.0"),
+    "matches": ("search_movies m JOIN matches s ON s.tconst = m.tconst", "s.score"),
+}
 
-offset = (st.session_state.page - 1) * page_size
+# rows are ordered by (score, averageRating, numVotes, tconst), all descending,
+# so a page seeks past the last key of the previous one: each page is a top-N
+# over the filtered rows, never a sort of all of them followed by OFFSET
+PAGE_FILTERS = {
+    "first": "TRUE",
+    "after": "({score}, m.averageRating, m.numVotes, m.tconst) < ($score, $rating, $votes, $tconst)",
+}
 
-query = f"""
+def page_sql(from_sql, score_sql, page_filter):
+    return f"""
 WITH base AS (
     SELECT
         m.tconst,
@@ -108,12 +78,12 @@ WITH base AS (
         m.runtimeMinutes,
         m.genres,
         m.averageRating,
-        m.numVotes
-    FROM movies m
-    WHERE {where_sql}
-    ORDER BY m.averageRating DESC, m.numVotes DESC
-    LIMIT {page_size}
-    OFFSET {offset}
+        m.numVotes,
+        {score_sql} AS score
+    FROM {from_sql}
+    WHERE {FILTERS} AND {page_filter.format(score=score_sql)}
+    ORDER BY score DESC, m.averageRating DESC, m.numVotes DESC, m.tconst DESC
+    LIMIT $page_size
 ),
 actors_ranked AS (
     SELECT
@@ -123,7 +93,7 @@ actors_ranked AS (
             PARTITION BY a.tconst
             ORDER BY a.actorName
         ) AS rn
-    FROM actors a
+    FROM search_actors a
     JOIN base b ON a.tconst = b.tconst
 ),
 actors_agg AS (
@@ -138,7 +108,7 @@ directors_agg AS (
     SELECT
         d.tconst,
         STRING_AGG(d.directorName, ', ') AS directors
-    FROM directors d
+    FROM search_directors d
     JOIN base b ON d.tconst = b.tconst
     GROUP BY d.tconst
 )
@@ -151,21 +121,140 @@ SELECT
     b.averageRating,
     b.numVotes,
     COALESCE(a.actors, '') AS Actors,
-    COALESCE(d.directors, '') AS Directors
+    COALESCE(d.directors, '') AS Directors,
+    b.score,
+    b.tconst
 FROM base b
 LEFT JOIN actors_agg a ON b.tconst = a.tconst
-LEFT JOIN directors_agg d ON b.tconst = d.tconst;
+LEFT JOIN directors_agg d ON b.tconst = d.tconst
+ORDER BY b.score DESC, b.averageRating DESC, b.numVotes DESC, b.tconst DESC
 """
 
-results = con.execute(query).df()
+for source, (from_sql, score_sql) in SOURCES.items():
+    for mode, page_filter in PAGE_FILTERS.items():
+        define(f"search_page_{source}_{mode}", page_sql(from_sql, score_sql, page_filter), SEARCH_TABLES)
 
-count_query = f"""
-SELECT COUNT(*)
-FROM movies m
-WHERE {where_sql}
-"""
+define("search_count", f"SELECT COUNT(*) FROM {SOURCES['all'][0]} WHERE {FILTERS}", SEARCH_TABLES)
+define("search_count_matches", f"SELECT COUNT(*) FROM {SOURCES['matches'][0]} WHERE {FILTERS}", SEARCH_TABLES)
+
+# inverted index over titles, actor and director names, built once per download
+@st.cache_resource
+def get_search_index():
+    return load_search_index(ensure_search_index(DATA_PATH))
+
+search_index = get_search_index()
+
+# memory-mapped typeahead arrays, shared by every session
+@st.cache_resource
+def get_autocomplete():
+    return load_autocomplete(ensure_search_index(DATA_PATH) / AUTOCOMPLETE_DIR)
+
+autocomplete = get_autocomplete()
+
+st.markdown("<div style='margin-top:20px;'></div>", unsafe_allow_html=True)
+
+def use_suggestion():
+    suggestion = st.session_state.search_suggestion
+    if suggestion is not None:
+        st.session_state.search_query = suggestion.label
+    st.session_state.search_suggestion = None
+
+# live input reruns after a short typing pause, so suggestions follow the text
+search_query = st.text_input("Search by Movie, Actor, or Director", key="search_query", live=True)
+
+suggestions = [s for s in autocomplete.suggest(search_query, limit=8) if s.label != search_query]
+if suggestions:
+    st.pills(
+        "Suggestions",
+        suggestions,
+        format_func=lambda s: f"{s.label} · {s.kind}",
+        key="search_suggestion",
+        on_change=use_suggestion,
+        label_visibility="collapsed",
+    )
+
+col1, col2, col3, col4, col5 = st.columns(5)
+
+with col1:
+    year_min, year_max = st.slider("Year", 1900, 2025, (1990, 2025))
+with col2:
+    min_rating = st.slider("Rating", 0.0, 10.0, 5.0)
+with col3:
+    min_votes = st.number_input("Min Votes", 0, 1000000, 1000, step=1000)
+with col4:
+    type_filter = st.selectbox("Type", ["All", "movie", "tvSeries"])
+with col5:
+    genre_filter = st.text_input("Genre contains")
 
-total_results = con.execute(count_query).fetchone()[0]
+page_size = 25
+# pages already shown, kept per session (most recently used last) so going
+# back does not query again
+cache_pages = 8
+
+if "page" not in st.session_state:
+    st.session_state.page = 1
+if "search_cache" not in st.session_state:
+    st.session_state.search_cache = OrderedDict()
+
+# a new search starts from the first page, with no page cursors or count yet
+filters = (search_query, year_min, year_max, min_rating, min_votes, type_filter, genre_filter)
+if st.session_state.get("search_filters") != filters:
+    st.session_state.search_filters = filters
+    st.session_state.search_cursors = {}
+    st.session_state.search_total = None
+    st.session_state.page = 1
+
+params = {
+    "year_min": year_min,
+    "year_max": year_max,
+    "min_rating": min_rating,
+    "min_votes": min_votes,
+    "type_filter": type_filter,
+    "genre_filter": genre_filter,
+}
+
+# the index resolves the text query; only its matches are joined to movies
+if search_query:
+    matches = search_index.search(search_query).astype({"score": "float64"})
+    source, frames = "matches", {"matches": matches}
+else:
+    matches = None
+    source, frames = "all", None
+
+cache = st.session_state.search_cache
+cursors = st.session_state.search_cursors
+page = st.session_state.page
+page_params = {**params, "page_size": page_size}
+
+results = cache.get((filters, page))
+if results is not None:
+    cache.move_to_end((filters, page))
+else:
+    if page > 1 and page - 1 in cursors:
+        score, rating, votes, tconst = cursors[page - 1]
+        results = fetch_df(
+            f"search_page_{source}_after", frames,
+            **page_params, score=score, rating=rating, votes=votes, tconst=tconst,
+        )
+    else:
+        st.session_state.page = page = 1
+        results = fetch_df(f"search_page_{source}_first", frames, **page_params)
+    cache[(filters, page)] = results
+    while len(cache) > cache_pages:
+        cache.popitem(last=False)
+
+if not results.empty:
+    last = results.iloc[-1]
+    cursors[page] = (float(last["score"]), float(last["averageRating"]), int(last["numVotes"]), last["tconst"])
+results = results.drop(columns=["score", "tconst"])
+
+# the exact count is a plain filtered COUNT(*), taken once per search
+if st.session_state.search_total is None:
+    if matches is not None:
+        (st.session_state.search_total,) = fetch_one("search_count_matches", frames, **params)
+    else:
+        (st.session_state.search_total,) = fetch_one("search_count", **params)
+total_results = st.session_state.search_total
 total_pages = max((total_results - 1) // page_size + 1, 1)
 
 st.markdown(f"### Results ({total_results:,} matches)")
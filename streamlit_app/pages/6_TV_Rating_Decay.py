@@ -0,0 +1,256 @@
+import sys
+from pathlib import Path
+
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from imdb_trends.autocomplete import PICKER_SIZE, load_autocomplete
+from imdb_trends.decay import CONFIDENCE, MIN_SEASONS, MIN_SERIES_PER_SEASON, global_trend
+from streamlit_app.queries import Table, define, fetch_df, fetch_one
+
+st.set_page_config(page_title="TV Rating Decay", layout="wide")
+st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
+
+st.markdown("""
+    <style>
+    .main {
+        padding: 0rem 1rem;
+    }
+    .stMetric {
+        background-color: #f0f2f6;
+        padding: 15px;
+        border-radius: 10px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    h1 {
+        color: #1f77b4;
+        padding-bottom: 20px;
+        border-bottom: 3px solid #1f77b4;
+        margin-bottom: 30px;
+    }
+    </style>
+""", unsafe_allow_html=True)
+
+st.title("TV Rating Decay: Do Shows Get Worse Over Time?")
+
+SEASONS_PATH = "./streamlit_app/data/decay_seasons.parquet"
+SERIES_PATH = "./streamlit_app/data/decay_series.parquet"
+GLOBAL_PATH = "./streamlit_app/data/decay_global.parquet"
+TREND_PATH = "./streamlit_app/data/decay_trend.parquet"
+SERIES_SEARCH_DIR = "./streamlit_app/data/decay_search"
+
+MAX_SEASON_PLOT = 10
+SLOPE_BINS = 40
+
+# season curves and per-series fits are loaded once per process with an index
+# on series_tconst, so showing any series is two point lookups
+SERIES_TABLE = {"decay_series": Table(SERIES_PATH, indexes=("series_tconst",))}
+
+define("decay_seasons", """
+    SELECT seasonNumber, season_mean_rating, season_std_rating, season_count
+    FROM decay_seasons
+    WHERE series_tconst = $id
+    ORDER BY seasonNumber
+""", {"decay_seasons": Table(SEASONS_PATH, indexes=("series_tconst",))})
+
+define("decay_series", """
+    SELECT series_title, startYear, endYear, n_seasons, episode_count, numVotes, slope, intercept, r, pval,
+           slope_ci_low, slope_ci_high
+    FROM decay_series
+    WHERE series_tconst = $id
+""", SERIES_TABLE)
+
+define("decay_global", """
+    SELECT seasonNumber, mean_of_season_means, sem, count_series
+    FROM decay_global
+    ORDER BY seasonNumber
+""", {"decay_global": Table(GLOBAL_PATH)})
+
+# bootstrap interval of the global trend (whole series resampled)
+define("decay_trend", """
+    SELECT slope_ci_low, slope_ci_high
+    FROM decay_trend
+""", {"decay_trend": Table(TREND_PATH)})
+
+define("decay_slope_summary", """
+    SELECT
+        COUNT(*),
+        COUNT(*) FILTER (WHERE slope < 0),
+        COUNT(*) FILTER (WHERE slope < 0 AND pval < 0.05),
+        MEDIAN(slope),
+        quantile_cont(slope, 0.01),
+        quantile_cont(slope, 0.99)
+    FROM decay_series
+    WHERE slope IS NOT NULL
+""", SERIES_TABLE)
+
+# histogram of slopes over the central 98%, so a few extreme series don't flatten it
+define("decay_slope_histogram", """
+    SELECT
+        $lo + (LEAST(FLOOR((slope - $lo) / $width), $bins - 1) + 0.5) * $width AS slope,
+        COUNT(*) AS series
+    FROM decay_series
+    WHERE slope BETWEEN $lo AND $hi
+    GROUP BY 1
+    ORDER BY 1
+""", SERIES_TABLE)
+
+# memory-mapped title index behind the show picker
+@st.cache_resource
+def get_series_search():
+    return load_autocomplete(Path(SERIES_SEARCH_DIR))
+
+def format_interval(low, high):
+    """The bootstrap interval as a label, or None when it could not be estimated."""
+    if low is None or high is None:
+        return None
+    return f"{CONFIDENCE:.0%} CI {low:+.3f} to {high:+.3f}"
+
+global_df = fetch_df("decay_global")
+trend = global_trend(global_df, MIN_SERIES_PER_SEASON)
+trend_ci_low, trend_ci_high = fetch_one("decay_trend")
+total, negative, significant, median_slope, slope_lo, slope_hi = fetch_one("decay_slope_summary")
+
+st.markdown("### Across All Series")
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Global Trend", f"{trend['slope']:+.3f} / season",
+              delta=format_interval(trend_ci_low, trend_ci_high), delta_color="off")
+with col2:
+    st.metric("Trend p-value", f"{trend['pvalue']:.3g}")
+with col3:
+    st.metric(f"Series with {MIN_SEASONS}+ Seasons", f"{total:,}")
+with col4:
+    st.metric("Declining", f"{100 * negative / max(total, 1):.1f}%",
+              delta=f"{100 * significant / max(total, 1):.1f}% significant", delta_color="off")
+
+col_global, col_hist = st.columns(2)
+
+with col_global:
+    gplot = global_df[global_df["seasonNumber"].between(1, MAX_SEASON_PLOT)]
+    fig_global = px.bar(
+        gplot,
+        x="seasonNumber",
+        y="mean_of_season_means",
+        error_y="sem",
+        hover_data={"count_series": True},
+        labels={
+            "seasonNumber": "Season",
+            "mean_of_season_means": "Mean season rating",
+            "count_series": "Series",
+        },
+        title=f"Mean season rating across series (seasons 1-{MAX_SEASON_PLOT})",
+    )
+    fig_global.update_layout(yaxis_range=[0, 10], xaxis=dict(dtick=1))
+    st.plotly_chart(fig_global, width="stretch")
+
+selected = None
+
+st.markdown("---")
+st.markdown("### Look Up a Show")
+
+col_pick, col_stats = st.columns([2, 3])
+
+with col_pick:
+    name_query = st.text_input("Search shows", placeholder="Start typing a show's title", live=True)
+    series_search = get_series_search()
+    if name_query:
+        candidates = series_search.suggest(name_query, limit=PICKER_SIZE)
+    else:
+        candidates = series_search.top(PICKER_SIZE)
+    candidate_names = {c.ref: c.label for c in candidates}
+    selected_id = st.selectbox(
+        "Choose from the list",
+        list(candidate_names),
+        format_func=candidate_names.get,
+        label_visibility="collapsed",
+    )
+
+if selected_id is not None:
+    selected = fetch_one("decay_series", id=selected_id)
+    seasons = fetch_df("decay_seasons", id=selected_id)
+
+with col_hist:
+    if total:
+        width = (slope_hi - slope_lo) / SLOPE_BINS or 1.0
+        histogram = fetch_df("decay_slope_histogram", lo=slope_lo, hi=slope_hi, width=width, bins=SLOPE_BINS)
+        fig_hist = px.bar(
+            histogram,
+            x="slope",
+            y="series",
+            labels={"slope": "Slope (rating points per season)", "series": "Series"},
+            title="Distribution of per-series slopes",
+        )
+        fig_hist.update_traces(width=width)
+        fig_hist.add_vline(x=0, line_dash="dash", line_color="black")
+        if selected is not None and selected[6] is not None:
+            fig_hist.add_vline(x=selected[6], line_color="crimson", annotation_text=selected[0])
+        st.plotly_chart(fig_hist, width="stretch")
+
+if selected_id is None:
+    st.warning("No shows match your search.")
+    st.stop()
+
+(series_title, start_year, end_year, n_seasons, episode_count, num_votes,
+ slope, intercept, r, pval, slope_ci_low, slope_ci_high) = selected
+
+with col_stats:
+    col_stat1, col_stat2, col_stat3 = st.columns(3)
+    with col_stat1:
+        st.metric("Seasons", n_seasons)
+    with col_stat2:
+        st.metric("Rated Episodes", f"{episode_count:,}")
+    with col_stat3:
+        st.metric("Series Votes", f"{num_votes:,}")
+    col_stat4, col_stat5, col_stat6 = st.columns(3)
+    with col_stat4:
+        st.metric("Slope", f"{slope:+.3f} / season" if slope is not None else "n/a",
+                  delta=format_interval(slope_ci_low, slope_ci_high), delta_color="off")
+    with col_stat5:
+        st.metric("p-value", f"{pval:.3g}" if pval is not None else "n/a")
+    with col_stat6:
+        st.metric("r", f"{r:.2f}" if r is not None else "n/a")
+    if slope is None:
+        st.caption(f"A trend needs at least {MIN_SEASONS} seasons with rated episodes.")
+    elif start_year is not None:
+        st.caption(f"Aired {start_year}–{end_year or 'present'}")
+
+fig_show = go.Figure()
+fig_show.add_trace(go.Scatter(
+    x=seasons["seasonNumber"],
+    y=seasons["season_mean_rating"],
+    mode="lines+markers",
+    name="Season mean",
+    customdata=seasons[["season_count", "season_std_rating"]],
+    hovertemplate="Season %{x}<br>Rating: %{y:.2f}<br>Episodes: %{customdata[0]}<extra></extra>",
+))
+if slope is not None:
+    fig_show.add_trace(go.Scatter(
+        x=seasons["seasonNumber"],
+        y=intercept + slope * seasons["seasonNumber"],
+        mode="lines",
+        name="Trend",
+        line=dict(dash="dash"),
+        hoverinfo="skip",
+    ))
+fig_show.add_trace(go.Scatter(
+    x=global_df["seasonNumber"],
+    y=global_df["mean_of_season_means"],
+    mode="lines",
+    name="All series",
+    line=dict(color="gray", width=1),
+    hoverinfo="skip",
+))
+fig_show.update_layout(
+    title=f"Season ratings: {series_title}",
+    xaxis_title="Season",
+    yaxis_title="Mean episode rating",
+    yaxis_range=[0, 10],
+    xaxis=dict(dtick=1, range=[0.5, seasons["seasonNumber"].max() + 0.5]),
+)
+st.plotly_chart(fig_show, width="stretch")
+
+st.markdown("---")
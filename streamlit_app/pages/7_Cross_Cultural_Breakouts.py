@@ -0,0 +1,160 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+import plotly.express as px
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from imdb_trends.crossover import FOREIGN_DEFINITIONS, load_crossover
+from imdb_trends.genres import decode, encode
+
+st.set_page_config(page_title="Cross-Cultural Breakouts", layout="wide")
+st.sidebar.image("./streamlit_app/assets/logo.png", width="content")
+
+st.markdown("""
+    <style>
+    .main {
+        padding: 0rem 1rem;
+    }
+    .stMetric {
+        background-color: #f0f2f6;
+        padding: 15px;
+        border-radius: 10px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    h1 {
+        color: #1f77b4;
+        padding-bottom: 20px;
+        border-bottom: 3px solid #1f77b4;
+        margin-bottom: 30px;
+    }
+    </style>
+""", unsafe_allow_html=True)
+
+st.title("Cross-Cultural Breakouts: Which Foreign Films Find a Global Audience?")
+
+CROSSOVER_PATH = "./streamlit_app/data/crossover_votes.parquet"
+
+TOP_GENRES = 12
+
+GROUP_COLORS = {"Crossover": "#1f77b4", "Regional": "#ff7f0e"}
+
+# measures compared between the two groups: column -> label
+COMPARED = {
+    "avg_regions": "Release regions",
+    "avg_languages": "Title languages",
+    "avg_genres": "Genres",
+    "avg_rating": "Rating",
+    "avg_runtime": "Runtime (min)",
+}
+
+# sorted votes per (definition, year, genre set) with prefix sums, loaded once
+# per process; every control below only re-slices it
+@st.cache_resource
+def get_crossover():
+    return load_crossover(Path(CROSSOVER_PATH))
+
+index = get_crossover()
+strata = index.strata
+
+with st.sidebar:
+    st.header("Filters")
+    definition = st.selectbox(
+        "Foreign means",
+        list(FOREIGN_DEFINITIONS),
+        format_func=lambda name: FOREIGN_DEFINITIONS[name][0],
+    )
+    quantile = st.slider(
+        "Crossover vote quantile",
+        0.50, 0.99, 0.90, step=0.01,
+        help="A foreign movie is a crossover when its votes reach this quantile of the selection's votes.",
+    )
+    year_min, year_max = int(strata["startYear"].min()), int(strata["startYear"].max())
+    selected_years = st.slider("Year Range", year_min, year_max, (max(year_min, 1950), year_max))
+    all_genres = decode(int(np.bitwise_or.reduce(strata["genre_mask"].to_numpy())))
+    selected_genres = st.multiselect("Genres", all_genres)
+
+ids = index.select(definition, selected_years, encode(selected_genres))
+total = index.size(ids)
+
+if not total:
+    st.warning("No foreign movies match these filters.")
+    st.stop()
+
+threshold = index.quantile(ids, quantile)
+groups = index.compare(ids, threshold)
+crossover, regional = groups.set_index("group").loc[["Crossover", "Regional"], "movies"]
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Foreign Movies", f"{total:,}")
+with col2:
+    st.metric("Vote Threshold", f"{threshold:,.0f}", delta=f"{quantile:.0%} quantile", delta_color="off")
+with col3:
+    st.metric("Crossovers", f"{crossover:,}")
+with col4:
+    st.metric("Regional", f"{regional:,}")
+
+st.markdown("### Crossover vs Regional")
+
+measures = groups.melt(id_vars="group", value_vars=list(COMPARED), var_name="measure", value_name="mean")
+measures["measure"] = measures["measure"].map(COMPARED)
+fig_measures = px.bar(
+    measures,
+    x="group",
+    y="mean",
+    color="group",
+    facet_col="measure",
+    color_discrete_map=GROUP_COLORS,
+    labels={"group": "", "mean": "Mean"},
+    title="Mean per movie",
+)
+fig_measures.update_yaxes(matches=None, showticklabels=True)
+fig_measures.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+fig_measures.update_layout(showlegend=False)
+st.plotly_chart(fig_measures, width="stretch")
+
+col_genres, col_years = st.columns(2)
+
+with col_genres:
+    genres = index.genre_counts(ids, threshold)
+    genres = genres[(genres["crossover"] + genres["regional"]) > 0]
+    # share of each group's movies carrying the genre, so the groups' sizes don't dominate
+    genres["Crossover"] = genres["crossover"] / max(crossover, 1)
+    genres["Regional"] = genres["regional"] / max(regional, 1)
+    genres = genres.nlargest(TOP_GENRES, "Crossover")
+    fig_genres = px.bar(
+        genres.melt(id_vars="genre", value_vars=["Crossover", "Regional"], var_name="group", value_name="share"),
+        x="share",
+        y="genre",
+        color="group",
+        barmode="group",
+        orientation="h",
+        color_discrete_map=GROUP_COLORS,
+        labels={"share": "Share of the group's movies", "genre": "", "group": ""},
+        title=f"Top {TOP_GENRES} genres among crossovers",
+    )
+    fig_genres.update_layout(xaxis_tickformat=".0%", yaxis=dict(autorange="reversed"))
+    st.plotly_chart(fig_genres, width="stretch")
+
+with col_years:
+    years = index.year_counts(ids, threshold)
+    years["rate"] = years["crossover"] / (years["crossover"] + years["regional"]).replace(0, np.nan)
+    fig_years = px.line(
+        years,
+        x="startYear",
+        y="rate",
+        hover_data={"crossover": True, "regional": True},
+        labels={"startYear": "Year", "rate": "Crossover rate", "crossover": "Crossovers", "regional": "Regional"},
+        title="Share of foreign movies that cross over, by year",
+    )
+    fig_years.update_layout(yaxis_tickformat=".0%")
+    st.plotly_chart(fig_years, width="stretch")
+
+st.caption(
+    "The threshold is taken over the selected foreign movies, so a crossover "
+    "stands out against its own years and genres rather than against all of IMDb."
+)
+
+st.markdown("---")
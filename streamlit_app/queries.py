@@ -0,0 +1,162 @@
+"""
+queries.py
+
+Data access shared by every dashboard page. Pages register their SQL once by
+name with `define`; the SQL is fixed text with $-parameters, and values are
+always bound, never formatted in, so quotes typed into a widget cannot break a
+query. Each statement is parsed once per process and reused.
+
+All pages share one DuckDB connection per process (`st.cache_resource`), and
+every session queries it through its own cursor. Parquet files are attached as
+views the first time a query that reads them runs, so the data is never copied
+per session (or per process): scans go through the connection's one buffer
+pool, which all sessions share. Only small tables that need an index (and CSV
+files) are loaded into memory, once per process. Table and query names are
+process-wide, so pages prefix them with what they show. Results are cached on
+(query name, parameters):
+
+  define("director_stats", "SELECT ... WHERE directorId = $id",
+         tables={"director_dim": Table(DIM_PATH, indexes=("directorId",))})
+  fetch_one("director_stats", id=director_id)
+"""
+
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import duckdb
+import streamlit as st
+
+# cached results across all queries and sessions
+RESULT_CACHE_SIZE = 512
+
+SESSION_CURSOR = "_queries_cursor"
+
+
+@dataclass(frozen=True)
+class Table:
+    """
+    A Parquet file exposed to the shared connection. With `indexes` it is
+    loaded into memory instead, with an ART index on each listed column.
+    """
+
+    path: str
+    indexes: tuple = ()
+
+
+@dataclass(frozen=True)
+class Query:
+    sql: str
+    tables: tuple  # ((name, Table), ...) the query reads
+
+
+QUERIES = {}
+
+
+def define(name: str, sql: str, tables: dict = None):
+    """Register (or re-register, on a rerun) a named query and the tables it reads."""
+    QUERIES[name] = Query(sql, tuple((tables or {}).items()))
+
+
+@lru_cache(maxsize=None)
+def parse(sql: str):
+    """The parsed statement for `sql`; executing it skips DuckDB's parser."""
+    (statement,) = duckdb.extract_statements(sql)
+    return statement
+
+
+class Database:
+    """One connection per process; sessions get their own cursors over it."""
+
+    def __init__(self):
+        self.con = duckdb.connect()
+        # keep Parquet footers and metadata between queries
+        self.con.execute("SET enable_object_cache = true")
+        self.loaded = set()
+        self.lock = threading.Lock()
+
+    def cursor(self):
+        """This session's cursor; a session runs one script at a time, so it is never shared."""
+        con, cur = st.session_state.get(SESSION_CURSOR, (None, None))
+        # a cleared resource cache means a new connection, so a new cursor
+        if con is not self.con:
+            cur = self.con.cursor()
+            st.session_state[SESSION_CURSOR] = (self.con, cur)
+        return cur
+
+    def ensure(self, tables):
+        missing = [(name, table) for name, table in tables if name not in self.loaded]
+        if not missing:
+            return
+        with self.lock:
+            cur = self.con.cursor()
+            for name, table in missing:
+                if name in self.loaded:
+                    continue
+                path = str(table.path).replace("'", "''")
+                if Path(table.path).suffix == ".csv":
+                    cur.execute(f"CREATE TABLE {name} AS SELECT * FROM read_csv_auto('{path}')")
+                elif table.indexes:
+                    cur.execute(f"CREATE TABLE {name} AS SELECT * FROM read_parquet('{path}')")
+                else:
+                    cur.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet('{path}')")
+                for column in table.indexes:
+                    cur.execute(f"CREATE INDEX {name}_{column} ON {name} ({column})")
+                self.loaded.add(name)
+            cur.close()
+
+    def execute(self, name: str, params: dict, fetch: str, frames: dict = None):
+        query = QUERIES[name]
+        self.ensure(query.tables)
+        statement = parse(query.sql)
+        cur = self.cursor()
+        try:
+            for frame_name, frame in (frames or {}).items():
+                cur.register(frame_name, frame)
+            # bind only what the statement declares, so pages can share one params dict
+            result = cur.execute(statement, {k: params[k] for k in statement.named_parameters})
+            if fetch == "df":
+                return result.df()
+            if fetch == "one":
+                return result.fetchone()
+            return result.fetchnumpy()
+        finally:
+            for frame_name in frames or {}:
+                cur.unregister(frame_name)
+
+
+@st.cache_resource
+def get_database() -> Database:
+    return Database()
+
+
+@st.cache_data(max_entries=RESULT_CACHE_SIZE, show_spinner=False)
+def _cached(name: str, fetch: str, params: dict):
+    return get_database().execute(name, params, fetch)
+
+
+def _run(name, fetch, frames, cache, params):
+    # results over caller-supplied frames depend on more than the parameters
+    if frames or not cache:
+        return get_database().execute(name, params, fetch, frames)
+    return _cached(name, fetch, params)
+
+
+def fetch_df(name: str, frames: dict = None, cache: bool = True, **params):
+    """
+    Run a named query and return a DataFrame. `frames` maps names the SQL
+    refers to onto DataFrames registered for this execution only; results
+    over frames, or with `cache=False`, are not cached.
+    """
+    return _run(name, "df", frames, cache, params)
+
+
+def fetch_one(name: str, frames: dict = None, cache: bool = True, **params):
+    """Run a named query and return its first row, or None."""
+    return _run(name, "one", frames, cache, params)
+
+
+def fetch_numpy(name: str, frames: dict = None, cache: bool = True, **params):
+    """Run a named query and return a dict of NumPy column arrays."""
+    return _run(name, "numpy", frames, cache, params)
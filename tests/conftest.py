@@ -0,0 +1,15 @@
+import pytest
+
+from imdb_trends.ingest import ingest
+from imdb_trends.refresh import refresh
+from synthetic import write_dump
+
+
+@pytest.fixture(scope="session")
+def warehouse(tmp_path_factory):
+    """A warehouse built from the synthetic dump; tests open it read-only."""
+    root = tmp_path_factory.mktemp("warehouse")
+    write_dump(root / "raw")
+    ingest(raw_dir=root / "raw", out_dir=root / "processed")
+    refresh(root / "processed", root / "imdb.duckdb")
+    return root / "imdb.duckdb"
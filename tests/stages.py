@@ -0,0 +1,16 @@
+"""Stage bodies for the pipeline tests. Stages run in spawned worker processes,
+so they live in a module that imports nothing heavy."""
+
+from pathlib import Path
+
+
+def write(dest, text):
+    Path(dest).write_text(text)
+
+
+def concat(sources, dest):
+    Path(dest).write_text("+".join(Path(s).read_text() for s in sources))
+
+
+def fail():
+    raise RuntimeError("boom")
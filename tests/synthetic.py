@@ -0,0 +1,119 @@
+"""
+synthetic.py
+
+A small, deterministic IMDb dump for the tests: every file the ingest reads,
+with the quirks the derived tables care about (missing years and genres,
+several directors per title, episodes of multi-season series, alternate
+titles across regions and languages).
+"""
+
+import os
+import random
+from pathlib import Path
+
+NULL = "\\N"
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama",
+          "Family", "Fantasy", "History", "Horror", "Music", "Romance", "Sci-Fi", "Thriller", "War"]
+TITLE_TYPES = ["movie"] * 6 + ["tvSeries", "tvMiniSeries", "short", "tvMovie"]
+REGIONS = ["US", "IN", "FR", "JP", "DE", "KR", "BR", NULL]
+LANGUAGES = ["en", "hi", "fr", "ja", NULL, NULL]
+WORDS = ["Night", "Love", "Dark", "Star", "Road", "House", "Dream", "Fire", "River", "Ghost"]
+
+HEADERS = {
+    "title.basics": "tconst titleType primaryTitle originalTitle isAdult startYear endYear runtimeMinutes genres",
+    "title.ratings": "tconst averageRating numVotes",
+    "title.crew": "tconst directors writers",
+    "title.principals": "tconst ordering nconst category job characters",
+    "title.akas": "titleId ordering title region language types attributes isOriginalTitle",
+    "title.episode": "tconst parentTconst seasonNumber episodeNumber",
+    "name.basics": "nconst primaryName birthYear deathYear primaryProfession knownForTitles",
+}
+
+
+def _write(raw_dir: Path, name: str, rows: list):
+    lines = [HEADERS[name].replace(" ", "\t")] + ["\t".join(map(str, row)) for row in rows]
+    (Path(raw_dir) / f"{name}.tsv").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _read(raw_dir: Path, name: str) -> list:
+    lines = (Path(raw_dir) / f"{name}.tsv").read_text(encoding="utf-8").splitlines()
+    return [line.split("\t") for line in lines[1:]]
+
+
+def _touch(raw_dir: Path, name: str):
+    # the ingest reuses a checksum when size and mtime are unchanged
+    path = Path(raw_dir) / f"{name}.tsv"
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def write_dump(raw_dir: Path, titles: int = 400, people: int = 150, seed: int = 1):
+    """Write the seven raw TSVs of a synthetic dump into `raw_dir`."""
+    rng = random.Random(seed)
+    Path(raw_dir).mkdir(parents=True, exist_ok=True)
+    names = [f"nm{i:07d}" for i in range(people)]
+    basics, ratings, crew, principals, akas, episodes = [], [], [], [], [], []
+    next_episode = titles
+    for i in range(titles):
+        tconst = f"tt{i:07d}"
+        title_type = rng.choice(TITLE_TYPES)
+        genres = ",".join(rng.sample(GENRES, rng.choice([1, 1, 2, 3]))) if rng.random() > 0.03 else NULL
+        year = rng.randint(1960, 2024) if rng.random() > 0.05 else NULL
+        title = f"The {rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+        basics.append([tconst, title_type, title, title, 0, year, NULL, rng.choice([90, 120, 45, NULL]), genres])
+        if rng.random() < 0.85:
+            ratings.append([tconst, round(rng.uniform(1, 10), 1), int(rng.paretovariate(1.1) * 20)])
+        directors = ",".join(rng.sample(names[:60], rng.choice([1, 1, 2]))) if rng.random() > 0.05 else NULL
+        crew.append([tconst, directors, NULL])
+        for ordering, nconst in enumerate(rng.sample(names, 4), start=1):
+            principals.append([tconst, ordering, nconst, rng.choice(["actor", "actress", "director"]), NULL, NULL])
+        for ordering in range(1, rng.randint(1, 5) + 1):
+            aka = title if ordering == 1 or rng.random() < 0.3 else f"{title} ({ordering})"
+            akas.append([tconst, ordering, aka, rng.choice(REGIONS), rng.choice(LANGUAGES),
+                         NULL, NULL, int(ordering == 1)])
+        if title_type == "tvSeries":
+            for season in range(1, rng.randint(2, 6)):
+                for number in range(1, rng.randint(3, 8)):
+                    episode = f"tt{next_episode:07d}"
+                    next_episode += 1
+                    episodes.append([episode, tconst, season, number])
+                    rating = round(min(10, max(1, rng.gauss(8 - 0.2 * season, 0.8))), 1)
+                    ratings.append([episode, rating, rng.randint(5, 3000)])
+                    basics.append([episode, "tvEpisode", f"Ep {season}x{number}", "Ep", 0, 2000, NULL, 45, "Drama"])
+    people_rows = [[n, f"Person {i}", rng.choice([NULL, 1950, 1970]), NULL, "director,actor", "tt0000001"]
+                   for i, n in enumerate(names)]
+    for name, rows in [("title.basics", basics), ("title.ratings", ratings), ("title.crew", crew),
+                       ("title.principals", principals), ("title.akas", akas), ("title.episode", episodes),
+                       ("name.basics", people_rows)]:
+        _write(raw_dir, name, rows)
+
+
+def mutate_dump(raw_dir: Path, seed: int = 7):
+    """
+    Simulate the next daily dump: re-rate, drop and add ratings, and move some
+    titles to other genres and years. Only title.basics and title.ratings
+    change, which are the two files the refresh diffs.
+    """
+    rng = random.Random(seed)
+    ratings = []
+    for tconst, rating, votes in _read(raw_dir, "title.ratings"):
+        draw = rng.random()
+        if draw < 0.02:
+            continue
+        if draw < 0.10:
+            rating, votes = round(rng.uniform(1, 10), 1), int(votes) + rng.randint(1, 500)
+        ratings.append([tconst, rating, votes])
+    rated = {row[0] for row in ratings}
+    basics = _read(raw_dir, "title.basics")
+    for row in basics:
+        if row[1] != "tvEpisode" and rng.random() < 0.03:
+            row[8] = "Horror,Comedy"
+        if row[1] != "tvEpisode" and rng.random() < 0.02:
+            row[5] = "2001"
+        if row[0] not in rated and rng.random() < 0.3:
+            ratings.append([row[0], round(rng.uniform(1, 10), 1), rng.randint(1, 5000)])
+    _write(raw_dir, "title.ratings", ratings)
+    _write(raw_dir, "title.basics", basics)
+    _touch(raw_dir, "title.ratings")
+    _touch(raw_dir, "title.basics")
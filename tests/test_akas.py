@@ -0,0 +1,73 @@
+import duckdb
+import pytest
+
+from imdb_trends.refresh import plan_derived
+
+# the per-query aggregation over raw akas that akas_facts replaced
+RAW_FLAGS = """
+    SELECT
+        titleId AS tconst,
+        MAX(CASE WHEN region = 'US' THEN 1 ELSE 0 END) = 1 AS has_us_release,
+        MAX(CASE WHEN language = 'en' THEN 1 ELSE 0 END) = 1 AS has_english,
+        COUNT(DISTINCT region) AS region_count,
+        COUNT(DISTINCT language) AS language_count
+    FROM akas
+    GROUP BY titleId
+"""
+
+
+@pytest.fixture(scope="module")
+def con(warehouse):
+    con = duckdb.connect(str(warehouse), read_only=True)
+    yield con
+    con.close()
+
+
+def differences(con, left: str, right: str) -> int:
+    return con.execute(f"""
+        SELECT COUNT(*) FROM (
+            (({left}) EXCEPT ALL ({right})) UNION ALL (({right}) EXCEPT ALL ({left}))
+        )
+    """).fetchone()[0]
+
+
+def test_facts_match_the_raw_aggregation(con):
+    facts = "SELECT tconst, has_us_release, has_english, region_count, language_count FROM akas_facts"
+    assert con.execute("SELECT COUNT(*) FROM akas_facts").fetchone()[0] > 0
+    assert differences(con, facts, RAW_FLAGS) == 0
+
+
+def test_code_lists_decode_to_the_raw_sets(con):
+    decoded = """
+        SELECT f.tconst, list_sort(list(r.region)) AS regions
+        FROM (SELECT tconst, unnest(regions) AS code FROM akas_facts) f
+        JOIN akas_regions r USING (code)
+        GROUP BY f.tconst
+    """
+    raw = """
+        SELECT titleId AS tconst, list_sort(list(DISTINCT region)) AS regions
+        FROM akas
+        WHERE region IS NOT NULL
+        GROUP BY titleId
+    """
+    assert differences(con, decoded, raw) == 0
+
+
+def test_foreign_movies_match_the_raw_definition(con):
+    raw = f"""
+        SELECT b.tconst
+        FROM basics b
+        JOIN ({RAW_FLAGS}) f ON b.tconst = f.tconst
+        JOIN ratings r ON b.tconst = r.tconst
+        WHERE b.titleType = 'movie' AND NOT f.has_us_release AND NOT f.has_english
+    """
+    assert con.execute("SELECT COUNT(*) FROM foreign_movies").fetchone()[0] > 0
+    assert differences(con, "SELECT tconst FROM foreign_movies", raw) == 0
+
+
+def test_dictionaries_are_never_patched_by_key(con):
+    # even if akas were diffed, the dictionaries and the facts built on their codes rebuild in full
+    plan = plan_derived(con, diffed={"akas"}, reloaded=set(), full=False)
+    assert plan["akas_regions"] == "full"
+    assert plan["akas_languages"] == "full"
+    assert plan["akas_facts"] == "full"
@@ -0,0 +1,47 @@
+from dataclasses import replace
+
+import pandas as pd
+import pytest
+
+from imdb_trends.autocomplete import PICKER_SIZE, TOP_K, load_autocomplete, write_autocomplete
+
+
+@pytest.fixture(scope="module")
+def names():
+    # far more than HOT_RANGE keys share the short prefixes; ranked by votes
+    labels = [f"Anna Smith{i}" for i in range(1000)] + ["Bob Jones"]
+    votes = list(range(len(labels), 0, -1))
+    return pd.DataFrame({"label": labels, "kind": "director", "votes": votes})
+
+
+def build(names, tmp_path, **kwargs):
+    write_autocomplete(names, tmp_path, **kwargs)
+    return load_autocomplete(tmp_path)
+
+
+def expected(names, prefix, limit):
+    """Best `limit` labels with a word starting with `prefix`, by brute force."""
+    def starts(label):
+        words = label.lower().split()
+        return any(" ".join(words[i:]).startswith(prefix) for i in range(len(words)))
+
+    hits = [label for label in names["label"] if starts(label)]
+    return hits[:limit]
+
+
+@pytest.mark.parametrize("top_k", [TOP_K, PICKER_SIZE])
+@pytest.mark.parametrize("prefix", ["a", "an", "anna", "anna s", "smith", "anna smith1", "bob"])
+@pytest.mark.parametrize("limit", [1, TOP_K, PICKER_SIZE, 50])
+def test_hot_prefixes_return_limit_results(names, tmp_path, top_k, prefix, limit):
+    index = build(names, tmp_path, top_k=top_k)
+    assert len(index.prefixes) > 0 and index.prefix_top.shape[1] == top_k
+    labels = [s.label for s in index.suggest(prefix, limit=limit, fuzzy=False)]
+    assert labels == expected(names, prefix, limit)
+
+
+def test_picker_indexes_answer_a_full_picker_without_a_scan(names, tmp_path):
+    index = build(names, tmp_path, top_k=PICKER_SIZE)
+    # with the key range gone, a hot prefix can only be answered from its precomputed row
+    unscanned = replace(index, keys=index.keys[:0], key_suggestions=index.key_suggestions[:0])
+    labels = [s.label for s in unscanned.suggest("anna", limit=PICKER_SIZE, fuzzy=False)]
+    assert labels == expected(names, "anna", PICKER_SIZE)
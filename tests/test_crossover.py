@@ -0,0 +1,147 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from imdb_trends.crossover import FOREIGN_DEFINITIONS, load_crossover
+from imdb_trends.genres import GENRES, unpack
+
+DEFINITIONS = list(FOREIGN_DEFINITIONS)
+# the last definition holds one stratum only
+SINGLE = DEFINITIONS[-1]
+
+
+def random_votes(rng, n: int) -> pd.DataFrame:
+    """Rows shaped like crossover_votes.parquet, with many tied vote counts."""
+    masks = rng.choice([1, 2, 3, 5, 8, 9, 12, 1 << 20, (1 << 20) | 1], size=n)
+    votes = np.where(rng.random(n) < 0.5, rng.choice([5, 10, 10, 20, 50], size=n), rng.pareto(1.0, n) * 30)
+    return pd.DataFrame({
+        "definition": rng.integers(0, len(DEFINITIONS) - 1, size=n),
+        "startYear": rng.integers(1980, 2000, size=n),
+        "genre_mask": masks,
+        "numVotes": votes.astype(np.int64),
+        "averageRating": rng.uniform(1, 10, size=n).round(1),
+        "runtimeMinutes": np.where(rng.random(n) < 0.1, np.nan, rng.integers(60, 180, size=n)),
+        "region_count": rng.integers(1, 20, size=n),
+        "language_count": rng.integers(0, 6, size=n),
+    })
+
+
+@pytest.fixture(scope="module")
+def votes(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    frame = random_votes(rng, 20000)
+    single = random_votes(rng, 300).assign(definition=len(DEFINITIONS) - 1, startYear=1990, genre_mask=5)
+    frame = pd.concat([frame, single], ignore_index=True)
+    path = tmp_path_factory.mktemp("crossover") / "crossover_votes.parquet"
+    con = duckdb.connect()
+    con.register("frame", frame)
+    con.execute(f"""
+        COPY (
+            SELECT
+                CAST(definition AS UTINYINT) AS definition,
+                CAST(startYear AS SMALLINT) AS startYear,
+                CAST(genre_mask AS UINTEGER) AS genre_mask,
+                CAST(numVotes AS UINTEGER) AS numVotes,
+                averageRating,
+                CAST(runtimeMinutes AS INTEGER) AS runtimeMinutes,
+                CAST(region_count AS USMALLINT) AS region_count,
+                CAST(language_count AS USMALLINT) AS language_count
+            FROM frame
+            ORDER BY definition, startYear, genre_mask, numVotes
+        ) TO '{path}' (FORMAT parquet)
+    """)
+    con.close()
+    return frame, load_crossover(path)
+
+
+def selection(frame, definition, years, genre_mask):
+    rows = (frame["definition"] == DEFINITIONS.index(definition)) & frame["startYear"].between(*years)
+    if genre_mask:
+        rows &= (frame["genre_mask"] & genre_mask) != 0
+    return frame[rows]
+
+
+CASES = [
+    (DEFINITIONS[0], (1980, 1999), 0),
+    (DEFINITIONS[1], (1985, 1990), 1),
+    (DEFINITIONS[2], (1991, 1991), 8 | (1 << 20)),
+    (DEFINITIONS[0], (1995, 1996), 2),
+    (SINGLE, (1980, 1999), 0),
+]
+
+
+@pytest.mark.parametrize("definition, years, genre_mask", CASES)
+@pytest.mark.parametrize("q", [0.0, 0.25, 0.5, 0.9, 0.99, 1.0])
+def test_quantile_matches_numpy(votes, definition, years, genre_mask, q):
+    frame, index = votes
+    ids = index.select(definition, years, genre_mask)
+    expected = selection(frame, definition, years, genre_mask)["numVotes"].to_numpy()
+    assert index.size(ids) == len(expected)
+    assert index.quantile(ids, q) == pytest.approx(np.quantile(expected, q), rel=1e-12)
+
+
+def test_single_stratum(votes):
+    _, index = votes
+    assert len(index.select(SINGLE, (1980, 1999))) == 1
+
+
+def test_ties_at_the_threshold_are_crossovers(votes):
+    frame, index = votes
+    ids = index.select(DEFINITIONS[0], (1980, 1999))
+    chosen = selection(frame, DEFINITIONS[0], (1980, 1999), 0)["numVotes"]
+    # a quantile that lands exactly on a heavily tied vote count
+    q = (chosen < 10).sum() / (len(chosen) - 1)
+    threshold = index.quantile(ids, q)
+    assert threshold == 10
+    crossover = index.compare(ids, threshold).set_index("group").loc["Crossover", "movies"]
+    assert crossover == (chosen >= 10).sum()
+
+
+@pytest.mark.parametrize("definition, years, genre_mask", CASES)
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.97])
+def test_compare_matches_pandas(votes, definition, years, genre_mask, q):
+    frame, index = votes
+    ids = index.select(definition, years, genre_mask)
+    threshold = index.quantile(ids, q)
+    chosen = selection(frame, definition, years, genre_mask)
+    chosen = chosen.assign(
+        group=np.where(chosen["numVotes"] >= threshold, "Crossover", "Regional"),
+        genres=unpack(chosen["genre_mask"].to_numpy()).sum(axis=1),
+    )
+    expected = chosen.groupby("group").agg(
+        movies=("numVotes", "size"),
+        avg_rating=("averageRating", "mean"),
+        avg_votes=("numVotes", "mean"),
+        avg_regions=("region_count", "mean"),
+        avg_languages=("language_count", "mean"),
+        avg_runtime=("runtimeMinutes", "mean"),
+        avg_genres=("genres", "mean"),
+    ).reindex(["Crossover", "Regional"])
+    expected["movies"] = expected["movies"].fillna(0).astype(np.int64)
+    result = index.compare(ids, threshold).set_index("group")
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_dtype=False, rtol=1e-9)
+
+    counts = index.genre_counts(ids, threshold).set_index("genre")
+    bits = pd.DataFrame(unpack(chosen["genre_mask"].to_numpy()), columns=list(GENRES), index=chosen.index)
+    for group in ["Crossover", "Regional"]:
+        in_group = bits[chosen["group"] == group].sum()
+        assert (counts[group.lower()] == in_group.reindex(counts.index)).all()
+
+    years_counts = index.year_counts(ids, threshold).set_index("startYear")
+    by_year = chosen.groupby(["startYear", "group"]).size().unstack(fill_value=0)
+    for group in ["Crossover", "Regional"]:
+        expected_years = by_year.get(group, pd.Series(dtype=np.int64)).reindex(years_counts.index, fill_value=0)
+        assert (years_counts[group.lower()] == expected_years).all()
+
+
+def test_empty_selection(votes):
+    _, index = votes
+    ids = index.select(DEFINITIONS[0], (1900, 1910))
+    assert ids.size == 0 and index.size(ids) == 0
+    assert np.isnan(index.quantile(ids, 0.9))
+    compared = index.compare(ids, float("nan")).set_index("group")
+    assert (compared["movies"] == 0).all()
+    assert compared.drop(columns="movies").isna().all().all()
+    assert (index.genre_counts(ids, float("nan"))[["crossover", "regional"]] == 0).all().all()
+    assert index.year_counts(ids, float("nan")).empty
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from imdb_trends.decay import SEED_SERIES, bootstrap_series_slopes, grouped_ols
+
+
+def segments(rng):
+    """(x, y) groups covering the cases linregress treats specially."""
+    groups = [
+        (np.array([1.0, 2.0]), np.array([7.5, 8.1])),                 # two points
+        (np.array([3.0, 9.0]), np.array([6.0, 6.0])),                 # two points, flat
+        (np.arange(1.0, 6.0), np.full(5, 7.2)),                       # no variance in y
+        (np.arange(1.0, 7.0), 8.0 - 0.3 * np.arange(1.0, 7.0)),       # exact line
+        (np.array([1.0, 1.0, 2.0, 2.0, 3.0]), np.array([5.0, 6.0, 5.5, 7.0, 6.1])),  # repeated x
+    ]
+    for _ in range(40):
+        n = int(rng.integers(3, 30))
+        x = np.arange(1.0, n + 1) + (rng.integers(0, 50) if rng.random() < 0.3 else 0)
+        groups.append((x, rng.normal(7.5, 1.0, n) - rng.normal(0.05, 0.1) * x))
+    return groups
+
+
+def test_grouped_ols_matches_linregress():
+    groups = segments(np.random.default_rng(0))
+    starts = np.cumsum([0] + [len(x) for x, _ in groups[:-1]])
+    fit = grouped_ols(starts, np.concatenate([x for x, _ in groups]), np.concatenate([y for _, y in groups]))
+
+    for i, (x, y) in enumerate(groups):
+        expected = stats.linregress(x, y)
+        assert fit["n"][i] == len(x)
+        for ours, theirs in [
+            ("slope", expected.slope),
+            ("intercept", expected.intercept),
+            ("r", expected.rvalue),
+            ("pvalue", expected.pvalue),
+            ("stderr", expected.stderr),
+            ("intercept_stderr", expected.intercept_stderr),
+        ]:
+            assert fit[ours][i] == pytest.approx(theirs, rel=1e-9, abs=1e-12, nan_ok=True), f"group {i}: {ours}"
+
+
+def test_grouped_ols_without_variance_in_x_has_no_slope():
+    # linregress refuses identical x values; the grouped fit leaves that group undefined
+    with pytest.raises(ValueError):
+        stats.linregress([4.0, 4.0, 4.0], [6.0, 7.0, 8.0])
+    fit = grouped_ols(np.array([0, 3]), np.array([4.0, 4.0, 4.0, 1.0, 2.0, 3.0]),
+                      np.array([6.0, 7.0, 8.0, 6.0, 7.0, 8.0]))
+    assert np.isnan(fit["slope"][0])
+    assert fit["slope"][1] == pytest.approx(1.0)
+
+
+def test_bootstrap_intervals_do_not_depend_on_sharding():
+    rng = np.random.default_rng(1)
+    n_seasons = rng.integers(2, 9, size=3 * SEED_SERIES + 17)
+    series = np.repeat(np.arange(len(n_seasons)), n_seasons)
+    season = np.concatenate([np.arange(1, n + 1) for n in n_seasons])
+    seasons = pd.DataFrame({
+        "series_tconst": [f"tt{i:07d}" for i in series],
+        "series_title": "Show",
+        "seasonNumber": season,
+        "season_mean_rating": rng.normal(7.5, 0.5, len(series)) - 0.05 * season,
+    })
+
+    def intervals(**kwargs):
+        return bootstrap_series_slopes(seasons, n_resamples=50, seed=7, **kwargs)
+
+    expected = intervals(jobs=1, shard_series=SEED_SERIES)
+    assert expected["slope_ci_low"].notna().sum() > 0
+    for kwargs in [
+        dict(jobs=1, shard_series=2 * SEED_SERIES),
+        dict(jobs=1, shard_series=100 * SEED_SERIES),
+        dict(jobs=2, shard_series=SEED_SERIES),
+    ]:
+        pd.testing.assert_frame_equal(intervals(**kwargs), expected, obj=str(kwargs))
+    other = bootstrap_series_slopes(seasons, n_resamples=50, seed=8, jobs=1)
+    assert not np.allclose(other["slope_ci_low"], expected["slope_ci_low"], equal_nan=True)
@@ -0,0 +1,108 @@
+import inspect
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from imdb_trends import pipeline
+from imdb_trends.exports import EXPORTS
+from imdb_trends.pipeline import Stage, build_stages, code_version, dependencies, run_pipeline, topological_order
+from stages import concat, fail, write
+
+
+def graph(tmp_path, params=(), failing=False):
+    """a -> b -> c, plus d on its own; b optionally fails."""
+    a, b, c, d = (tmp_path / f"{name}.txt" for name in "abcd")
+    return [
+        Stage("c", partial(concat, [b], c), inputs=(b,), outputs=(c,)),
+        Stage("b", fail if failing else partial(concat, [a], b), inputs=(a,), outputs=(b,), params=params),
+        Stage("a", partial(write, a, "a"), inputs=(), outputs=(a,)),
+        Stage("d", partial(write, d, "d"), inputs=(), outputs=(d,)),
+    ]
+
+
+def run(tmp_path, stages, **kwargs):
+    records = run_pipeline(stages, jobs=2, processed_dir=tmp_path, **kwargs)
+    return {name: record["status"] for name, record in records.items()}
+
+
+def test_stages_depend_on_the_writers_of_their_inputs(tmp_path):
+    stages = graph(tmp_path)
+    assert dependencies(stages) == {"a": set(), "b": {"a"}, "c": {"b"}, "d": set()}
+    order = [s.name for s in topological_order(stages)]
+    assert order.index("a") < order.index("b") < order.index("c")
+
+
+def test_two_writers_of_one_file_are_rejected(tmp_path):
+    out = tmp_path / "out.txt"
+    stages = [Stage("x", partial(write, out, "x"), (), (out,)), Stage("y", partial(write, out, "y"), (), (out,))]
+    with pytest.raises(ValueError, match="written by both x and y"):
+        dependencies(stages)
+
+
+def test_cycles_are_rejected(tmp_path):
+    x, y = tmp_path / "x.txt", tmp_path / "y.txt"
+    stages = [
+        Stage("x", partial(concat, [y], x), inputs=(y,), outputs=(x,)),
+        Stage("y", partial(concat, [x], y), inputs=(x,), outputs=(y,)),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        topological_order(stages)
+    with pytest.raises(ValueError, match="cycle"):
+        run_pipeline(stages, processed_dir=tmp_path)
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    assert run(tmp_path, graph(tmp_path)) == dict.fromkeys("cbad", "ran")
+    assert (tmp_path / "c.txt").read_text() == "a"
+    assert run(tmp_path, graph(tmp_path)) == dict.fromkeys("cbad", "skipped")
+
+
+def test_a_missing_output_reruns_its_stage_and_what_reads_it(tmp_path):
+    run(tmp_path, graph(tmp_path))
+    (tmp_path / "b.txt").unlink()
+    assert run(tmp_path, graph(tmp_path)) == {"c": "ran", "b": "ran", "a": "skipped", "d": "skipped"}
+    assert (tmp_path / "b.txt").exists()
+
+
+def test_changed_params_rerun_the_stage(tmp_path):
+    run(tmp_path, graph(tmp_path, params=("v1",)))
+    assert run(tmp_path, graph(tmp_path, params=("v2",)))["b"] == "ran"
+
+
+def test_targets_run_with_their_dependencies_only(tmp_path):
+    assert run(tmp_path, graph(tmp_path), targets=["b"]) == {"b": "ran", "a": "ran"}
+    assert not (tmp_path / "d.txt").exists()
+
+
+def test_force_reruns_only_the_targets(tmp_path):
+    run(tmp_path, graph(tmp_path))
+    assert run(tmp_path, graph(tmp_path), targets=["b"], force=True) == {"b": "ran", "a": "skipped"}
+    assert run(tmp_path, graph(tmp_path), force=True) == dict.fromkeys("cbad", "ran")
+
+
+def test_a_failed_stage_blocks_its_dependents(tmp_path):
+    records = run_pipeline(graph(tmp_path, failing=True), jobs=2, processed_dir=tmp_path)
+    assert {name: r["status"] for name, r in records.items()} == {"c": "blocked", "b": "failed", "a": "ran", "d": "ran"}
+    assert "boom" in records["b"]["error"]
+    # nothing is recorded for the failed stage, so the next run retries it
+    assert run(tmp_path, graph(tmp_path)) == {"c": "ran", "b": "ran", "a": "skipped", "d": "skipped"}
+
+
+def test_unknown_targets_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="unknown stages: e"):
+        run_pipeline(graph(tmp_path), targets=["e"], processed_dir=tmp_path)
+
+
+def test_exports_are_versioned_by_the_code_they_run(tmp_path, monkeypatch):
+    stages = {s.name: s for s in build_stages(tmp_path / "raw", tmp_path, tmp_path / "w.duckdb", tmp_path / "app")}
+    assert all(stages[f"export:{name}"].params == (code_version(export),) for name, export in EXPORTS.items())
+
+    # editing a helper module reruns the exports that import it, and only those
+    getsource = inspect.getsource
+    edited = lambda module: getsource(module) + ("\n# edited" if module.__name__ == "imdb_trends.decay" else "")
+    before = {name: code_version(export) for name, export in EXPORTS.items()}
+    monkeypatch.setattr(pipeline.inspect, "getsource", edited)
+    after = {name: code_version(export) for name, export in EXPORTS.items()}
+    assert after["rating_decay"] != before["rating_decay"]
+    assert after["homepage_cube"] == before["homepage_cube"]
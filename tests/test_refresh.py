@@ -0,0 +1,65 @@
+import shutil
+
+import duckdb
+import pytest
+
+from imdb_trends.derived import DERIVED_TABLES, DERIVED_VIEWS
+from imdb_trends.ingest import ingest
+from imdb_trends.refresh import refresh
+from synthetic import mutate_dump, write_dump
+
+# incremental and full builds sum doubles in different orders
+DIGITS = 9
+
+
+def comparable(con, db: str, table: str) -> str:
+    """SELECT over `db`.`table` with floating-point columns rounded."""
+    columns = con.execute("""
+        SELECT column_name, data_type FROM duckdb_columns()
+        WHERE database_name = ? AND table_name = ?
+        ORDER BY column_index
+    """, [db, table]).fetchall()
+    select = ", ".join(
+        f'round("{name}", {DIGITS}) AS "{name}"' if kind in ("DOUBLE", "FLOAT") else f'"{name}"'
+        for name, kind in columns
+    )
+    return f"SELECT {select} FROM {db}.{table}"
+
+
+@pytest.fixture(scope="module")
+def refreshed(tmp_path_factory):
+    """An incrementally refreshed warehouse next to a full rebuild of the same dump."""
+    root = tmp_path_factory.mktemp("refresh")
+    raw, processed = root / "raw", root / "processed"
+    write_dump(raw)
+    ingest(raw_dir=raw, out_dir=processed)
+    refresh(processed, root / "warehouse.duckdb")
+    mutate_dump(raw)
+    ingest(raw_dir=raw, out_dir=processed)
+    status = refresh(processed, root / "warehouse.duckdb")
+    shutil.copy(root / "warehouse.duckdb", root / "incremental.duckdb")
+    refresh(processed, root / "warehouse.duckdb", full=True)
+
+    con = duckdb.connect()
+    con.execute(f"ATTACH '{root / 'incremental.duckdb'}' AS incremental (READ_ONLY)")
+    con.execute(f"ATTACH '{root / 'warehouse.duckdb'}' AS rebuilt (READ_ONLY)")
+    yield con, status
+    con.close()
+
+
+def test_mutation_is_diffed(refreshed):
+    _, status = refreshed
+    assert status["basics"] == "diffed"
+    assert status["ratings"] == "diffed"
+    assert "incremental" in status.values()
+
+
+@pytest.mark.parametrize("table", [t.name for t in DERIVED_TABLES] + list(DERIVED_VIEWS))
+def test_incremental_matches_full_rebuild(refreshed, table):
+    con, _ = refreshed
+    incremental = comparable(con, "incremental", table)
+    rebuilt = comparable(con, "rebuilt", table)
+    assert con.execute(f"SELECT COUNT(*) FROM ({rebuilt})").fetchone()[0] > 0, f"{table} is empty"
+    for left, right in [(incremental, rebuilt), (rebuilt, incremental)]:
+        extra = con.execute(f"SELECT COUNT(*) FROM ({left} EXCEPT ALL {right})").fetchone()[0]
+        assert extra == 0, f"{table}: {extra} rows differ between the incremental refresh and a full rebuild"
@@ -0,0 +1,106 @@
+import duckdb
+import numpy as np
+import pytest
+
+from imdb_trends import sampling
+from imdb_trends.sampling import KEY_MAX, allocate, stratified_sample
+
+# skewed strata, one of them NULL
+POPULATION = """
+    SELECT
+        i AS id,
+        CASE WHEN i % 97 = 0 THEN NULL ELSE i % 5 END AS kind,
+        CASE WHEN i % 10 < 7 THEN 'common' ELSE 'rare' END AS size
+    FROM range(60000) t(i)
+"""
+STRATA = ["kind", "size"]
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    yield con
+    con.close()
+
+
+def populations(con):
+    return con.execute(f"""
+        SELECT kind, size, COUNT(*) AS population
+        FROM ({POPULATION})
+        GROUP BY ALL
+        ORDER BY ALL
+    """).df()
+
+
+def drawn(con, sample):
+    con.register("_drawn", sample)
+    counts = con.execute("SELECT kind, size, COUNT(*) AS drawn FROM _drawn GROUP BY ALL ORDER BY ALL").df()
+    con.unregister("_drawn")
+    return counts
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_allocate_sums_to_n_and_caps_at_stratum_size(seed):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 1000, size=rng.integers(1, 30))
+    counts[rng.integers(len(counts))] = rng.integers(1, 5)  # a tiny stratum
+    for n in [0, 1, int(counts.sum()) // 3, int(counts.sum()) - 1, int(counts.sum()), int(counts.sum()) + 50]:
+        quotas = allocate(counts, n)
+        assert quotas.sum() == min(n, counts.sum())
+        assert (quotas >= 0).all() and (quotas <= counts).all()
+        # largest remainder: every quota is its exact share rounded down or up
+        if n < counts.sum():
+            exact = counts * n / counts.sum()
+            assert (quotas >= np.floor(exact)).all() and (quotas <= np.floor(exact) + 1).all()
+
+
+def test_allocate_breaks_ties_deterministically():
+    assert allocate([10, 10, 10], 2).tolist() == [1, 1, 0]
+    assert allocate([10, 10, 10], 2).tolist() == allocate([10, 10, 10], 2).tolist()
+
+
+def test_cutoff_keeps_the_quota_with_uniform_keys():
+    rng = np.random.default_rng(0)
+    quotas = np.array([0, 1, 5, 50, 400, 1000])
+    population = np.array([10, 2000, 100, 5000, 4000, 1000])
+    cutoff = sampling._cutoff(quotas, population)
+    # a stratum that has to be taken whole is never cut
+    assert cutoff[-1] == KEY_MAX
+    for _ in range(200):
+        below = [
+            int((rng.integers(0, KEY_MAX, size=p, dtype=np.uint64, endpoint=True) <= c).sum())
+            for p, c in zip(population, cutoff)
+        ]
+        assert (np.array(below) >= quotas).all()
+
+
+@pytest.mark.parametrize("n", [1, 500, 7321, 60000, 100000])
+def test_stratified_sample_draws_each_quota_exactly(con, n):
+    counts = populations(con)
+    counts["quota"] = allocate(counts["population"], n)
+    sample = stratified_sample(con, POPULATION, STRATA, n, key="id", batch_vectors=2)
+    assert len(sample) == min(n, 60000)
+    assert sample["id"].is_unique
+    merged = counts.merge(drawn(con, sample), on=STRATA, how="left").fillna({"drawn": 0})
+    assert (merged["drawn"] == merged["quota"]).all()
+
+
+def test_stratified_sample_is_repeatable_for_a_key_and_seed(con):
+    ids = lambda **kw: sorted(stratified_sample(con, POPULATION, STRATA, 2000, key="id", **kw)["id"])
+    first = ids(seed=3)
+    # the draw does not depend on how the scan is batched
+    assert ids(seed=3, batch_vectors=1) == first
+    assert ids(seed=3, batch_vectors=64) == first
+    assert ids(seed=4) != first
+
+
+def test_short_strata_are_redrawn_without_the_cutoff(con, monkeypatch):
+    # a cutoff that keeps almost nothing forces every stratum through the redraw
+    monkeypatch.setattr(sampling, "_cutoff", lambda quotas, population: np.full(len(quotas), 1 << 40, dtype=np.uint64))
+    counts = populations(con)
+    counts["quota"] = allocate(counts["population"], 3000)
+    sample = stratified_sample(con, POPULATION, STRATA, 3000, key="id")
+    merged = counts.merge(drawn(con, sample), on=STRATA, how="left").fillna({"drawn": 0})
+    assert (merged["drawn"] == merged["quota"]).all()
+    monkeypatch.undo()
+    assert sorted(sample["id"]) == sorted(stratified_sample(con, POPULATION, STRATA, 3000, key="id")["id"])